@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Measure how long it takes to create, check and destroy synthetic
+# deployments of VPCs, subnets, security groups, EBS volumes, Route53
+# record sets and EC2 machines, and how many AWS API calls that takes.
+#
+# The plugin talks to a local fake endpoint (see fake_aws.py) instead of
+# AWS, so no account is needed and the results are comparable between
+# runs.  Latency and throttling of the fake are configurable to see how
+# the plugin behaves against a busy region.  Requires nixops, nix and
+# moto (pip install 'moto[server]').
+#
+# Usage: python benchmarks/deploy.py [--sizes 10,100,1000] [--latency 0.05]
+#                                    [--rate 20] [--json results.json]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import boto3
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import fake_aws  # noqa: E402
+
+REGION = "us-east-1"
+ZONE_NAME = "bench.nixops.test."
+PHASES = ["create", "check", "destroy"]
+
+# Every group of 10 resources of a synthetic deployment consists of one
+# VPC with two subnets and two security groups, two EBS volumes, two
+# record sets and one machine in the first subnet.
+UNIT = """
+  resources.vpc.vpc-{u} = {{
+    inherit region accessKeyId;
+    cidrBlock = "10.{a}.{b}.0/24";
+  }};
+  resources.vpcSubnets.subnet-{u}-0 = {{ resources, ... }}: {{
+    inherit region accessKeyId;
+    zone = "{region}a";
+    vpcId = resources.vpc.vpc-{u};
+    cidrBlock = "10.{a}.{b}.0/25";
+  }};
+  resources.vpcSubnets.subnet-{u}-1 = {{ resources, ... }}: {{
+    inherit region accessKeyId;
+    zone = "{region}b";
+    vpcId = resources.vpc.vpc-{u};
+    cidrBlock = "10.{a}.{b}.128/25";
+  }};
+  resources.ec2SecurityGroups.sg-{u}-0 = {{ resources, ... }}: {{
+    inherit region accessKeyId;
+    vpcId = resources.vpc.vpc-{u};
+    rules = [ {{ fromPort = 22; toPort = 22; sourceIp = "0.0.0.0/0"; }} ];
+  }};
+  resources.ec2SecurityGroups.sg-{u}-1 = {{ resources, ... }}: {{
+    inherit region accessKeyId;
+    vpcId = resources.vpc.vpc-{u};
+    rules = [
+      {{ fromPort = 80; toPort = 80; sourceIp = "0.0.0.0/0"; }}
+      {{ fromPort = 443; toPort = 443; sourceIp = "0.0.0.0/0"; }}
+    ];
+  }};
+  resources.ebsVolumes.volume-{u}-0 = {{
+    inherit region accessKeyId;
+    zone = "{region}a";
+    size = 1;
+  }};
+  resources.ebsVolumes.volume-{u}-1 = {{
+    inherit region accessKeyId;
+    zone = "{region}a";
+    size = 1;
+  }};
+  resources.route53RecordSets.record-{u}-0 = {{
+    inherit accessKeyId;
+    zoneName = "{zone}";
+    domainName = "a-{u}.{zone}";
+    recordType = "A";
+    recordValues = [ "10.{a}.{b}.1" ];
+  }};
+  resources.route53RecordSets.record-{u}-1 = {{
+    inherit accessKeyId;
+    zoneName = "{zone}";
+    domainName = "txt-{u}.{zone}";
+    recordType = "TXT";
+    recordValues = [ "\\"benchmark {u}\\"" ];
+  }};
+"""
+
+MACHINE = """
+  machine-{u} = {{ resources, ... }}: {{
+    deployment.targetEnv = "ec2";
+    deployment.ec2 = {{
+      inherit region accessKeyId;
+      ami = "{ami}";
+      instanceType = "t3.micro";
+      keyPair = resources.ec2KeyPairs.keypair;
+      subnetId = resources.vpcSubnets.subnet-{u}-0;
+      securityGroups = [];
+      securityGroupIds = [ resources.ec2SecurityGroups.sg-{u}-0.name ];
+      associatePublicIpAddress = true;
+    }};
+  }};
+"""
+
+
+def network(size, ami, machines):
+    """Return a network expression with ‘size’ resources."""
+    units = []
+    for u in range(max(1, size // 10)):
+        params = dict(u=u, a=u // 256, b=u % 256, region=REGION, zone=ZONE_NAME)
+        units.append(UNIT.format(**params))
+        if machines:
+            units.append(MACHINE.format(ami=ami, **params))
+    keypair = (
+        "  resources.ec2KeyPairs.keypair = { inherit region accessKeyId; };\n"
+        if machines
+        else ""
+    )
+    return '{{ network.description = "benchmark"; }} // (let\n  region = "{0}";\n  accessKeyId = "{1}";\nin {{\n{2}{3}}})\n'.format(
+        REGION, os.environ["AWS_ACCESS_KEY_ID"], keypair, "".join(units)
+    )
+
+
+def disable_ssh():
+    """
+        The fake endpoint creates instances that cannot be reached, so skip
+        everything nixops would do over SSH.
+    """
+    import nixops.backends
+    import nixops.known_hosts
+
+    nixops.backends.MachineState.wait_for_ssh = lambda self, check=False: None
+    nixops.backends.MachineState._check = lambda self, res: None
+    nixops.backends.MachineState.run_command = (
+        lambda self, command, **kwargs: "ssh-ed25519 AAAAbenchmark"
+    )
+    nixops.known_hosts.add = lambda ip_address, public_key: None
+    nixops.known_hosts.remove = lambda ip_address, public_key: None
+
+
+def setup_endpoint(upstream):
+    """Create what the deployments expect to exist and return an AMI id."""
+    route53 = boto3.client("route53", endpoint_url=upstream, region_name=REGION)
+    if not any(
+        z["Name"] == ZONE_NAME for z in route53.list_hosted_zones()["HostedZones"]
+    ):
+        route53.create_hosted_zone(Name=ZONE_NAME, CallerReference=ZONE_NAME)
+    ec2 = boto3.client("ec2", endpoint_url=upstream, region_name=REGION)
+    return ec2.describe_images()["Images"][0]["ImageId"]
+
+
+def run_phase(phase, depl, fake):
+    import nixops.parallel
+    import nixops_aws.metrics
+
+    nixops_aws.metrics.reset()
+    fake.reset()
+    start = time.perf_counter()
+    if phase == "create":
+        depl.deploy(create_only=True)
+    elif phase == "check":
+        nixops.parallel.run_tasks(
+            nr_workers=-1,
+            tasks=list(depl.active_resources.values()),
+            worker_fun=lambda r: r.check(),
+        )
+    elif phase == "destroy":
+        depl.destroy_resources()
+    elapsed = time.perf_counter() - start
+
+    stats = nixops_aws.metrics.snapshot().values()
+    return {
+        "time": round(elapsed, 3),
+        "calls": sum(s.calls for s in stats),
+        "errors": sum(s.errors for s in stats),
+        "retries": sum(s.retries for s in stats),
+        "throttled": sum(fake.throttled.values()),
+        "operations": nixops_aws.metrics.to_json()["operations"],
+    }
+
+
+def run(size, args, ami, fake):
+    import nixops.statefile
+
+    with tempfile.TemporaryDirectory(prefix="nixops-benchmark-") as tmp:
+        expr = os.path.join(tmp, "network.nix")
+        with open(expr, "w") as f:
+            f.write(network(size, ami, not args.no_machines))
+
+        sf = nixops.statefile.StateFile(os.path.join(tmp, "state.nixops"))
+        try:
+            depl = sf.create_deployment()
+            depl.nix_exprs = [expr]
+            depl.logger.set_autoresponse("y")
+            results = {}
+            for phase in PHASES:
+                results[phase] = run_phase(phase, depl, fake)
+            depl.delete()
+            return results
+        finally:
+            sf.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="seconds added to each call"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.02, help="random extra latency"
+    )
+    parser.add_argument(
+        "--rate", type=float, help="requests per second allowed per service"
+    )
+    parser.add_argument("--burst", type=float, default=20)
+    parser.add_argument("--upstream", help="URL of a running moto server")
+    parser.add_argument("--no-machines", action="store_true")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+    moto = None
+    upstream = args.upstream
+    if upstream is None:
+        upstream, moto = fake_aws.start_moto()
+    fake = fake_aws.FakeAWS(
+        upstream, args.latency, args.jitter, args.rate, args.burst
+    ).start()
+    os.environ["NIXOPS_AWS_ENDPOINT_URL"] = fake.url
+
+    disable_ssh()
+    try:
+        ami = setup_endpoint(upstream)
+        results = {}
+        print(
+            "{0:>6} {1:<8} {2:>9} {3:>7} {4:>7} {5:>8} {6:>10}".format(
+                "size", "phase", "time (s)", "calls", "errors", "retries", "throttled"
+            )
+        )
+        for size in [int(s) for s in args.sizes.split(",")]:
+            results[size] = run(size, args, ami, fake)
+            for phase in PHASES:
+                r = results[size][phase]
+                print(
+                    "{0:>6} {1:<8} {2:>9.2f} {3:>7} {4:>7} {5:>8} {6:>10}".format(
+                        size,
+                        phase,
+                        r["time"],
+                        r["calls"],
+                        r["errors"],
+                        r["retries"],
+                        r["throttled"],
+                    )
+                )
+    finally:
+        fake.stop()
+        if moto is not None:
+            moto.stop()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "latency": args.latency,
+                    "jitter": args.jitter,
+                    "rate": args.rate,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
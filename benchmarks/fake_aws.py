@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+# A local stand-in for the AWS endpoints used by the deploy benchmark.
+#
+# Requests are answered by a moto server and pass through a proxy that
+# adds a configurable latency to every call and throttles callers that
+# exceed a configurable request rate, the way EC2 and Route53 do.
+
+import http.client
+import http.server
+import random
+import socket
+import threading
+import time
+import urllib.parse
+import uuid
+from typing import Dict, Optional, Tuple
+
+EC2_THROTTLE = """<?xml version="1.0" encoding="UTF-8"?>
+<Response><Errors><Error><Code>RequestLimitExceeded</Code><Message>Request limit exceeded.</Message></Error></Errors><RequestID>{0}</RequestID></Response>"""
+
+ROUTE53_THROTTLE = """<?xml version="1.0" encoding="UTF-8"?>
+<ErrorResponse xmlns="https://route53.amazonaws.com/doc/2013-04-01/"><Error><Type>Sender</Type><Code>Throttling</Code><Message>Rate exceeded</Message></Error><RequestId>{0}</RequestId></ErrorResponse>"""
+
+# Headers that apply to a single hop and must not be relayed.
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length"}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TokenBucket:
+    """Allow ‘rate’ requests per second on average, in bursts of ‘burst’."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def _operation(path: str, body: bytes) -> Tuple[str, str]:
+    """Return the service and operation name of a request."""
+    if path.startswith("/2013-04-01/"):
+        # Route53 is a REST API: use the method-less resource path without
+        # identifiers, e.g. "hostedzone/rrset".
+        parts = path.split("?")[0].split("/")[2:]
+        return "route53", "/".join(parts[0::2])
+    params = urllib.parse.parse_qs(body.decode("utf-8", "replace"))
+    params.update(urllib.parse.parse_qs(urllib.parse.urlsplit(path).query))
+    return "ec2", params.get("Action", ["unknown"])[0]
+
+
+class FakeAWS:
+    """
+        Proxy listening on a local port that forwards requests to ‘upstream’
+        (a moto server) after sleeping ‘latency’ seconds, plus up to
+        ‘jitter’ seconds.  When ‘rate’ is set, each service accepts at most
+        that many requests per second (in bursts of ‘burst’) and answers
+        the others with a throttling error.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        latency: float = 0,
+        jitter: float = 0,
+        rate: Optional[float] = None,
+        burst: float = 20,
+    ) -> None:
+        self.upstream = urllib.parse.urlsplit(upstream)
+        self.latency = latency
+        self.jitter = jitter
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._rate = rate
+        self._burst = burst
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str], int] = {}
+        self.throttled: Dict[Tuple[str, str], int] = {}
+        self._server: Optional[http.server.ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server
+        return "http://127.0.0.1:{0}".format(self._server.server_address[1])
+
+    def start(self) -> "FakeAWS":
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, headers, data = fake._request(
+                    self.command, self.path, dict(self.headers), body
+                )
+                self.send_response(status)
+                for name, value in headers:
+                    if name.lower() not in HOP_HEADERS:
+                        self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _handle
+
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.throttled.clear()
+
+    def _bucket(self, service: str) -> Optional[TokenBucket]:
+        if self._rate is None:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(service)
+            if bucket is None:
+                bucket = self._buckets[service] = TokenBucket(self._rate, self._burst)
+            return bucket
+
+    def _request(self, method, path, headers, body):
+        op = _operation(path, body)
+        with self._lock:
+            self.requests[op] = self.requests.get(op, 0) + 1
+
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+
+        bucket = self._bucket(op[0])
+        if bucket and not bucket.take():
+            with self._lock:
+                self.throttled[op] = self.throttled.get(op, 0) + 1
+            if op[0] == "route53":
+                template, status = ROUTE53_THROTTLE, 400
+            else:
+                template, status = EC2_THROTTLE, 503
+            data = template.format(uuid.uuid4()).encode("utf-8")
+            return status, [("Content-Type", "text/xml")], data
+
+        conn = http.client.HTTPConnection(
+            self.upstream.hostname, self.upstream.port, timeout=60
+        )
+        try:
+            headers = {k: v for k, v in headers.items() if k.lower() not in HOP_HEADERS}
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            return response.status, response.getheaders(), response.read()
+        finally:
+            conn.close()
+
+
+def start_moto() -> Tuple[str, object]:
+    """Start an in-process moto server and return its URL and handle."""
+    from moto.server import ThreadedMotoServer
+
+    port = free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    return "http://127.0.0.1:{0}".format(port), server
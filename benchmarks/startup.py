@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Compare the time it takes to load the plugin through the lazy registry
+# with importing every resource module up front, like the plugin used to.
+#
+# Usage: python benchmarks/startup.py [runs]
+
+import subprocess
+import sys
+import time
+
+LAZY = """
+import importlib
+from nixops_aws.plugin import NixopsAWSPlugin
+for module in NixopsAWSPlugin.load():
+    importlib.import_module(module)
+"""
+
+EAGER = """
+import importlib
+import nixops_aws.registry
+for module, _, _, _, _ in nixops_aws.registry.RESOURCES:
+    importlib.import_module(module)
+"""
+
+
+def measure(code, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        timings.append(time.perf_counter() - start)
+    return min(timings), sorted(timings)[len(timings) // 2]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    baseline = measure("pass", runs)
+    print("{0:<8} {1:>10} {2:>10}".format("", "best (ms)", "median (ms)"))
+    for name, code in [("eager", EAGER), ("lazy", LAZY)]:
+        best, median = measure(code, runs)
+        print(
+            "{0:<8} {1:>10.1f} {2:>10.1f}".format(
+                name, (best - baseline[0]) * 1000, (median - baseline[1]) * 1000
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,10 @@
 # -*- coding: utf-8 -*-
 import re
 import time
+import functools
 import math
 import calendar
-import boto.ec2
-import boto.ec2.blockdevicemapping
-import boto.ec2.networkinterface
+import botocore.exceptions
 from nixops.backends import MachineDefinition, MachineState
 from nixops.nix_expr import Function, Call, RawValue
 import nixops_aws.resources.ec2_common
@@ -16,6 +15,8 @@ from nixops.util import (
     device_name_user_entered_to_stored,
 )
 import nixops_aws.ec2_utils
+import nixops_aws.route53_utils
+import nixops_aws.waiters
 import nixops.known_hosts
 import datetime
 from typing import Dict, Tuple, Any, Union, List
@@ -28,6 +29,68 @@ class EC2InstanceDisappeared(Exception):
     pass
 
 
+def _describe_instances(client, instance_ids):
+    """Describe the given instances, skipping the ones that don't exist."""
+    instances = {}
+    # Using a filter instead of instance IDs means unknown IDs are
+    # ignored rather than failing the whole request.
+    paginator = client.get_paginator("describe_instances")
+    for chunk in nixops_aws.ec2_utils.chunks(instance_ids, MAX_FILTER_VALUES):
+        for page in paginator.paginate(
+            Filters=[{"Name": "instance-id", "Values": chunk}]
+        ):
+            for reservation in page["Reservations"]:
+                for instance in reservation["Instances"]:
+                    instances[instance["InstanceId"]] = instance
+    return instances
+
+
+def _describe_spot_instance_requests(client, request_ids):
+    """Describe the given spot instance requests, skipping unknown ones."""
+    requests = {}
+    paginator = client.get_paginator("describe_spot_instance_requests")
+    for chunk in nixops_aws.ec2_utils.chunks(request_ids, MAX_FILTER_VALUES):
+        for page in paginator.paginate(
+            Filters=[{"Name": "spot-instance-request-id", "Values": chunk}]
+        ):
+            for request in page["SpotInstanceRequests"]:
+                requests[request["SpotInstanceRequestId"]] = request
+    return requests
+
+
+def _instance_state(instance):
+    return instance["State"]["Name"]
+
+
+def _instance_block_device_mapping(instance):
+    """Return the EBS block devices of an instance by device name."""
+    return {
+        dm["DeviceName"]: dm["Ebs"]
+        for dm in instance.get("BlockDeviceMappings", [])
+        if "Ebs" in dm
+    }
+
+
+def _aws_tags(tags):
+    return [{"Key": k, "Value": v} for k, v in tags.items()]
+
+
+# Maximum number of values of a single filter in a describe call.
+MAX_FILTER_VALUES = 200
+
+# How long (in seconds) a new spot instance request may be missing from
+# DescribeSpotInstanceRequests before it is considered gone.
+SPOT_REQUEST_VISIBILITY_TIMEOUT = 60
+
+INSTANCE_EVENT_CODES = [
+    "instance-reboot",
+    "system-reboot",
+    "system-maintenance",
+    "instance-retirement",
+    "instance-stop",
+]
+
+
 # name conventions:
 # device - device name that user enters: sd, xvd or nvme
 # device_stored - device name stored in db: sd or nvme
@@ -69,6 +132,7 @@ class EC2Definition(MachineDefinition):
             self.config.ec2.spotInstanceInterruptionBehavior
         )
         self.ebs_optimized = self.config.ec2.ebsOptimized
+        self.fast_snapshot_restore = self.config.ec2.fastSnapshotRestore
         self.subnet_id = self.config.ec2.subnetId
         self.associate_public_ip_address = self.config.ec2.associatePublicIpAddress
         self.use_private_ip_address = self.config.ec2.usePrivateIpAddress
@@ -159,9 +223,6 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
 
     def __init__(self, depl, name, id):
         super().__init__(depl, name, id)
-        self._conn = None
-        self._conn_vpc = None
-        self._conn_route53 = None
         self._conn_boto3 = None
         self._cached_instance = None
 
@@ -339,12 +400,6 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
             return m.private_ipv4
         return super().address_to(m)
 
-    def _connect(self):
-        if self._conn:
-            return self._conn
-        self._conn = nixops_aws.ec2_utils.connect(self.region, self.access_key_id)
-        return self._conn
-
     def _connect_boto3(self):
         if self._conn_boto3:
             return self._conn_boto3
@@ -353,45 +408,21 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
         )
         return self._conn_boto3
 
-    def _connect_vpc(self):
-        if self._conn_vpc:
-            return self._conn_vpc
-        self._conn_vpc = nixops_aws.ec2_utils.connect_vpc(
-            self.region, self.access_key_id
-        )
-        return self._conn_vpc
-
     def _connect_route53(self):
-        if self._conn_route53:
-            return self._conn_route53
-
-        # Get the secret access key from the environment or from ~/.ec2-keys.
-        (access_key_id, secret_access_key) = nixops_aws.ec2_utils.fetch_aws_secret_key(
-            self.route53_access_key_id
+        return nixops_aws.ec2_utils.get_boto3_client(
+            "route53", None, self.route53_access_key_id
         )
 
-        self._conn_route53 = boto.connect_route53(access_key_id, secret_access_key)
-        return self._conn_route53
-
     def _get_spot_instance_request_by_id(self, request_id, allow_missing=False):
         """Get spot instance request object by id."""
-        try:
-            result = self._connect().get_all_spot_instance_requests([request_id])
-        except boto.exception.EC2ResponseError as e:
-            if (
-                allow_missing
-                and e.error_code == "InvalidSpotInstanceRequestID.NotFound"
-            ):
-                result = []
-            else:
-                raise
-        if len(result) == 0:
-            if allow_missing:
-                return None
+        request = _describe_spot_instance_requests(
+            self._connect_boto3(), [request_id]
+        ).get(request_id)
+        if request is None and not allow_missing:
             raise EC2InstanceDisappeared(
                 "Spot instance request ‘{0}’ disappeared!".format(request_id)
             )
-        return result[0]
+        return request
 
     def _get_instance(self, instance_id=None, allow_missing=False, update=False):
         """Get instance object for this machine, with caching"""
@@ -400,55 +431,208 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
         assert instance_id
 
         if not self._cached_instance:
-            try:
-                instances = self._connect().get_only_instances([instance_id])
-            except boto.exception.EC2ResponseError as e:
-                if allow_missing and e.error_code == "InvalidInstanceID.NotFound":
-                    instances = []
-                else:
-                    raise
-            if len(instances) == 0:
+            if instance_id == self.vm_id:
+                # Describe the instances of all our peers at once; they
+                # will pick up their instance from the prefetch.
+                instance = self._prefetch("instances").get(
+                    instance_id,
+                    [m.vm_id for m in self._region_peers()],
+                    self._describe_instances,
+                )
+            else:
+                instance = self._describe_instances([instance_id]).get(instance_id)
+            if instance is None:
                 if allow_missing:
                     return None
                 raise EC2InstanceDisappeared(
                     "EC2 instance ‘{0}’ disappeared!".format(instance_id)
                 )
-            self._cached_instance = instances[0]
+            self._cached_instance = instance
 
         elif update:
-            self._cached_instance.update()
+            instance = self._describe_instances([instance_id]).get(instance_id)
+            if instance is None:
+                raise EC2InstanceDisappeared(
+                    "EC2 instance ‘{0}’ disappeared!".format(instance_id)
+                )
+            self._cached_instance = instance
 
-        if self._cached_instance.launch_time:
+        if self._cached_instance.get("LaunchTime"):
             self.start_time = calendar.timegm(
-                time.strptime(
-                    self._cached_instance.launch_time, "%Y-%m-%dT%H:%M:%S.000Z"
-                )
+                self._cached_instance["LaunchTime"].utctimetuple()
             )
 
         return self._cached_instance
 
+    def _region_peers(self):
+        """Return the EC2 machines of this deployment in our region and account."""
+        return [
+            m
+            for m in self.depl.active_resources.values()
+            if isinstance(m, EC2State)
+            and m.vm_id
+            and m.region == self.region
+            and m.access_key_id == self.access_key_id
+        ]
+
+    def _prefetch(self, kind):
+        return nixops_aws.ec2_utils.get_prefetch(
+            (kind, self.depl.uuid, self.region, self.access_key_id)
+        )
+
+    def _describe_instances(self, instance_ids):
+        return _describe_instances(self._connect_boto3(), instance_ids)
+
+    def _waiter(self, kind, describe):
+        region = self.region
+        access_key_id = self.access_key_id
+        return nixops_aws.waiters.get_waiter(
+            (kind, region, access_key_id),
+            lambda: functools.partial(
+                describe, nixops_aws.ec2_utils.connect_ec2_boto3(region, access_key_id),
+            ),
+        )
+
+    def _wait_for_instance(self, condition, instance_id=None, timeout=None):
+        """
+            Wait until ‘condition’ holds for our instance.  The instances of
+            all machines in the region are polled together.
+        """
+        instance_id = instance_id or self.vm_id
+        instance = self._waiter("instances", _describe_instances).wait(
+            instance_id, condition, timeout=timeout
+        )
+        if instance is not None and instance_id == self.vm_id:
+            self._cached_instance = instance
+        return instance
+
+    def _wait_for_spot_request(self, condition):
+        return self._waiter(
+            "spot-instance-requests", _describe_spot_instance_requests
+        ).wait(self.spot_instance_request_id, condition)
+
+    def _describe_instance_events(self, instance_ids):
+        """Get the scheduled events of all the instances in the region that have any."""
+        events = {}
+        paginator = self._connect_boto3().get_paginator("describe_instance_status")
+        for page in paginator.paginate(
+            Filters=[{"Name": "event.code", "Values": INSTANCE_EVENT_CODES}],
+            PaginationConfig={"PageSize": 1000},
+        ):
+            for ist in page["InstanceStatuses"]:
+                if ist.get("Events"):
+                    events[ist["InstanceId"]] = ist["Events"]
+        return events
+
+    def _describe_snapshots(self, snapshot_ids):
+        """Describe the given snapshots, skipping the ones that don't exist."""
+        snapshots = {}
+        paginator = self._connect_boto3().get_paginator("describe_snapshots")
+        for chunk in nixops_aws.ec2_utils.chunks(snapshot_ids, MAX_FILTER_VALUES):
+            for page in paginator.paginate(
+                Filters=[{"Name": "snapshot-id", "Values": chunk}]
+            ):
+                for snapshot in page["Snapshots"]:
+                    snapshots[snapshot["SnapshotId"]] = snapshot
+        return snapshots
+
+    def _describe_deployment_snapshots(self, machine_names):
+        """
+            Describe the snapshots of the given machines of this deployment
+            with one paginated call, returning them by machine name.
+        """
+        snapshots: Dict[str, Dict[str, Any]] = {name: {} for name in machine_names}
+        paginator = self._connect_boto3().get_paginator("describe_snapshots")
+        for page in paginator.paginate(
+            OwnerIds=["self"],
+            Filters=[{"Name": "tag:CharonNetworkUUID", "Values": [self.depl.uuid]}],
+        ):
+            for snapshot in page["Snapshots"]:
+                tags = {t["Key"]: t["Value"] for t in snapshot.get("Tags", [])}
+                name = tags.get("CharonMachineName")
+                if name in snapshots:
+                    snapshots[name][snapshot["SnapshotId"]] = snapshot
+        return snapshots
+
     def _get_snapshot_by_id(self, snapshot_id):
         """Get snapshot object by instance id."""
-        snapshots = self._connect().get_all_snapshots([snapshot_id])
-        if len(snapshots) != 1:
+        snapshot = self._describe_snapshots([snapshot_id]).get(snapshot_id)
+        if snapshot is None:
             raise Exception("unable to find snapshot ‘{0}’".format(snapshot_id))
-        return snapshots[0]
+        return snapshot
+
+    def _get_volume(self, volume_id, allow_missing=False):
+        volume = nixops_aws.ec2_utils.get_volumes_by_id(
+            self._connect_boto3(), [volume_id]
+        ).get(volume_id)
+        if volume is None and not allow_missing:
+            raise Exception("unable to find volume ‘{0}’".format(volume_id))
+        return volume
+
+    def _wait_for_volumes(self, volume_ids, states=["available"]):
+        nixops_aws.ec2_utils.wait_for_volumes_available(
+            self._connect_boto3(), volume_ids, self.logger, states=states
+        )
+
+    def _create_tags(self, resource_ids, tags):
+        self._retry(
+            lambda: self._connect_boto3().create_tags(
+                Resources=resource_ids, Tags=_aws_tags(tags)
+            )
+        )
+
+    def _create_volume(self, tags, **args):
+        """Create a volume in our zone.  Empty arguments are left out like boto did."""
+        args = {k: v for k, v in args.items() if v or k == "Encrypted"}
+        if tags:
+            args["TagSpecifications"] = [
+                {"ResourceType": "volume", "Tags": _aws_tags(tags)}
+            ]
+        return self._connect_boto3().create_volume(AvailabilityZone=self.zone, **args)
+
+    def _update_volume_tags(self, volume_tags):
+        """
+            Make sure the given volumes have the given tags.  Only the tags
+            that changed are set, and each tag that changed on several
+            volumes is set for all of them in the same call.
+        """
+        volumes = nixops_aws.ec2_utils.get_volumes_by_id(
+            self._connect_boto3(), list(volume_tags)
+        )
+        changed: Dict[Tuple[str, str], List[str]] = {}
+        for volume_id, tags in volume_tags.items():
+            current = {
+                t["Key"]: t["Value"] for t in volumes.get(volume_id, {}).get("Tags", [])
+            }
+            for k, v in tags.items():
+                if current.get(k) != v:
+                    changed.setdefault((k, v), []).append(volume_id)
+
+        calls: Dict[Tuple[str, ...], Dict[str, str]] = {}
+        for (k, v), volume_ids in changed.items():
+            calls.setdefault(tuple(sorted(volume_ids)), {})[k] = v
+        for volume_ids, tags in calls.items():
+            self._create_tags(list(volume_ids), tags)
 
     def _wait_for_ip(self):
         self.log_start("waiting for IP address... ")
 
         def _instance_ip_ready(ins):
             ready = True
-            if self.associate_public_ip_address and not ins.ip_address:
+            if self.associate_public_ip_address and not ins.get("PublicIpAddress"):
                 ready = False
-            if self.use_private_ip_address and not ins.private_ip_address:
+            if self.use_private_ip_address and not ins.get("PrivateIpAddress"):
                 ready = False
             return ready
 
-        while True:
-            instance = self._get_instance(update=True)
-            self.log_continue("[{0}] ".format(instance.state))
-            if instance.state not in {
+        def _instance_ready(ins):
+            if ins is None:
+                raise EC2InstanceDisappeared(
+                    "EC2 instance ‘{0}’ disappeared!".format(self.vm_id)
+                )
+            state = _instance_state(ins)
+            self.log_continue("[{0}] ".format(state))
+            if state not in {
                 "pending",
                 "running",
                 "scheduling",
@@ -457,24 +641,23 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
             }:
                 raise Exception(
                     "EC2 instance ‘{0}’ failed to start (state is ‘{1}’)".format(
-                        self.vm_id, instance.state
+                        self.vm_id, state
                     )
                 )
-            if instance.state != "running":
-                time.sleep(3)
-                continue
-            if _instance_ip_ready(instance):
-                break
-            time.sleep(3)
+            return state == "running" and _instance_ip_ready(ins)
+
+        instance = self._wait_for_instance(_instance_ready)
 
         self.log_end(
-            "{0} / {1}".format(instance.ip_address, instance.private_ip_address)
+            "{0} / {1}".format(
+                instance.get("PublicIpAddress"), instance.get("PrivateIpAddress")
+            )
         )
 
         with self.depl._db:
-            self.private_ipv4 = instance.private_ip_address
-            self.public_ipv4 = instance.ip_address
-            self.public_dns_name = instance.public_dns_name
+            self.private_ipv4 = instance.get("PrivateIpAddress")
+            self.public_ipv4 = instance.get("PublicIpAddress")
+            self.public_dns_name = instance.get("PublicDnsName")
             self.ssh_pinged = False
 
         nixops.known_hosts.update(
@@ -514,6 +697,19 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
         if not self.region:
             return {}
         backups: Dict[str, Dict[str, Union[str, List[str]]]] = {}
+        # The snapshots of all machines in the region are described at
+        # once; only snapshots that lack our tags are looked up by ID.
+        snapshots = self._prefetch("snapshots").get(
+            self.name,
+            [m.name for m in self._region_peers()],
+            self._describe_deployment_snapshots,
+        )
+        missing = sorted(
+            {snap for b in self.backups.values() for snap in b.values()}
+            - set(snapshots)
+        )
+        if missing:
+            snapshots = dict(snapshots, **self._describe_snapshots(missing))
         for b_id, b in self.backups.items():
             b = {device_name_stored_to_real(device): snap for device, snap in b.items()}
             backups[b_id] = {}
@@ -524,9 +720,9 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
 
                 snapshot_id = b.get(device_real, None)
                 if snapshot_id is not None:
-                    try:
-                        snapshot = self._get_snapshot_by_id(snapshot_id)
-                        snapshot_status = snapshot.update()
+                    snapshot = snapshots.get(snapshot_id)
+                    if snapshot is not None:
+                        snapshot_status = snapshot["Progress"]
                         info.append(
                             "progress[{0},{1},{2}] = {3}".format(
                                 self.name, device_real, snapshot_id, snapshot_status
@@ -534,9 +730,7 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                         )
                         if snapshot_status != "100%":
                             backup_status = "running"
-                    except boto.exception.EC2ResponseError as e:
-                        if e.error_code != "InvalidSnapshot.NotFound":
-                            raise
+                    else:
                         info.append(
                             "{0} - {1} - {2} - Snapshot has disappeared".format(
                                 self.name, device_real, snapshot_id
@@ -554,51 +748,114 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
             self.warn("backup {0} not found, skipping".format(backup_id))
         else:
             if not keep_physical:
+                snapshots = self._describe_snapshots(list(_backups[backup_id].values()))
                 for dev, snapshot_id in _backups[backup_id].items():
-                    snapshot = None
-                    try:
-                        snapshot = self._get_snapshot_by_id(snapshot_id)
-                    except Exception:
+                    if snapshot_id not in snapshots:
                         self.warn(
                             "snapshot {0} not found, skipping".format(snapshot_id)
                         )
-                    if snapshot is not None:
-                        self.log("removing snapshot {0}".format(snapshot_id))
-                        self._retry(lambda: snapshot.delete())
+                        continue
+                    self.log("removing snapshot {0}".format(snapshot_id))
+                    self._retry(
+                        lambda: self._connect_boto3().delete_snapshot(
+                            SnapshotId=snapshot_id
+                        )
+                    )
 
             _backups.pop(backup_id)
             self.backups = _backups
 
+    def _create_instance_snapshots(self, volume_ids, tags):
+        """
+            Snapshot the given volumes of our instance with a single
+            CreateSnapshots call, so that they are all captured at the same
+            moment.  Return the snapshot IDs by volume ID, or None if some of
+            the volumes are not attached to the instance.
+        """
+        if not self.vm_id:
+            return None
+        instance = self._describe_instances([self.vm_id]).get(self.vm_id)
+        if instance is None:
+            return None
+
+        mapping = _instance_block_device_mapping(instance)
+        attached = {ebs["VolumeId"] for ebs in mapping.values()}
+        if not set(volume_ids) <= attached:
+            return None
+        root = mapping.get(instance.get("RootDeviceName"), {}).get("VolumeId")
+
+        spec: Dict[str, Any] = {
+            "InstanceId": self.vm_id,
+            "ExcludeBootVolume": root not in volume_ids,
+        }
+        exclude = sorted(attached - set(volume_ids) - {root})
+        if exclude:
+            spec["ExcludeDataVolumeIds"] = exclude
+
+        response = self._retry(
+            lambda: self._connect_boto3().create_snapshots(
+                InstanceSpecification=spec,
+                TagSpecifications=[
+                    {"ResourceType": "snapshot", "Tags": _aws_tags(tags)}
+                ],
+            )
+        )
+        return {s["VolumeId"]: s["SnapshotId"] for s in response["Snapshots"]}
+
     def backup(self, defn, backup_id, devices=[]):
 
         self.log("backing up machine ‘{0}’ using id ‘{1}’".format(self.name, backup_id))
         backup = {}
         _backups = self.backups
 
+        volumes = {}
         for device_stored, v in self.block_device_mapping.items():
             device_real = device_name_stored_to_real(device_stored)
-
             if devices == [] or device_real in devices:
-                snapshot = self._retry(
-                    lambda: self._connect().create_snapshot(volume_id=v["volumeId"])
-                )
-                self.log(
-                    "+ created snapshot of volume ‘{0}’: ‘{1}’".format(
-                        v["volumeId"], snapshot.id
-                    )
-                )
+                volumes[device_stored] = v["volumeId"]
+
+        snapshot_tags = {}
+        snapshot_tags.update(defn.tags)
+        snapshot_tags.update(self.get_common_tags())
+
+        # Snapshot all volumes at once if they are attached to the
+        # instance, so that RAID sets and the like are consistent.
+        instance_tags = dict(snapshot_tags)
+        instance_tags["Name"] = "{0} - {2} [{1}]".format(
+            self.depl.name, self.name, backup_id
+        )
+        snapshots = (
+            self._create_instance_snapshots(list(volumes.values()), instance_tags)
+            if volumes
+            else None
+        )
 
-                snapshot_tags = {}
-                snapshot_tags.update(defn.tags)
-                snapshot_tags.update(self.get_common_tags())
+        for device_stored, volume_id in volumes.items():
+            if snapshots is not None:
+                snapshot_id = snapshots[volume_id]
+            else:
                 snapshot_tags["Name"] = "{0} - {3} [{1} - {2}]".format(
                     self.depl.name, self.name, device_stored, backup_id
                 )
 
-                self._retry(
-                    lambda: self._connect().create_tags([snapshot.id], snapshot_tags)
+                # Tag the snapshot as part of its creation.
+                snapshot_id = self._retry(
+                    lambda: self._connect_boto3().create_snapshot(
+                        VolumeId=volume_id,
+                        TagSpecifications=[
+                            {
+                                "ResourceType": "snapshot",
+                                "Tags": _aws_tags(snapshot_tags),
+                            }
+                        ],
+                    )
+                )["SnapshotId"]
+            self.log(
+                "+ created snapshot of volume ‘{0}’: ‘{1}’".format(
+                    volume_id, snapshot_id
                 )
-                backup[device_stored] = snapshot.id
+            )
+            backup[device_stored] = snapshot_id
 
         _backups[backup_id] = backup
         self.backups = _backups
@@ -611,76 +868,165 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
         for d in devices:
             self.log(" - {0}".format(d))
 
-        for device_stored, v in self.sorted_block_device_mapping():
-            device_real = device_name_stored_to_real(device_stored)
+        restore = [
+            (device_stored, v, self.backups[backup_id][device_stored])
+            for device_stored, v in self.sorted_block_device_mapping()
+            if devices == [] or device_name_stored_to_real(device_stored) in devices
+        ]
+        if not restore:
+            return
 
-            if devices == [] or device_real in devices:
-                # detach disks
-                volume = nixops_aws.ec2_utils.get_volume_by_id(
-                    self._connect(), v["volumeId"]
-                )
-                if volume and volume.update() == "in-use":
-                    self.log("detaching volume from ‘{0}’".format(self.name))
-                    volume.detach()
+        # Detach all disks first, so that they detach while the snapshots
+        # are being checked and the new volumes created.
+        volumes = nixops_aws.ec2_utils.get_volumes_by_id(
+            self._connect_boto3(), [v["volumeId"] for _, v, _ in restore]
+        )
+        old_volumes = {}
+        for device_stored, v, snapshot_id in restore:
+            volume = volumes.get(v["volumeId"])
+            if volume:
+                old_volumes[device_stored] = volume["VolumeId"]
+            if volume and volume["State"] == "in-use":
+                self.log("detaching volume from ‘{0}’".format(self.name))
+                self._connect_boto3().detach_volume(VolumeId=volume["VolumeId"])
+
+        snapshot_ids = sorted({snapshot_id for _, _, snapshot_id in restore})
+        self._wait_for_snapshots(snapshot_ids)
+        fast_restore = (
+            defn.fast_snapshot_restore
+            and self._enable_fast_snapshot_restores(snapshot_ids)
+        )
 
-                # attach backup disks
-                snapshot_id = self.backups[backup_id][device_stored]
+        new_volumes = {}
+        try:
+            if fast_restore:
+                self._wait_for_fast_snapshot_restores(snapshot_ids)
+            for device_stored, v, snapshot_id in restore:
                 self.log("creating volume from snapshot ‘{0}’".format(snapshot_id))
-
-                self.wait_for_snapshot_to_become_completed(snapshot_id)
-
-                new_volume = self._connect().create_volume(
-                    size=0, snapshot=snapshot_id, zone=self.zone
+                new_volumes[device_stored] = self._connect_boto3().create_volume(
+                    SnapshotId=snapshot_id, AvailabilityZone=self.zone
+                )["VolumeId"]
+        finally:
+            if fast_restore:
+                self._disable_fast_snapshot_restores(snapshot_ids)
+
+        # Check if the original volumes are available, aka detached from
+        # the machine, and if the new volumes are available.
+        self._wait_for_volumes(list(old_volumes.values()) + list(new_volumes.values()))
+
+        # Attach one by one in device order, which determines the NVMe
+        # device names on the instance.
+        to_delete = []
+        for device_stored, v, snapshot_id in restore:
+            device_real = device_name_stored_to_real(device_stored)
+            new_volume_id = new_volumes[device_stored]
+            self.log(
+                "attaching volume ‘{0}’ to ‘{1}’ as {2}".format(
+                    new_volume_id, self.name, device_real
                 )
+            )
 
-                # Check if original volume is available, aka detached from the machine.
-                if volume:
-                    nixops_aws.ec2_utils.wait_for_volume_available(
-                        self._connect(), volume.id, self.logger
-                    )
-
-                # Check if new volume is available.
-                nixops_aws.ec2_utils.wait_for_volume_available(
-                    self._connect(), new_volume.id, self.logger
-                )
+            device_that_boto_expects = device_name_to_boto_expected(
+                device_real
+            )  # boto expects only sd names
+            self._connect_boto3().attach_volume(
+                VolumeId=new_volume_id,
+                InstanceId=self.vm_id,
+                Device=device_that_boto_expects,
+            )
 
-                self.log(
-                    "attaching volume ‘{0}’ to ‘{1}’ as {2}".format(
-                        new_volume.id, self.name, device_real
-                    )
-                )
+            new_v = self.block_device_mapping[device_stored]
 
-                device_that_boto_expects = device_name_to_boto_expected(
-                    device_real
-                )  # boto expects only sd names
-                new_volume.attach(self.vm_id, device_that_boto_expects)
+            if (
+                v.get("partOfImage", False)
+                or v.get("charonDeleteOnTermination", False)
+                or v.get("deleteOnTermination", False)
+            ):
+                new_v["charonDeleteOnTermination"] = True
+                to_delete.append(v["volumeId"])
+            new_v["volumeId"] = new_volume_id
+            self.update_block_device_mapping(device_stored, new_v)
 
-                new_v = self.block_device_mapping[device_stored]
+        # The old volumes are already detached, so deleting them doesn't
+        # have to wait for anything.
+        for volume_id in to_delete:
+            self._delete_volume(volume_id, True)
 
-                if (
-                    v.get("partOfImage", False)
-                    or v.get("charonDeleteOnTermination", False)
-                    or v.get("deleteOnTermination", False)
-                ):
-                    new_v["charonDeleteOnTermination"] = True
-                    self._delete_volume(v["volumeId"], True)
-                new_v["volumeId"] = new_volume.id
-                self.update_block_device_mapping(device_stored, new_v)
+    def _wait_for_snapshots(self, snapshot_ids):
+        """Wait for snapshots to be completed, polling them all at once."""
 
-    def wait_for_snapshot_to_become_completed(self, snapshot_id):
         def check_completed():
-            res = self._get_snapshot_by_id(snapshot_id).status
-            self.log_continue("[{0}] ".format(res))
-            return res == "completed"
+            snapshots = self._describe_snapshots(snapshot_ids)
+            status = [
+                snapshots[i]["State"] if i in snapshots else "missing"
+                for i in snapshot_ids
+            ]
+            self.log_continue("[{0}] ".format(", ".join(sorted(set(status)))))
+            return all(s == "completed" for s in status)
 
         self.log_start(
-            "waiting for snapshot ‘{0}’ to have status ‘completed’... ".format(
-                snapshot_id
+            "waiting for {0} to have status ‘completed’... ".format(
+                "snapshot ‘{0}’".format(snapshot_ids[0])
+                if len(snapshot_ids) == 1
+                else "{0} snapshots".format(len(snapshot_ids))
             )
         )
         nixops.util.check_wait(check_completed)
         self.log_end("")
 
+    def _enable_fast_snapshot_restores(self, snapshot_ids):
+        """
+            Enable EBS fast snapshot restore for the given snapshots in our
+            zone.  Return False if fast snapshot restore is not available,
+            in which case the volumes are restored normally.
+        """
+        try:
+            self._connect_boto3().enable_fast_snapshot_restores(
+                AvailabilityZones=[self.zone], SourceSnapshotIds=snapshot_ids
+            )
+        except botocore.exceptions.ClientError as e:
+            self.warn(
+                "cannot use fast snapshot restore: {0}".format(
+                    e.response["Error"]["Message"]
+                )
+            )
+            return False
+        return True
+
+    def _wait_for_fast_snapshot_restores(self, snapshot_ids):
+        """
+            Wait until volumes created from the given snapshots in our zone
+            are fully initialized.
+        """
+        client = self._connect_boto3()
+
+        def check_enabled():
+            states = {}
+            paginator = client.get_paginator("describe_fast_snapshot_restores")
+            for page in paginator.paginate(
+                Filters=[
+                    {"Name": "snapshot-id", "Values": snapshot_ids},
+                    {"Name": "availability-zone", "Values": [self.zone]},
+                ]
+            ):
+                for fsr in page["FastSnapshotRestores"]:
+                    states[fsr["SnapshotId"]] = fsr["State"]
+            status = [states.get(i, "missing") for i in snapshot_ids]
+            self.log_continue("[{0}] ".format(", ".join(sorted(set(status)))))
+            return all(s == "enabled" for s in status)
+
+        self.log_start("waiting for fast snapshot restore to be enabled... ")
+        nixops.util.check_wait(check_enabled, max_tries=720)
+        self.log_end("")
+
+    def _disable_fast_snapshot_restores(self, snapshot_ids):
+        self._connect_boto3().disable_fast_snapshot_restores(
+            AvailabilityZones=[self.zone], SourceSnapshotIds=snapshot_ids
+        )
+
+    def wait_for_snapshot_to_become_completed(self, snapshot_id):
+        self._wait_for_snapshots([snapshot_id])
+
     def create_after(self, resources, defn):
         # EC2 instances can require key pairs, IAM roles, security
         # groups, EBS volumes and elastic IPs.  FIXME: only depend on
@@ -712,67 +1058,74 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
     def attach_volume(self, device_stored, volume_id):
         device_real = device_name_stored_to_real(device_stored)
 
-        volume = nixops_aws.ec2_utils.get_volume_by_id(self._connect(), volume_id)
+        def attachment(volume):
+            return volume["Attachments"][0] if volume["Attachments"] else {}
+
+        volume = self._get_volume(volume_id, allow_missing=True)
         if not volume:
             raise Exception(
                 "volume {0} doesn't exist, run check to update the state of the volume".format(
                     volume_id
                 )
             )
+        attached_to = attachment(volume).get("InstanceId")
         if (
-            volume.status == "in-use"
-            and self.vm_id != volume.attach_data.instance_id
+            volume["State"] == "in-use"
+            and self.vm_id != attached_to
             and self.depl.logger.confirm(
                 "volume ‘{0}’ is in use by instance ‘{1}’, "
                 "are you sure you want to attach this volume?".format(
-                    volume_id, volume.attach_data.instance_id
+                    volume_id, attached_to
                 )
             )
         ):
 
             self.log_start(
                 "detaching volume ‘{0}’ from instance ‘{1}’... ".format(
-                    volume_id, volume.attach_data.instance_id
+                    volume_id, attached_to
                 )
             )
-            volume.detach()
+            self._connect_boto3().detach_volume(VolumeId=volume_id)
 
             def check_available():
-                res = volume.update()
+                res = self._get_volume(volume_id)["State"]
                 self.log_continue("[{0}] ".format(res))
                 return res == "available"
 
             nixops.util.check_wait(check_available)
             self.log_end("")
 
-            if volume.update() != "available":
+            if self._get_volume(volume_id)["State"] != "available":
                 self.log(
                     "force detaching volume ‘{0}’ from instance ‘{1}’...".format(
-                        volume_id, volume.attach_data.instance_id
+                        volume_id, attached_to
                     )
                 )
-                volume.detach(True)
+                self._connect_boto3().detach_volume(VolumeId=volume_id, Force=True)
                 nixops.util.check_wait(check_available)
 
+            volume = self._get_volume(volume_id)
+
         self.log_start(
             "attaching volume ‘{0}’ as ‘{1}’... ".format(volume_id, device_real)
         )
 
-        if self.vm_id != volume.attach_data.instance_id:
+        if self.vm_id != attachment(volume).get("InstanceId"):
             # Attach it.
             device_that_boto_expects = device_name_to_boto_expected(device_stored)
-            self._connect().attach_volume(
-                volume_id, self.vm_id, device_that_boto_expects
+            self._connect_boto3().attach_volume(
+                VolumeId=volume_id,
+                InstanceId=self.vm_id,
+                Device=device_that_boto_expects,
             )
 
         def check_attached():
-            volume.update()
-            res = volume.attach_data.status
+            res = attachment(self._get_volume(volume_id)).get("State")
             self.log_continue("[{0}] ".format(res or "not-attached"))
             return res == "attached"
 
         # If volume is not in attached state, wait for it before going on.
-        if volume.attach_data.status != "attached":
+        if attachment(volume).get("State") != "attached":
             nixops.util.check_wait(check_attached)
 
         # Wait until the device is visible in the instance.
@@ -800,34 +1153,41 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
         # Assign or release an elastic IP address, if given.
         if (
             (self.elastic_ipv4 or "") != elastic_ipv4
-            or (instance.ip_address != elastic_ipv4)
+            or (instance.get("PublicIpAddress") != elastic_ipv4)
             or check
         ):
             if elastic_ipv4 != "":
                 # wait until machine is in running state
                 self.log_start("waiting for machine to be in running state... ")
-                while True:
-                    self.log_continue("[{0}] ".format(instance.state))
-                    if instance.state == "running":
-                        break
-                    if instance.state not in {"running", "pending"}:
+
+                def _instance_running(ins):
+                    if ins is None:
+                        raise EC2InstanceDisappeared(
+                            "EC2 instance ‘{0}’ disappeared!".format(self.vm_id)
+                        )
+                    state = _instance_state(ins)
+                    self.log_continue("[{0}] ".format(state))
+                    if state not in {"running", "pending"}:
                         raise Exception(
                             "EC2 instance ‘{0}’ failed to reach running state (state is ‘{1}’)".format(
-                                self.vm_id, instance.state
+                                self.vm_id, state
                             )
                         )
-                    time.sleep(3)
-                    instance = self._get_instance(update=True)
+                    return state == "running"
+
+                if _instance_state(instance) != "running":
+                    instance = self._wait_for_instance(_instance_running)
                 self.log_end("")
 
-                addresses = self._connect().get_all_addresses(addresses=[elastic_ipv4])
+                address = self._connect_boto3().describe_addresses(
+                    PublicIps=[elastic_ipv4]
+                )["Addresses"][0]
                 if (
-                    addresses[0].instance_id != ""
-                    and addresses[0].instance_id is not None
-                    and addresses[0].instance_id != self.vm_id
+                    address.get("InstanceId")
+                    and address["InstanceId"] != self.vm_id
                     and not self.depl.logger.confirm(
                         "are you sure you want to associate IP address ‘{0}’, which is currently in use by instance ‘{1}’?".format(
-                            elastic_ipv4, addresses[0].instance_id
+                            elastic_ipv4, address["InstanceId"]
                         )
                     )
                 ):
@@ -836,17 +1196,29 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                     )
                 else:
                     self.log("associating IP address ‘{0}’...".format(elastic_ipv4))
-                    addresses[0].associate(self.vm_id, allow_reassociation=True)
+                    if "AllocationId" in address:
+                        self._connect_boto3().associate_address(
+                            InstanceId=self.vm_id,
+                            AllocationId=address["AllocationId"],
+                            AllowReassociation=True,
+                        )
+                    else:
+                        self._connect_boto3().associate_address(
+                            InstanceId=self.vm_id, PublicIp=elastic_ipv4
+                        )
                     self.log_start(
                         "waiting for address to be associated with this machine... "
                     )
-                    instance = self._get_instance(update=True)
-                    while True:
-                        self.log_continue("[{0}] ".format(instance.ip_address))
-                        if instance.ip_address == elastic_ipv4:
-                            break
-                        time.sleep(3)
-                        instance = self._get_instance(update=True)
+
+                    def _address_associated(ins):
+                        if ins is None:
+                            raise EC2InstanceDisappeared(
+                                "EC2 instance ‘{0}’ disappeared!".format(self.vm_id)
+                            )
+                        self.log_continue("[{0}] ".format(ins.get("PublicIpAddress")))
+                        return ins.get("PublicIpAddress") == elastic_ipv4
+
+                    instance = self._wait_for_instance(_address_associated)
                     self.log_end("")
 
                 nixops.known_hosts.update(
@@ -859,14 +1231,21 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                     self.ssh_pinged = False
 
             elif self.elastic_ipv4 is not None:
-                addresses = self._connect().get_all_addresses(
-                    addresses=[self.elastic_ipv4]
-                )
-                if len(addresses) == 1 and addresses[0].instance_id == self.vm_id:
+                addresses = self._connect_boto3().describe_addresses(
+                    Filters=[{"Name": "public-ip", "Values": [self.elastic_ipv4]}]
+                )["Addresses"]
+                if len(addresses) == 1 and addresses[0].get("InstanceId") == self.vm_id:
                     self.log(
                         "disassociating IP address ‘{0}’...".format(self.elastic_ipv4)
                     )
-                    self._connect().disassociate_address(public_ip=self.elastic_ipv4)
+                    if "AssociationId" in addresses[0]:
+                        self._connect_boto3().disassociate_address(
+                            AssociationId=addresses[0]["AssociationId"]
+                        )
+                    else:
+                        self._connect_boto3().disassociate_address(
+                            PublicIp=self.elastic_ipv4
+                        )
                 else:
                     self.log(
                         "address ‘{0}’ was not associated with instance ‘{1}’".format(
@@ -882,9 +1261,14 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
     def security_groups_to_ids(self, subnetId, groups):
         sg_names = [g for g in groups if not g.startswith("sg-")]
         if sg_names != [] and subnetId != "":
-            vpc_id = self._connect_vpc().get_all_subnets([subnetId])[0].vpc_id
+            client = self._connect_boto3()
+            vpc_id = client.describe_subnets(SubnetIds=[subnetId])["Subnets"][0][
+                "VpcId"
+            ]
             groups = [
-                nixops_aws.ec2_utils.name_to_security_group(self._connect(), g, vpc_id)
+                nixops_aws.ec2_utils.name_to_security_group(
+                    self.region, self.access_key_id, g, vpc_id
+                )
                 for g in groups
             ]
 
@@ -897,14 +1281,23 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                 self.spot_instance_request_id
             )
         )
-        while True:
-            request = self._get_spot_instance_request_by_id(
-                self.spot_instance_request_id
-            )
-            self.log_continue("[{0}] ".format(request.status.code))
-            if request.status.code == "fulfilled":
-                break
-            if request.status.code in {
+
+        missing_since = []
+
+        def _request_fulfilled(req):
+            if req is None:
+                # A new request may not be visible yet.
+                if not missing_since:
+                    missing_since.append(time.time())
+                if time.time() - missing_since[0] < SPOT_REQUEST_VISIBILITY_TIMEOUT:
+                    return False
+                self.log_end("")
+                raise EC2InstanceDisappeared(
+                    "Spot instance request ‘{0}’ disappeared!".format(request_id)
+                )
+            code = req["Status"]["Code"]
+            self.log_continue("[{0}] ".format(code))
+            if code in {
                 "schedule-expired",
                 "canceled-before-fulfillment",
                 "bad-parameters",
@@ -913,15 +1306,15 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                 self.spot_instance_request_id = None
                 self.log_end("")
                 raise Exception(
-                    "spot instance request failed with result ‘{0}’".format(
-                        request.status.code
-                    )
+                    "spot instance request failed with result ‘{0}’".format(code)
                 )
-            time.sleep(3)
+            return code == "fulfilled"
+
+        request = self._wait_for_spot_request(_request_fulfilled)
         self.log_end("")
 
         instance = self._retry(
-            lambda: self._get_instance(instance_id=request.instance_id)
+            lambda: self._get_instance(instance_id=request["InstanceId"])
         )
 
         return instance
@@ -998,7 +1391,7 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
 
         if not defn.spot_instance_price:
             # On demand instance, no need to any more checks, return it.
-            return self._get_instance(reservation["Instances"][0]["InstanceId"])
+            return reservation["Instances"][0]
 
         with self.depl._db:
             self.spot_instance_price = defn.spot_instance_price
@@ -1009,9 +1402,7 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
         tags = {"Name": "{0} [{1}]".format(self.depl.description, self.name)}
         tags.update(defn.tags)
         tags.update(self.get_common_tags())
-        self._retry(
-            lambda: self._connect().create_tags([self.spot_instance_request_id], tags)
-        )
+        self._create_tags([self.spot_instance_request_id], tags)
 
         return self._wait_for_spot_request_fulfillment(self.spot_instance_request_id)
 
@@ -1029,29 +1420,29 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
             self.spot_instance_request_id, allow_missing=True
         )
         if request is not None:
-            request.cancel()
+            self._connect_boto3().cancel_spot_instance_requests(
+                SpotInstanceRequestIds=[self.spot_instance_request_id]
+            )
 
         # Wait until it's really cancelled. It's possible that the
         # request got fulfilled while we were cancelling it. In that
         # case, record the instance ID.
-        while True:
-            request = self._get_spot_instance_request_by_id(
-                self.spot_instance_request_id, allow_missing=True
-            )
-            if request is None:
-                break
-            self.log_continue("[{0}] ".format(request.status.code))
-            if request.instance_id is not None and request.instance_id != self.vm_id:
+        def _request_closed(req):
+            if req is None:
+                return True
+            self.log_continue("[{0}] ".format(req["Status"]["Code"]))
+            instance_id = req.get("InstanceId")
+            if instance_id is not None and instance_id != self.vm_id:
                 if self.vm_id is not None:
                     raise Exception(
                         "spot instance request got fulfilled unexpectedly as instance ‘{0}’".format(
-                            request.instance_id
+                            instance_id
                         )
                     )
-                self.vm_id = request.instance_id
-            if request.state != "open":
-                break
-            time.sleep(3)
+                self.vm_id = instance_id
+            return req["State"] != "open"
+
+        self._wait_for_spot_request(_request_closed)
 
         self.log_end("")
 
@@ -1075,14 +1466,13 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                 assert v.get("volumeId", None)
 
                 self.log("detaching device ‘{0}’...".format(device_real))
-                volumes = self._connect().get_all_volumes(
-                    [],
-                    filters={
-                        "attachment.instance-id": self.vm_id,
-                        "attachment.device": device_stored,
-                        "volume-id": v["volumeId"],
-                    },
-                )
+                volumes = self._connect_boto3().describe_volumes(
+                    Filters=[
+                        {"Name": "attachment.instance-id", "Values": [self.vm_id]},
+                        {"Name": "attachment.device", "Values": [device_stored]},
+                        {"Name": "volume-id", "Values": [v["volumeId"]]},
+                    ]
+                )["Volumes"]
                 assert len(volumes) <= 1
 
                 if len(volumes) == 1:
@@ -1106,15 +1496,12 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                         self.run_command(
                             "umount -l {0}".format(device_real), check=False
                         )
-                    if not self._connect().detach_volume(
-                        volumes[0].id, instance_id=self.vm_id, device=device_stored
-                    ):
-                        raise Exception(
-                            "unable to detach volume ‘{0}’ from EC2 machine ‘{1}’".format(
-                                v["volumeId"], self.name
-                            )
-                        )
-                        # FIXME: Wait until the volume is actually detached.
+                    self._connect_boto3().detach_volume(
+                        VolumeId=volumes[0]["VolumeId"],
+                        InstanceId=self.vm_id,
+                        Device=device_stored,
+                    )
+                    # FIXME: Wait until the volume is actually detached.
 
                 if v.get("charonDeleteOnTermination", False) or v.get(
                     "deleteOnTermination", False
@@ -1185,7 +1572,10 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
         if self.vm_id and check:
             instance = self._get_instance(allow_missing=True)
 
-            if instance is None or instance.state in {"shutting-down", "terminated"}:
+            if instance is None or _instance_state(instance) in {
+                "shutting-down",
+                "terminated",
+            }:
                 if not allow_recreate:
                     raise Exception(
                         "EC2 instance ‘{0}’ went away; use ‘--allow-recreate’ to create a new one".format(
@@ -1194,12 +1584,12 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                     )
                 self.log(
                     "EC2 instance went away (state ‘{0}’), will recreate".format(
-                        instance.state if instance else "gone"
+                        _instance_state(instance) if instance else "gone"
                     )
                 )
                 self._reset_state()
                 self.region = defn.region
-            elif instance.state == "stopped":
+            elif _instance_state(instance) == "stopped":
                 self.log("EC2 instance was stopped, restarting...")
 
                 # Modify the instance type, if desired.
@@ -1209,7 +1599,10 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                             self.instance_type, defn.instance_type
                         )
                     )
-                    instance.modify_attribute("instanceType", defn.instance_type)
+                    self._connect_boto3().modify_instance_attribute(
+                        InstanceId=self.vm_id,
+                        InstanceType={"Value": defn.instance_type},
+                    )
                     self.instance_type = defn.instance_type
 
                 if self.ebs_optimized != defn.ebs_optimized:
@@ -1218,14 +1611,18 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                             self.ebs_optimized, defn.ebs_optimized
                         )
                     )
-                    instance.modify_attribute("ebsOptimized", defn.ebs_optimized)
+                    self._connect_boto3().modify_instance_attribute(
+                        InstanceId=self.vm_id,
+                        EbsOptimized={"Value": defn.ebs_optimized},
+                    )
                     self.ebs_optimized = defn.ebs_optimized
 
                 # When we restart, we'll probably get a new IP.  So forget the current one.
                 self.public_ipv4 = None
                 self.private_ipv4 = None
 
-                instance.start()
+                self._connect_boto3().start_instances(InstanceIds=[self.vm_id])
+                self._cached_instance = None
 
                 self.state = self.STARTING
 
@@ -1245,16 +1642,14 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                 self.region = defn.region
 
             # Figure out whether this AMI is EBS-backed.
-            amis = self._connect_boto3().describe_images(ImageIds=[defn.ami])
+            amis = self._connect_boto3().describe_images(ImageIds=[defn.ami])["Images"]
             if len(amis) == 0:
                 raise Exception(
                     "AMI ‘{0}’ does not exist in region ‘{1}’".format(
                         defn.ami, self.region
                     )
                 )
-            ami = self._connect_boto3().describe_images(ImageIds=[defn.ami])["Images"][
-                0
-            ]
+            ami = amis[0]
             self.root_device_type = ami["RootDeviceType"]
 
             # Check if we need to resize the root disk
@@ -1318,13 +1713,19 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
             # If we're attaching any EBS volumes, then make sure that
             # we create the instance in the right placement zone.
             zone = defn.zone or None
+            volumes = nixops_aws.ec2_utils.get_volumes_by_id(
+                self._connect_boto3(),
+                [
+                    v["disk"]
+                    for v in defn.block_device_mapping.values()
+                    if v["disk"].startswith("vol-")
+                ],
+            )
             for device_stored, v in defn.block_device_mapping.items():
                 if not v["disk"].startswith("vol-"):
                     continue
                 # Make note of the placement zone of the volume.
-                volume = nixops_aws.ec2_utils.get_volume_by_id(
-                    self._connect(), v["disk"]
-                )
+                volume = volumes.get(v["disk"])
                 if not volume:
                     raise Exception(
                         "unable to start EC2 instance ‘{0}’ in because volume ‘{1}’ does not exist".format(
@@ -1334,14 +1735,14 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                 if not zone:
                     self.log(
                         "starting EC2 instance in zone ‘{0}’ due to volume ‘{1}’".format(
-                            volume.zone, v["disk"]
+                            volume["AvailabilityZone"], v["disk"]
                         )
                     )
-                    zone = volume.zone
-                elif zone != volume.zone:
+                    zone = volume["AvailabilityZone"]
+                elif zone != volume["AvailabilityZone"]:
                     raise Exception(
                         "unable to start EC2 instance ‘{0}’ in zone ‘{1}’ because volume ‘{2}’ is in zone ‘{3}’".format(
-                            self.name, zone, v["disk"], volume.zone
+                            self.name, zone, v["disk"], volume["AvailabilityZone"]
                         )
                     )
 
@@ -1372,14 +1773,14 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
             update_instance_profile = False
 
             with self.depl._db:
-                self.vm_id = instance.id
+                self.vm_id = instance["InstanceId"]
                 self.ami = defn.ami
                 self.instance_type = defn.instance_type
                 self.ebs_optimized = ebs_optimized
                 self.key_pair = defn.key_pair
                 self.security_groups = defn.security_groups
                 self.placement_group = defn.placement_group
-                self.zone = instance.placement
+                self.zone = instance["Placement"]["AvailabilityZone"]
                 self.tenancy = defn.tenancy
                 self.instance_profile = defn.instance_profile
                 self.client_token = None
@@ -1393,16 +1794,14 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
         # There is a short time window during which EC2 doesn't
         # know the instance ID yet.  So wait until it does.
         if self.state != self.UP or check:
-            while True:
-                if self._get_instance(allow_missing=True):
-                    break
+            if not self._get_instance(allow_missing=True):
                 self.log(
                     "EC2 instance ‘{0}’ not known yet, waiting...".format(self.vm_id)
                 )
-                time.sleep(3)
+                self._wait_for_instance(lambda ins: ins is not None)
 
         if not self.virtualization_type:
-            self.virtualization_type = self._get_instance().virtualization_type
+            self.virtualization_type = self._get_instance()["VirtualizationType"]
 
         instance = self._get_instance()
 
@@ -1425,7 +1824,7 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
             )
         if (
             not defn.subnet_id
-            and not instance.subnet_id
+            and not instance.get("SubnetId")
             and set(defn.security_groups) != set(self.security_groups)
         ):
             self.warn(
@@ -1435,23 +1834,25 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                 )
             )
 
-        instance_groups = [g.id for g in instance.groups]
+        instance_groups = [g["GroupId"] for g in instance["SecurityGroups"]]
         if defn.subnet_id:
             new_instance_groups = self.security_groups_to_ids(
                 defn.subnet_id, defn.security_group_ids
             )
-        elif instance.vpc_id:
+        elif instance.get("VpcId"):
             new_instance_groups = self.security_groups_to_ids(
-                instance.subnet_id, defn.security_groups
+                instance["SubnetId"], defn.security_groups
             )
 
-        if instance.vpc_id and set(instance_groups) != set(new_instance_groups):
+        if instance.get("VpcId") and set(instance_groups) != set(new_instance_groups):
             self.log(
                 "updating security groups from {0} to {1}...".format(
                     instance_groups, new_instance_groups
                 )
             )
-            instance.modify_attribute("groupSet", new_instance_groups)
+            self._connect_boto3().modify_instance_attribute(
+                InstanceId=self.vm_id, Groups=new_instance_groups
+            )
 
         if defn.placement_group != (self.placement_group or ""):
             self.warn(
@@ -1519,11 +1920,18 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
         common_tags = dict(defn.tags)  # Make mutable
         if defn.owners != []:
             common_tags["Owners"] = ", ".join(defn.owners)
-        self.update_tags(self.vm_id, user_tags=common_tags, check=check)
+        self.update_tags_using(
+            lambda tags: self._create_tags([self.vm_id], tags),
+            user_tags=common_tags,
+            check=check,
+        )
 
         # Reapply sourceDestCheck if it has changed.
         if self.source_dest_check != defn.source_dest_check:
-            instance.modify_attribute("sourceDestCheck", defn.source_dest_check)
+            self._connect_boto3().modify_instance_attribute(
+                InstanceId=self.vm_id,
+                SourceDestCheck={"Value": defn.source_dest_check},
+            )
             self.source_dest_check = defn.source_dest_check
 
         # Assign the elastic IP.  If necessary, dereference the resource.
@@ -1572,9 +1980,13 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
 
         # Add disks that were in the original device mapping of image.
         if self.first_boot:
-            for device_stored, dm in self._get_instance().block_device_mapping.items():
-                if device_stored not in self.block_device_mapping and dm.volume_id:
-                    bdm = {"volumeId": dm.volume_id, "partOfImage": True}
+            for device_stored, dm in _instance_block_device_mapping(
+                self._get_instance()
+            ).items():
+                if device_stored not in self.block_device_mapping and dm.get(
+                    "VolumeId"
+                ):
+                    bdm = {"volumeId": dm["VolumeId"], "partOfImage": True}
                     self.update_block_device_mapping(
                         device_stored, bdm
                     )  # TODO: it stores root device as sd though its really attached as nvme
@@ -1582,7 +1994,7 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
 
         # Detect if volumes were manually detached.  If so, reattach
         # them.
-        mapped_devices = self._get_instance().block_device_mapping.keys()
+        mapped_devices = _instance_block_device_mapping(self._get_instance()).keys()
 
         for device_stored, v in self.block_device_mapping.items():
             if (
@@ -1597,12 +2009,17 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                 self.update_block_device_mapping(device_stored, v)
 
         # Detect if volumes were manually destroyed.
+        existing_volumes = nixops_aws.ec2_utils.get_volumes_by_id(
+            self._connect_boto3(),
+            [
+                v["volumeId"]
+                for v in self.block_device_mapping.values()
+                if v.get("needsAttach", False)
+            ],
+        )
         for device_stored, v in self.block_device_mapping.items():
             if v.get("needsAttach", False):
-                volume = nixops_aws.ec2_utils.get_volume_by_id(
-                    self._connect(), v["volumeId"], allow_missing=True
-                )
-                if volume:
+                if v["volumeId"] in existing_volumes:
                     continue
                 if device_stored not in defn.block_device_mapping:
                     self.warn(
@@ -1625,7 +2042,18 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                     )
                 self.update_block_device_mapping(device_stored, None)
 
-        # Create missing volumes.
+        def get_volume_tags(device_real):
+            volume_tags = {}
+            volume_tags.update(common_tags)
+            volume_tags.update(defn.tags)
+            volume_tags["Name"] = "{0} [{1} - {2}]".format(
+                self.depl.description, self.name, device_real
+            )
+            return volume_tags
+
+        # Create missing volumes.  They are all created before waiting
+        # for any of them, and tagged as part of their creation.
+        created_volumes = []
         for device_stored, v in defn.block_device_mapping.items():
             device_real = device_name_stored_to_real(device_stored)
 
@@ -1635,14 +2063,14 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                     continue
                 self.log("creating EBS volume of {0} GiB...".format(v["size"]))
                 ebs_encrypt = v.get("encryptionType", "luks") == "ebs"
-                volume = self._connect().create_volume(
-                    size=v["size"],
-                    zone=self.zone,
-                    volume_type=v["volumeType"],
-                    iops=v["iops"],
-                    encrypted=ebs_encrypt,
+                volume = self._create_volume(
+                    get_volume_tags(device_real),
+                    Size=v["size"],
+                    VolumeType=v["volumeType"],
+                    Iops=v["iops"],
+                    Encrypted=ebs_encrypt,
                 )
-                v["volumeId"] = volume.id
+                v["volumeId"] = volume["VolumeId"]
 
             elif v["disk"].startswith("vol-"):
                 if device_stored in self.block_device_mapping:
@@ -1683,14 +2111,14 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                 if device_stored in self.block_device_mapping:
                     continue
                 self.log("creating volume from snapshot ‘{0}’...".format(v["disk"]))
-                volume = self._connect().create_volume(
-                    size=v["size"],
-                    snapshot=v["disk"],
-                    zone=self.zone,
-                    volume_type=v["volumeType"],
-                    iops=v["iops"],
+                volume = self._create_volume(
+                    get_volume_tags(device_real),
+                    Size=v["size"],
+                    SnapshotId=v["disk"],
+                    VolumeType=v["volumeType"],
+                    Iops=v["iops"],
                 )
-                v["volumeId"] = volume.id
+                v["volumeId"] = volume["VolumeId"]
 
             else:
                 if device_stored in self.block_device_mapping:
@@ -1711,18 +2139,20 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
             v["needsAttach"] = True
             self.update_block_device_mapping(device_stored, v)
 
-            # Wait for volume to get to available state for newly
-            # created volumes only (EC2 sometimes returns weird
-            # temporary states for newly created volumes, e.g. shortly
-            # in-use).  Doing this after updating the device mapping
-            # state, to make it recoverable in case an exception
-            # happens (e.g. in other machine's deployments).
             if volume:
-                nixops_aws.ec2_utils.wait_for_volume_available(
-                    self._connect(), volume.id, self.logger
-                )
+                created_volumes.append(volume["VolumeId"])
+
+        # Wait for volumes to get to available state for newly created
+        # volumes only (EC2 sometimes returns weird temporary states for
+        # newly created volumes, e.g. shortly in-use).  Doing this after
+        # updating the device mapping state, to make it recoverable in
+        # case an exception happens (e.g. in other machine's
+        # deployments).
+        if created_volumes:
+            self._wait_for_volumes(created_volumes)
 
         # Always apply tags to the volumes we just created.
+        volume_tags = {}
         for device_stored, v in self.block_device_mapping.items():
             device_real = device_name_stored_to_real(device_stored)
 
@@ -1738,15 +2168,8 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                 or "partOfImage" in v
             ):
                 continue
-            volume_tags = {}
-            volume_tags.update(common_tags)
-            volume_tags.update(defn.tags)
-            volume_tags["Name"] = "{0} [{1} - {2}]".format(
-                self.depl.description, self.name, device_real
-            )
-            self._retry(
-                lambda: self._connect().create_tags([v["volumeId"]], volume_tags)
-            )
+            volume_tags[v["volumeId"]] = get_volume_tags(device_real)
+        self._update_volume_tags(volume_tags)
 
         # Attach missing volumes.
 
@@ -1777,9 +2200,6 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
         )
 
     def _update_route53(self, defn):
-        import boto.route53
-        import boto.route53.record
-
         self.dns_hostname = defn.dns_hostname.lower()
         self.dns_ttl = defn.dns_ttl
         self.route53_access_key_id = (
@@ -1821,74 +2241,69 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
         )
 
         hosted_zone = ".".join(self.dns_hostname.split(".")[1:])
-        zones = self._retry_route53(
-            lambda: self._connect_route53().get_all_hosted_zones()
-        )
-
-        def testzone(hosted_zone, zone):
-            """returns True if there is a subcomponent match"""
-            hostparts = hosted_zone.split(".")
-            zoneparts = zone.Name.split(".")[:-1]  # strip the last ""
-
-            return hostparts[::-1][: len(zoneparts)][::-1] == zoneparts
-
-        zones = [
-            zone
-            for zone in zones["ListHostedZonesResponse"]["HostedZones"]
-            if testzone(hosted_zone, zone)
-        ]
-        if len(zones) == 0:
+        key = (self.depl.uuid, self.route53_access_key_id)
+
+        def list_zones():
+            zones = []
+            paginator = self._connect_route53().get_paginator("list_hosted_zones")
+            for page in paginator.paginate():
+                zones.extend(page["HostedZones"])
+            return zones
+
+        # Use the hosted zone with the longest match.
+        zone = nixops_aws.route53_utils.get_hosted_zones(
+            key, lambda: self._retry_route53(list_zones)
+        ).find(hosted_zone)
+        if zone is None:
             raise Exception("hosted zone for {0} not found".format(hosted_zone))
-
-        # use hosted zone with longest match
-        longest_zone = max(zones, key=lambda x: len(x.Name))
-        zoneid = longest_zone["Id"].split("/")[2]
+        zoneid = zone["Id"].split("/")[2]
         dns_name = "{0}.".format(self.dns_hostname)
 
-        prev_a_rrs = [
-            prev
-            for prev in self._retry_route53(
-                lambda: self._connect_route53().get_all_rrsets(
-                    hosted_zone_id=zoneid, type="A", name=dns_name
-                )
-            )
-            if prev.name == dns_name and prev.type == "A"
-        ]
-
-        prev_cname_rrs = [
-            prev
-            for prev in self._retry_route53(
-                lambda: self._connect_route53().get_all_rrsets(
-                    hosted_zone_id=zoneid, type="CNAME", name=self.dns_hostname
-                )
+        def list_rrsets():
+            rrsets = []
+            paginator = self._connect_route53().get_paginator(
+                "list_resource_record_sets"
             )
-            if prev.name == dns_name and prev.type == "CNAME"
-        ]
+            for page in paginator.paginate(HostedZoneId=zoneid):
+                rrsets.extend(page["ResourceRecordSets"])
+            return rrsets
 
-        changes = boto.route53.record.ResourceRecordSets(
-            connection=self._connect_route53(), hosted_zone_id=zoneid
+        records = nixops_aws.route53_utils.get_record_sets(
+            key + (zoneid,), lambda: self._retry_route53(list_rrsets)
         )
-        if len(prev_a_rrs) > 0:
-            for prevrr in prev_a_rrs:
-                change = changes.add_change(
-                    "DELETE", self.dns_hostname, "A", ttl=prevrr.ttl
-                )
-                change.add_value(",".join(prevrr.resource_records))
-        if len(prev_cname_rrs) > 0:
-            for prevrr in prev_cname_rrs:
-                change = changes.add_change(
-                    "DELETE", prevrr.name, "CNAME", ttl=prevrr.ttl
-                )
-                change.add_value(",".join(prevrr.resource_records))
 
-        change = changes.add_change(
-            "CREATE", self.dns_hostname, record_type, ttl=self.dns_ttl
-        )
-        change.add_value(dns_value)
-        # add InvalidChangeBatch to error codes to retry on. Unfortunately AWS sometimes returns
-        # this due to eventual consistency
-        self._retry_route53(
-            lambda: changes.commit(), error_codes=["InvalidChangeBatch"]
+        def change():
+            changes = [
+                {"Action": "DELETE", "ResourceRecordSet": prev}
+                for prev in records.get(dns_name)
+                if prev["Type"] in {"A", "CNAME"}
+            ]
+            changes.append(
+                {
+                    "Action": "CREATE",
+                    "ResourceRecordSet": {
+                        "Name": dns_name,
+                        "Type": record_type,
+                        "TTL": self.dns_ttl,
+                        "ResourceRecords": [{"Value": dns_value}],
+                    },
+                }
+            )
+            try:
+                nixops_aws.route53_utils.get_change_batcher(
+                    self.route53_access_key_id, zoneid
+                ).submit(changes, retry=self._retry_route53)
+            except botocore.exceptions.ClientError:
+                # Our view of the zone may be out of date.
+                records.invalidate()
+                raise
+            records.apply(changes)
+
+        # Retry on InvalidChangeBatch, which AWS unfortunately sometimes
+        # returns due to eventual consistency.  Throttling is already
+        # retried by the change batcher.
+        nixops_aws.ec2_utils.retry(
+            change, error_codes=["InvalidChangeBatch"], logger=self, always_retry=False
         )
 
     def _delete_volume(self, volume_id, allow_keep=False):
@@ -1900,13 +2315,13 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
             else:
                 raise Exception("not destroying EBS volume ‘{0}’".format(volume_id))
         self.log("destroying EBS volume ‘{0}’...".format(volume_id))
-        volume = nixops_aws.ec2_utils.get_volume_by_id(
-            self._connect(), volume_id, allow_missing=True
-        )
+        volume = self._get_volume(volume_id, allow_missing=True)
         if not volume:
             return
-        nixops.util.check_wait(lambda: volume.update() == "available")
-        volume.delete()
+        nixops.util.check_wait(
+            lambda: self._get_volume(volume_id)["State"] == "available"
+        )
+        self._connect_boto3().delete_volume(VolumeId=volume_id)
 
     def destroy(self, wipe=False):
         self._cancel_spot_request()
@@ -1931,22 +2346,29 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
         if self.vm_id:
             instance = self._get_instance(allow_missing=True)
         else:
-            reservations = self._connect().get_all_instances(
-                filters={"client-token": self.client_token}
-            )
+            reservations = self._connect_boto3().describe_instances(
+                Filters=[{"Name": "client-token", "Values": [self.client_token]}]
+            )["Reservations"]
             if len(reservations) > 0:
-                instance = reservations[0].instances[0]
+                instance = reservations[0]["Instances"][0]
 
         if instance:
-            instance.terminate()
+            self._connect_boto3().terminate_instances(
+                InstanceIds=[instance["InstanceId"]]
+            )
 
             # Wait until it's really terminated.
-            while True:
-                self.log_continue("[{0}] ".format(instance.state))
-                if instance.state == "terminated":
-                    break
-                time.sleep(3)
-                instance = self._get_instance(update=True)
+            def _instance_terminated(ins):
+                if ins is None:
+                    return True
+                self.log_continue("[{0}] ".format(_instance_state(ins)))
+                return _instance_state(ins) == "terminated"
+
+            self.log_continue("[{0}] ".format(_instance_state(instance)))
+            if _instance_state(instance) != "terminated":
+                self._wait_for_instance(
+                    _instance_terminated, instance_id=instance["InstanceId"]
+                )
 
         self.log_end("")
 
@@ -1972,42 +2394,46 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
 
         self.log_start("stopping EC2 machine... ")
 
-        instance = self._get_instance()
-        instance.stop()  # no-op if the machine is already stopped
+        # no-op if the machine is already stopped
+        self._connect_boto3().stop_instances(InstanceIds=[self.vm_id])
 
         self.state = self.STOPPING
 
         # Wait until it's really stopped.
-        def check_stopped():
-            instance = self._get_instance(update=True)
-            self.log_continue("[{0}] ".format(instance.state))
-            if instance.state == "stopped":
+        def check_stopped(ins):
+            if ins is None:
+                raise EC2InstanceDisappeared(
+                    "EC2 instance ‘{0}’ disappeared!".format(self.vm_id)
+                )
+            state = _instance_state(ins)
+            self.log_continue("[{0}] ".format(state))
+            if state == "stopped":
                 return True
-            if instance.state not in {"running", "stopping"}:
+            if state not in {"running", "stopping"}:
                 raise Exception(
                     "EC2 instance ‘{0}’ failed to stop (state is ‘{1}’)".format(
-                        self.vm_id, instance.state
+                        self.vm_id, state
                     )
                 )
             return False
 
-        if not nixops.util.check_wait(
-            check_stopped, initial=3, max_tries=300, exception=False
-        ):  # = 15 min
+        try:
+            self._wait_for_instance(check_stopped, timeout=15 * 60)
+        except nixops_aws.waiters.WaitTimeout:
             # If stopping times out, then do an unclean shutdown.
             self.log_end("(timed out)")
             self.log_start("force-stopping EC2 machine... ")
-            instance.stop(force=True)
-            if not nixops.util.check_wait(
-                check_stopped, initial=3, max_tries=100, exception=False
-            ):  # = 5 min
+            self._connect_boto3().stop_instances(InstanceIds=[self.vm_id], Force=True)
+            try:
+                self._wait_for_instance(check_stopped, timeout=5 * 60)
+            except nixops_aws.waiters.WaitTimeout:
                 # Amazon docs suggest doing a force stop twice...
                 self.log_end("(timed out)")
                 self.log_start("force-stopping EC2 machine... ")
-                instance.stop(force=True)
-                nixops.util.check_wait(
-                    check_stopped, initial=3, max_tries=100
-                )  # = 5 min
+                self._connect_boto3().stop_instances(
+                    InstanceIds=[self.vm_id], Force=True
+                )
+                self._wait_for_instance(check_stopped, timeout=5 * 60)
 
         self.log_end("")
 
@@ -2020,8 +2446,9 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
 
         self.log("starting EC2 machine...")
 
-        instance = self._get_instance()
-        instance.start()  # no-op if the machine is already started
+        # no-op if the machine is already started
+        self._connect_boto3().start_instances(InstanceIds=[self.vm_id])
+        self._cached_instance = None
 
         self.state = self.STARTING
 
@@ -2052,30 +2479,31 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
             return
 
         instance = self._get_instance(allow_missing=True)
-        # self.log("instance state is ‘{0}’".format(instance.state if instance else "gone"))
+        # self.log("instance state is ‘{0}’".format(_instance_state(instance) if instance else "gone"))
 
-        if instance is None or instance.state in {"shutting-down", "terminated"}:
+        state = _instance_state(instance) if instance else None
+        if instance is None or state in {"shutting-down", "terminated"}:
             self.state = self.MISSING
             self.vm_id = None
             return
 
         res.exists = True
-        if instance.state == "pending":
+        if state == "pending":
             res.is_up = False
             self.state = self.STARTING
 
-        elif instance.state == "running":
+        elif state == "running":
             res.is_up = True
 
             res.disks_ok = True
+            block_device_mapping = _instance_block_device_mapping(instance)
+            mapped_devices = block_device_mapping.keys()
             for device_stored, v in self.block_device_mapping.items():
                 device_real = device_name_stored_to_real(device_stored)
                 device_that_boto_expects = device_name_to_boto_expected(
                     device_real
                 )  # boto expects only sd names
 
-                mapped_devices = instance.block_device_mapping.keys()
-
                 if (
                     device_that_boto_expects not in mapped_devices
                     and device_real not in mapped_devices
@@ -2087,17 +2515,15 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                             v["volumeId"], device_real
                         )
                     )
-                    volume = nixops_aws.ec2_utils.get_volume_by_id(
-                        self._connect(), v["volumeId"], allow_missing=True
-                    )
+                    volume = self._get_prefetched_volume(self.region, v["volumeId"])
                     if not volume:
                         res.messages.append(
                             "volume ‘{0}’ no longer exists".format(v["volumeId"])
                         )
 
                 if (
-                    device_that_boto_expects in instance.block_device_mapping.keys()
-                    and instance.block_device_mapping[device_that_boto_expects].status
+                    device_that_boto_expects in mapped_devices
+                    and block_device_mapping[device_that_boto_expects]["Status"]
                     != "attached"
                 ):
                     res.disks_ok = False
@@ -2105,45 +2531,43 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                         "volume ‘{0}’ on device ‘{1}’ has unexpected state: ‘{2}’".format(
                             v["volumeId"],
                             device_real,
-                            instance.block_device_mapping[device_stored].status,
+                            block_device_mapping[device_that_boto_expects]["Status"],
                         )
                     )
 
-            if (
-                self.private_ipv4 != instance.private_ip_address
-                or self.public_ipv4 != instance.ip_address
-            ):
+            private_ipv4 = instance.get("PrivateIpAddress")
+            public_ipv4 = instance.get("PublicIpAddress")
+            if self.private_ipv4 != private_ipv4 or self.public_ipv4 != public_ipv4:
                 self.warn("IP address has changed, you may need to run ‘nixops deploy’")
-                self.private_ipv4 = instance.private_ip_address
-                self.public_ipv4 = instance.ip_address
+                self.private_ipv4 = private_ipv4
+                self.public_ipv4 = public_ipv4
 
             super()._check(res)
 
-        elif instance.state == "stopping":
+        elif state == "stopping":
             res.is_up = False
             self.state = self.STOPPING
 
-        elif instance.state == "stopped":
+        elif state == "stopped":
             res.is_up = False
             self.state = self.STOPPED
 
         # check for scheduled events
-        instance_status = self._connect().get_all_instance_status(
-            instance_ids=[instance.id]
+        events = self._prefetch("instance-events").get(
+            instance["InstanceId"],
+            [m.vm_id for m in self._region_peers()],
+            self._describe_instance_events,
         )
-        for ist in instance_status:
-            if ist.events:
-                for e in ist.events:
-                    res.messages.append("Event ‘{0}’:".format(e.code))
-                    res.messages.append("  * {0}".format(e.description))
-                    res.messages.append(
-                        "  * {0} - {1}".format(e.not_before, e.not_after)
-                    )
+        for e in events or []:
+            res.messages.append("Event ‘{0}’:".format(e["Code"]))
+            res.messages.append("  * {0}".format(e["Description"]))
+            res.messages.append(
+                "  * {0} - {1}".format(e.get("NotBefore"), e.get("NotAfter"))
+            )
 
     def reboot(self, hard=False):
         self.log("rebooting EC2 machine...")
-        instance = self._get_instance()
-        instance.reboot()
+        self._connect_boto3().reboot_instances(InstanceIds=[self.vm_id])
         self.state = self.STARTING
 
     def get_console_output(self):
@@ -2154,7 +2578,10 @@ class EC2State(MachineState[EC2Definition], EC2CommonState):
                 )
             )
         return (
-            self._connect().get_console_output(self.vm_id).output or "(not available)"
+            self._connect_boto3()
+            .get_console_output(InstanceId=self.vm_id)
+            .get("Output")
+            or "(not available)"
         )
 
     def next_charge_time(self):
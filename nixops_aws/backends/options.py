@@ -56,6 +56,7 @@ class Ec2Options(ResourceOptions):
     ebsInitialRootDiskSize: int
     ebsOptimized: bool
     elasticIPv4: str
+    fastSnapshotRestore: bool
     instanceId: str
     instanceProfile: str
     instanceType: str
@@ -1,51 +1,134 @@
 # -*- coding: utf-8 -*-
 
+import json
 import os
 import time
 import random
+import threading
 import nixops.util
+import nixops_aws.metrics
 import boto3
+import botocore.config
 import boto.ec2
 import boto.vpc
+import boto.regioninfo
+import urllib.parse
 from boto.exception import EC2ResponseError
 from boto.exception import SQSError
 from boto.exception import BotoServerError
 from botocore.exceptions import ClientError
 from boto.pyami.config import Config
-from typing import Tuple, TYPE_CHECKING, Iterable, Any, Optional
+from typing import (
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Tuple,
+    TYPE_CHECKING,
+    Iterable,
+    Any,
+    Optional,
+)
 
 if TYPE_CHECKING:
     import mypy_boto3_rds
 
+# Size of the HTTP connection pool of each shared boto3 client.  Clients
+# are shared by every resource of a deployment that uses the same
+# service, region and credentials, so this bounds the number of
+# concurrent requests they can make without blocking on the pool.
+MAX_POOL_CONNECTIONS = 50
+
+
+_credentials_lock = threading.Lock()
+_credential_files: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+_credentials: Dict[Tuple[Any, ...], Tuple[str, str]] = {}
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _parse_credential_file(path: str, stamp: Tuple[int, int], parse) -> Any:
+    """Parse a credential file, at most once per version of the file."""
+    with _credentials_lock:
+        cached = _credential_files.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    parsed = parse(path)
+    with _credentials_lock:
+        _credential_files[path] = (stamp, parsed)
+    return parsed
+
+
+def _read_ec2_keys(path):
+    with open(path, "r") as f:
+        contents = f.read()
+    keys = []
+    for line in contents.splitlines():
+        line = line.split("#")[0]  # drop comments
+        w = line.split()
+        if len(w) < 2 or len(w) > 3:
+            continue
+        keys.append(w)
+    return keys
+
 
 def fetch_aws_secret_key(access_key_id) -> Tuple[str, str]:
     """
         Fetch the secret access key corresponding to the given access key ID from ~/.ec2-keys,
         or from ~/.aws/credentials, or from the environment (in that priority).
+
+        The result is memoized on the access key ID and the modification
+        times of both files, so they are only re-read when they change.
     """
 
+    ec2_keys_path = os.path.expanduser("~/.ec2-keys")
+    aws_credentials_path = os.path.expanduser(
+        os.getenv("AWS_SHARED_CREDENTIALS_FILE", "~/.aws/credentials")
+    )
+    ec2_keys_stamp = (
+        _file_stamp(ec2_keys_path) if os.path.isfile(ec2_keys_path) else None
+    )
+    aws_credentials_stamp = _file_stamp(aws_credentials_path)
+    env_secret = os.environ.get("EC2_SECRET_KEY") or os.environ.get(
+        "AWS_SECRET_ACCESS_KEY"
+    )
+
+    cache_key = (
+        access_key_id,
+        ec2_keys_path,
+        ec2_keys_stamp,
+        aws_credentials_path,
+        aws_credentials_stamp,
+        env_secret,
+    )
+    with _credentials_lock:
+        cached = _credentials.get(cache_key)
+    if cached is not None:
+        return cached
+
     def parse_ec2_keys():
-        path = os.path.expanduser("~/.ec2-keys")
-        if os.path.isfile(path):
-            with open(path, "r") as f:
-                contents = f.read()
-                for line in contents.splitlines():
-                    line = line.split("#")[0]  # drop comments
-                    w = line.split()
-                    if len(w) < 2 or len(w) > 3:
-                        continue
-                    if len(w) == 3 and w[2] == access_key_id:
-                        return (w[0], w[1])
-                    if w[0] == access_key_id:
-                        return (access_key_id, w[1])
+        if ec2_keys_stamp is None:
+            return None
+        for w in _parse_credential_file(ec2_keys_path, ec2_keys_stamp, _read_ec2_keys):
+            if len(w) == 3 and w[2] == access_key_id:
+                return (w[0], w[1])
+            if w[0] == access_key_id:
+                return (access_key_id, w[1])
         return None
 
     def parse_aws_credentials():
-        path = os.getenv("AWS_SHARED_CREDENTIALS_FILE", "~/.aws/credentials")
-        if not os.path.exists(os.path.expanduser(path)):
+        if aws_credentials_stamp is None:
             return None
 
-        conf = Config(os.path.expanduser(path))
+        conf = _parse_credential_file(
+            aws_credentials_path, aws_credentials_stamp, Config
+        )
 
         if access_key_id == conf.get("default", "aws_access_key_id"):
             return (access_key_id, conf.get("default", "aws_secret_access_key"))
@@ -55,10 +138,7 @@ def fetch_aws_secret_key(access_key_id) -> Tuple[str, str]:
         )
 
     def ec2_keys_from_env():
-        return (
-            access_key_id,
-            os.environ.get("EC2_SECRET_KEY") or os.environ.get("AWS_SECRET_ACCESS_KEY"),
-        )
+        return (access_key_id, env_secret)
 
     sources = (
         get_credentials()
@@ -78,128 +158,437 @@ def fetch_aws_secret_key(access_key_id) -> Tuple[str, str]:
             )
         )
 
+    with _credentials_lock:
+        _credentials[cache_key] = credentials
     return credentials
 
 
+def _client_config() -> botocore.config.Config:
+    try:
+        return botocore.config.Config(
+            max_pool_connections=MAX_POOL_CONNECTIONS, tcp_keepalive=True
+        )
+    except TypeError:
+        # botocore < 1.27 doesn't know about tcp_keepalive; HTTP keep-alive
+        # is still provided by the connection pool.
+        return botocore.config.Config(max_pool_connections=MAX_POOL_CONNECTIONS)
+
+
+def _endpoint_url() -> Optional[str]:
+    # Send all requests to a single endpoint instead of AWS, e.g. a local
+    # fake such as the one used by benchmarks/deploy.py.
+    return os.environ.get("NIXOPS_AWS_ENDPOINT_URL") or None
+
+
+def _connect_boto_endpoint(cls, region, endpoint, access_key_id, secret_access_key):
+    url = urllib.parse.urlsplit(endpoint)
+    return cls(
+        region=boto.regioninfo.RegionInfo(name=region, endpoint=url.hostname),
+        port=url.port,
+        is_secure=url.scheme == "https",
+        aws_access_key_id=access_key_id,
+        aws_secret_access_key=secret_access_key,
+    )
+
+
+_boto3_lock = threading.Lock()
+_boto3_session: Optional[boto3.session.Session] = None
+_boto3_clients: Dict[Tuple[str, Optional[str], str, str], Any] = {}
+
+
+def _get_boto3_session() -> boto3.session.Session:
+    # Must be called with _boto3_lock held: boto3 sessions are not
+    # thread-safe, the clients created from them are.
+    global _boto3_session
+    if _boto3_session is None:
+        _boto3_session = boto3.session.Session()
+    return _boto3_session
+
+
+def get_boto3_client(service: str, region: Optional[str], access_key_id) -> Any:
+    """
+        Return a boto3 client for the given service, region and access key.
+
+        Clients are cached for the lifetime of the process and shared
+        between all resources (and threads) using the same credentials, so
+        the service model is only loaded once and HTTP connections are
+        reused.  A region of None selects the default endpoint of global
+        services such as Route53 and IAM.
+    """
+    (access_key_id, secret_access_key) = fetch_aws_secret_key(access_key_id)
+    key = (service, region, access_key_id, secret_access_key)
+    with _boto3_lock:
+        client = _boto3_clients.get(key)
+        if client is None:
+            client = _get_boto3_session().client(
+                service,
+                region_name=region,
+                aws_access_key_id=access_key_id,
+                aws_secret_access_key=secret_access_key,
+                endpoint_url=_endpoint_url(),
+                config=_client_config(),
+            )
+            nixops_aws.metrics.instrument_boto3(client)
+            _boto3_clients[key] = client
+    return client
+
+
 def connect(region, access_key_id):
     """Connect to the specified EC2 region using the given access key."""
     assert region
     (access_key_id, secret_access_key) = fetch_aws_secret_key(access_key_id)
-    conn = boto.ec2.connect_to_region(
-        region_name=region,
-        aws_access_key_id=access_key_id,
-        aws_secret_access_key=secret_access_key,
-    )
+    endpoint = _endpoint_url()
+    if endpoint:
+        conn = _connect_boto_endpoint(
+            boto.ec2.connection.EC2Connection,
+            region,
+            endpoint,
+            access_key_id,
+            secret_access_key,
+        )
+    else:
+        conn = boto.ec2.connect_to_region(
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+        )
     if not conn:
         raise Exception("invalid EC2 region ‘{0}’".format(region))
-    return conn
+    return nixops_aws.metrics.instrument_boto(conn, "ec2", region)
 
 
 def connect_ec2_boto3(region, access_key_id):
     assert region
-    (access_key_id, secret_access_key) = fetch_aws_secret_key(access_key_id)
-    client = boto3.session.Session().client(
-        "ec2",
-        region_name=region,
-        aws_access_key_id=access_key_id,
-        aws_secret_access_key=secret_access_key,
-    )
-    return client
+    return get_boto3_client("ec2", region, access_key_id)
 
 
 def connect_vpc(region, access_key_id):
     """Connect to the specified VPC region using the given access key."""
     assert region
     (access_key_id, secret_access_key) = fetch_aws_secret_key(access_key_id)
-    conn = boto.vpc.connect_to_region(
-        region_name=region,
-        aws_access_key_id=access_key_id,
-        aws_secret_access_key=secret_access_key,
-    )
+    endpoint = _endpoint_url()
+    if endpoint:
+        conn = _connect_boto_endpoint(
+            boto.vpc.VPCConnection, region, endpoint, access_key_id, secret_access_key
+        )
+    else:
+        conn = boto.vpc.connect_to_region(
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+        )
     if not conn:
         raise Exception("invalid VPC region ‘{0}’".format(region))
-    return conn
+    return nixops_aws.metrics.instrument_boto(conn, "ec2", region)
 
 
 def connect_rds_boto3(region, access_key_id) -> "mypy_boto3_rds.RDSClient":
     assert region
-    (access_key_id, secret_access_key) = fetch_aws_secret_key(access_key_id)
-    client = boto3.session.Session().client(
-        "rds",
-        region_name=region,
-        aws_access_key_id=access_key_id,
-        aws_secret_access_key=secret_access_key,
-    )
-    return client
+    return get_boto3_client("rds", region, access_key_id)
+
+
+class Prefetch:
+    """
+        Results of a bulk describe call, shared by the resources of a deployment.
+
+        The first resource that asks for an item describes the items of all
+        its peers in one go; the peers then pick up their item from here
+        instead of making their own call.  Items are handed out once and
+        expire after ‘max_age’ seconds, so any later lookup goes back to
+        the API and sees fresh data.
+    """
+
+    def __init__(self, max_age: float = 30) -> None:
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._items: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(
+        self,
+        item_id: Hashable,
+        peer_ids: Iterable[Hashable],
+        describe: Callable[[List[Any]], Dict[Hashable, Any]],
+    ) -> Any:
+        """
+            Return the item with the given ID, or None if it doesn't exist.
+            ‘describe’ is called with the IDs of the item and its peers that
+            have no pending result, and returns the items it found by ID.
+        """
+        with self._lock:
+            now = time.time()
+            entry = self._items.pop(item_id, None)
+            if entry is not None and now - entry[0] <= self.max_age:
+                return entry[1]
+
+            ids = [item_id] + [
+                i
+                for i in set(peer_ids)
+                if i != item_id
+                and (i not in self._items or now - self._items[i][0] > self.max_age)
+            ]
+            found = describe(ids)
+            for i in ids[1:]:
+                self._items[i] = (now, found.get(i))
+            return found.get(item_id)
+
+    def invalidate(self, item_id: Hashable) -> None:
+        with self._lock:
+            self._items.pop(item_id, None)
+
+
+_prefetch_lock = threading.Lock()
+_prefetches: Dict[Hashable, Prefetch] = {}
+
+
+def get_prefetch(key: Hashable, max_age: float = 30) -> Prefetch:
+    """Return the Prefetch registered under ‘key’, creating it if needed."""
+    with _prefetch_lock:
+        prefetch = _prefetches.get(key)
+        if prefetch is None:
+            prefetch = _prefetches[key] = Prefetch(max_age=max_age)
+        return prefetch
+
+
+def chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    """Split a list into consecutive slices of at most ‘size’ items."""
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def canonical_json(value: Any) -> str:
+    """
+        Serialize a policy document (or similar JSON configuration) so that
+        documents that AWS considers equal compare equal: keys are sorted
+        and a single element is equivalent to a list holding only it.
+    """
+
+    def normalize(v):
+        if isinstance(v, dict):
+            return {k: normalize(x) for k, x in v.items()}
+        if isinstance(v, list):
+            items = [normalize(x) for x in v]
+            return items[0] if len(items) == 1 else items
+        return v
+
+    return json.dumps(normalize(value), sort_keys=True)
 
 
 def get_access_key_id():
     return os.environ.get("EC2_ACCESS_KEY") or os.environ.get("AWS_ACCESS_KEY_ID")
 
 
+# Error codes signalling that we are sending requests too fast.  They
+# are always retried, and make every thread using the same region back off.
+THROTTLING_ERROR_CODES = nixops_aws.metrics.THROTTLING_ERROR_CODES
+
+# Error codes caused by a problem on the AWS side.  They are always retried.
+TRANSIENT_ERROR_CODES = {
+    "InternalError",
+    "InternalFailure",
+    "ServiceUnavailable",
+    "Unavailable",
+    "RequestTimeout",
+    "RequestTimeoutException",
+}
+
+# Client side retry quota of each region, in tokens.  A retry takes
+# RETRY_COST tokens (TIMEOUT_RETRY_COST for errors that didn't come from
+# AWS, like timeouts), which are given back when the retried call
+# succeeds.  When the quota runs out, retries wait for it to refill at
+# RETRY_QUOTA_REFILL_RATE tokens per second.
+RETRY_QUOTA = 500
+RETRY_COST = 5
+TIMEOUT_RETRY_COST = 10
+RETRY_QUOTA_REFILL_RATE = 1.0
+
+
+class RetryPolicy:
+    """How to back off from an error: decorrelated jitter between ‘base’ and ‘cap’ seconds."""
+
+    def __init__(
+        self, base: float, cap: float, cost: int = RETRY_COST, throttle: bool = False
+    ) -> None:
+        self.base = base
+        self.cap = cap
+        self.cost = cost
+        self.throttle = throttle
+
+    def next_delay(self, delay: float) -> float:
+        return min(self.cap, random.uniform(self.base, max(self.base, delay * 3)))
+
+
+THROTTLING_RETRY_POLICY = RetryPolicy(base=1, cap=60, throttle=True)
+TRANSIENT_RETRY_POLICY = RetryPolicy(base=1, cap=20)
+TIMEOUT_RETRY_POLICY = RetryPolicy(base=1, cap=20, cost=TIMEOUT_RETRY_COST)
+# Mostly eventual consistency errors, e.g. an object that was just created
+# not being visible yet, or a dependency that is still being deleted.
+DEFAULT_RETRY_POLICY = RetryPolicy(base=2, cap=30)
+
+RETRY_POLICIES: Dict[str, RetryPolicy] = {}
+RETRY_POLICIES.update(
+    {code: THROTTLING_RETRY_POLICY for code in THROTTLING_ERROR_CODES}
+)
+RETRY_POLICIES.update({code: TRANSIENT_RETRY_POLICY for code in TRANSIENT_ERROR_CODES})
+RETRY_POLICIES["DependencyViolation"] = RetryPolicy(base=5, cap=60)
+
+
+class RegionRetryState:
+    """
+        Retry state shared by all threads sending requests to one region:
+        the retry quota, and a circuit breaker that stops all requests for
+        a while when AWS starts throttling us.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tokens = float(RETRY_QUOTA)
+        self._refilled = time.time()
+        self._throttle_delay = 0.0
+        self._open_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            RETRY_QUOTA, self._tokens + (now - self._refilled) * RETRY_QUOTA_REFILL_RATE
+        )
+        self._refilled = now
+
+    def acquire(self, cost: int) -> None:
+        """Take ‘cost’ tokens from the retry quota, waiting for them if needed."""
+        while True:
+            with self._lock:
+                now = time.time()
+                self._refill(now)
+                if self._tokens >= cost:
+                    self._tokens -= cost
+                    return
+                delay = (cost - self._tokens) / RETRY_QUOTA_REFILL_RATE
+            time.sleep(delay)
+
+    def succeeded(self, refund: int) -> None:
+        with self._lock:
+            self._refill(time.time())
+            self._tokens = min(RETRY_QUOTA, self._tokens + refund)
+            self._throttle_delay = 0.0
+
+    def throttled(self, policy: RetryPolicy) -> float:
+        """Open the circuit for everyone, and return how long it stays open."""
+        with self._lock:
+            now = time.time()
+            self._throttle_delay = policy.next_delay(self._throttle_delay)
+            self._open_until = max(self._open_until, now + self._throttle_delay)
+            return self._open_until - now
+
+    def wait_until_closed(self) -> None:
+        while True:
+            with self._lock:
+                delay = self._open_until - time.time()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+
+_retry_states_lock = threading.Lock()
+_retry_states: Dict[Optional[str], RegionRetryState] = {}
+
+
+def get_retry_state(region: Optional[str]) -> RegionRetryState:
+    """Return the retry state of a region, or of the global services if None."""
+    with _retry_states_lock:
+        state = _retry_states.get(region)
+        if state is None:
+            state = _retry_states[region] = RegionRetryState()
+        return state
+
+
+def _error_code(e: Exception) -> Optional[Tuple[str, str]]:
+    """Return the AWS error code and message of an exception, if it has one."""
+    if isinstance(e, (SQSError, EC2ResponseError, BotoServerError)):
+        return (e.error_code, e.error_message)
+    elif isinstance(e, ClientError):
+        error = e.response.get("Error", {})
+        return (error.get("Code", ""), error.get("Message", ""))
+    return None
+
+
 def retry(
-    f, error_codes: Optional[Iterable[Any]] = None, logger=None, num_retries: int = 7
+    f,
+    error_codes: Optional[Iterable[Any]] = None,
+    logger=None,
+    num_retries: int = 7,
+    region: Optional[str] = None,
+    always_retry: bool = True,
 ):
     """
-        Retry function f up to 7 times. If error_codes argument is empty list, retry on all EC2 response errors,
-        otherwise, only on the specified error codes.
+        Retry function f up to ‘num_retries’ times. If error_codes argument is empty list, retry on all AWS response errors,
+        otherwise, only on the specified error codes.  Throttling and
+        internal AWS errors are always retried, unless ‘always_retry’ is
+        false because f already retries them itself.
+
+        Retries back off with decorrelated jitter, and take from a retry
+        quota shared by all threads using ‘region’.  When AWS throttles a
+        request, all requests to the region wait before trying again.
     """
 
     if error_codes is None:
         error_codes = []
 
-    def handle_exception(e):
-        if hasattr(e, "error_code"):
-            err_code = e.error_code
-            err_msg = e.error_message
-        else:
-            err_code = e.response["Error"]["Code"]
-            err_msg = e.response["Error"]["Message"]
-
-        if err_code == "RequestLimitExceeded":
-            return False
+    state = get_retry_state(region)
+    delays: Dict[RetryPolicy, float] = {}
+    refund = 0
 
-        if error_codes and err_code not in error_codes:
-            return True
+    for attempt in range(num_retries + 1):
+        state.wait_until_closed()
 
-        if logger is not None:
-            logger.log(
-                "got (possibly transient) EC2 error code '{0}': {1}. retrying...".format(
-                    err_code, err_msg
-                )
+        nixops_aws.metrics.clear_failed_call()
+        try:
+            res = f()
+        except Exception as e:
+            error = _error_code(e)
+            if error is None:
+                policy = TIMEOUT_RETRY_POLICY
+            else:
+                err_code, err_msg = error
+                policy = RETRY_POLICIES.get(err_code, DEFAULT_RETRY_POLICY)
+                if (
+                    error_codes
+                    and err_code not in error_codes
+                    and (policy is DEFAULT_RETRY_POLICY or not always_retry)
+                ):
+                    raise
+            if error is None and not always_retry:
+                raise
+
+            if attempt == num_retries:
+                raise
+
+            if policy.throttle:
+                delay = state.throttled(policy)
+            else:
+                delay = delays[policy] = policy.next_delay(delays.get(policy, 0))
+
+            # Book the retry against the call that failed, if f made one.
+            call = nixops_aws.metrics.last_failed_call() or (
+                "retry",
+                err_code if error is not None else type(e).__name__,
+                region,
+            )
+            nixops_aws.metrics.record_retry(
+                *call, resource=nixops_aws.metrics.current_resource()
             )
 
-    def handle_boto3_exception(e):
-        if error_codes and getattr(e, "response", {}).get("code") not in error_codes:
-            return True
-
-        if logger is not None:
-            if hasattr(e, "response"):
+            if logger is not None and error is not None:
                 logger.log(
-                    "got (possibly transient) EC2 error '{}', retrying...".format(
-                        str(e.response["Error"])
+                    "got (possibly transient) AWS error code '{0}': {1}. retrying in {2:.1f}s...".format(
+                        err_code, err_msg, delay
                     )
                 )
 
-    def should_abort(e):
-        if isinstance(e, (SQSError, EC2ResponseError, BotoServerError)):
-            return handle_exception(e)
-        elif isinstance(e, ClientError):
-            return handle_boto3_exception(e)
-
-    i = 0
-    while i <= num_retries:
-        i += 1
-        next_sleep = 5 + random.random() * (2 ** i)
-
-        try:
-            return f()
-        except Exception as e:
-            if num_retries == i or should_abort(e):
-                raise e
-            num_retries += 1
-
-        time.sleep(next_sleep)
+            state.acquire(policy.cost)
+            refund += policy.cost
+            time.sleep(delay)
+        else:
+            state.succeeded(refund)
+            return res
 
 
 def get_volume_by_id(conn, volume_id, allow_missing=False):
@@ -233,31 +622,145 @@ def wait_for_volume_available(conn, volume_id, logger, states=["available"]):
     logger.log_end("")
 
 
-def name_to_security_group(conn, name, vpc_id):
-    if not vpc_id or name.startswith("sg-"):
-        return name
+def get_volumes_by_id(client, volume_ids: List[str]) -> Dict[str, Any]:
+    """
+        Describe the given EBS volumes with a boto3 EC2 client, returning
+        them by ID.  Volumes that don't exist are left out.
+    """
+    volumes = {}
+    paginator = client.get_paginator("describe_volumes")
+    for chunk in chunks(volume_ids, 200):
+        for page in paginator.paginate(
+            Filters=[{"Name": "volume-id", "Values": chunk}]
+        ):
+            for volume in page["Volumes"]:
+                volumes[volume["VolumeId"]] = volume
+    return volumes
 
-    id = None
-    for sg in conn.get_all_security_groups(
-        filters={"group-name": name, "vpc-id": vpc_id}
-    ):
-        if sg.name == name:
-            id = sg.id
-            return id
 
-    raise Exception(
-        "could not resolve security group name '{0}' in VPC '{1}'".format(name, vpc_id)
+def wait_for_volumes_available(client, volume_ids, logger, states=["available"]):
+    """Wait for EBS volumes to become available, polling them all at once."""
+
+    logger.log_start(
+        "waiting for {0} to become available... ".format(
+            "volume ‘{0}’".format(volume_ids[0])
+            if len(volume_ids) == 1
+            else "{0} volumes".format(len(volume_ids))
+        )
     )
 
+    def check_available():
+        # Allow volumes to be missing due to eventual consistency.
+        volumes = get_volumes_by_id(client, volume_ids)
+        status = [
+            volumes[i]["State"] if i in volumes else "missing" for i in volume_ids
+        ]
+        logger.log_continue("[{0}] ".format(", ".join(sorted(set(status)))))
+        return all(s in states for s in status)
+
+    nixops.util.check_wait(check_available, max_tries=90)
+
+    logger.log_end("")
+
+
+class SecurityGroupIndex:
+    """
+        Names and IDs of the security groups in one VPC, filled by a single
+        paginated describe call.  A lookup that misses describes the VPC
+        again once, to pick up groups created behind our back.
+    """
 
-def id_to_security_group_name(conn, sg_id, vpc_id):
-    name = None
-    for sg in conn.get_all_security_groups(
-        filters={"group-id": sg_id, "vpc-id": vpc_id}
-    ):
-        if sg.id == sg_id:
-            name = sg.name
+    def __init__(self, region, access_key_id, vpc_id) -> None:
+        self.region = region
+        self.access_key_id = access_key_id
+        self.vpc_id = vpc_id
+        self._lock = threading.Lock()
+        self._ids: Optional[Dict[str, str]] = None
+        self._names: Dict[str, str] = {}
+
+    def _load(self) -> None:
+        ids = {}
+        paginator = connect_ec2_boto3(self.region, self.access_key_id).get_paginator(
+            "describe_security_groups"
+        )
+        for page in paginator.paginate(
+            Filters=[{"Name": "vpc-id", "Values": [self.vpc_id]}]
+        ):
+            for sg in page["SecurityGroups"]:
+                ids[sg["GroupName"]] = sg["GroupId"]
+        self._ids = ids
+        self._names = {v: k for k, v in ids.items()}
+
+    def _lookup(self, table: str, key: str) -> Optional[str]:
+        with self._lock:
+            if self._ids is None or key not in getattr(self, table):
+                self._load()
+            return getattr(self, table).get(key)
+
+    def name_to_id(self, name: str) -> str:
+        if name.startswith("sg-"):
             return name
-    raise Exception(
-        "could not resolve security group id '{0}' in VPC '{1}'".format(sg_id, vpc_id)
-    )
+        sg_id = self._lookup("_ids", name)
+        if sg_id is None:
+            raise Exception(
+                "could not resolve security group name '{0}' in VPC '{1}'".format(
+                    name, self.vpc_id
+                )
+            )
+        return sg_id
+
+    def id_to_name(self, sg_id: str) -> str:
+        name = self._lookup("_names", sg_id)
+        if name is None:
+            raise Exception(
+                "could not resolve security group id '{0}' in VPC '{1}'".format(
+                    sg_id, self.vpc_id
+                )
+            )
+        return name
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._ids = None
+            self._names = {}
+
+
+_security_group_indexes_lock = threading.Lock()
+_security_group_indexes: Dict[Hashable, SecurityGroupIndex] = {}
+
+
+def get_security_group_index(region, access_key_id, vpc_id) -> SecurityGroupIndex:
+    """Return the security group index of a VPC, creating it if needed."""
+    key = (region, access_key_id, vpc_id)
+    with _security_group_indexes_lock:
+        index = _security_group_indexes.get(key)
+        if index is None:
+            index = _security_group_indexes[key] = SecurityGroupIndex(
+                region, access_key_id, vpc_id
+            )
+        return index
+
+
+def invalidate_security_groups(region, access_key_id, vpc_id=None) -> None:
+    """
+        Forget the security groups of a VPC, or of all VPCs in the region,
+        after a group was created or deleted.
+    """
+    with _security_group_indexes_lock:
+        indexes = [
+            index
+            for (r, k, v), index in _security_group_indexes.items()
+            if r == region and k == access_key_id and vpc_id in (None, v)
+        ]
+    for index in indexes:
+        index.invalidate()
+
+
+def name_to_security_group(region, access_key_id, name, vpc_id):
+    if not vpc_id or name.startswith("sg-"):
+        return name
+    return get_security_group_index(region, access_key_id, vpc_id).name_to_id(name)
+
+
+def id_to_security_group_name(region, access_key_id, sg_id, vpc_id):
+    return get_security_group_index(region, access_key_id, vpc_id).id_to_name(sg_id)
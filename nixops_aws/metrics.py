@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+
+# Accounting of the AWS API calls made by this plugin.
+#
+# Every boto3 client and boto connection created through ec2_utils is
+# instrumented.  Calls are counted per operation, region and resource,
+# together with a latency histogram and the retries and throttles they
+# caused.  Set $NIXOPS_AWS_METRICS to print a summary when nixops exits,
+# and $NIXOPS_AWS_METRICS_FILE to also dump the metrics as JSON there.
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Upper bounds (in seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float("inf")]
+
+# Error codes signalling that we are sending requests too fast.  They are
+# counted as throttles here, and retried with back-off by ec2_utils.retry.
+THROTTLING_ERROR_CODES = {
+    "RequestLimitExceeded",
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "PriorRequestNotComplete",
+    "TooManyRequestsException",
+    "SlowDown",
+}
+
+
+class OperationStats:
+    """Counters and latency histogram of one operation."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttles = 0
+        self.total_time = 0.0
+        self.histogram = [0] * len(LATENCY_BUCKETS)
+
+    def record(self, latency: float, error_code: Optional[str]) -> None:
+        self.calls += 1
+        self.total_time += latency
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.histogram[i] += 1
+                break
+        if error_code is not None:
+            self.errors += 1
+            if error_code in THROTTLING_ERROR_CODES:
+                self.throttles += 1
+
+    def percentile(self, p: float) -> float:
+        """Return the upper bound of the bucket holding the p-th percentile."""
+        rank = p * self.calls
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if n and seen >= rank:
+                return LATENCY_BUCKETS[i]
+        return 0.0
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "throttles": self.throttles,
+            "total_time": round(self.total_time, 3),
+            "histogram": {
+                str(bound): n for bound, n in zip(LATENCY_BUCKETS, self.histogram) if n
+            },
+        }
+
+
+# (service, operation, region, resource name) -> stats
+Key = Tuple[str, str, Optional[str], Optional[str]]
+
+_lock = threading.Lock()
+_stats: Dict[Key, OperationStats] = {}
+
+# The last call that failed in each thread, to book retries made outside
+# of boto against its operation.
+_failed_call = threading.local()
+
+
+def _stats_for(key: Key) -> OperationStats:
+    stats = _stats.get(key)
+    if stats is None:
+        stats = _stats[key] = OperationStats()
+    return stats
+
+
+def current_resource() -> Optional[str]:
+    """
+        Return the name of the resource on whose behalf the calling thread
+        is running, by looking for a resource or machine state up the stack.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        obj = frame.f_locals.get("self")
+        if obj is not None and hasattr(obj, "depl") and hasattr(obj, "name"):
+            name = getattr(obj, "name", None)
+            if isinstance(name, str):
+                return name
+        frame = frame.f_back
+    return None
+
+
+def record_call(
+    service: str,
+    operation: str,
+    region: Optional[str],
+    latency: float,
+    error_code: Optional[str] = None,
+    resource: Optional[str] = None,
+) -> None:
+    if error_code is not None:
+        _failed_call.key = (service, operation, region)
+    with _lock:
+        _stats_for((service, operation, region, resource)).record(latency, error_code)
+
+
+def last_failed_call() -> Optional[Tuple[str, str, Optional[str]]]:
+    """Return the service, operation and region of the last failed call of this thread."""
+    return getattr(_failed_call, "key", None)
+
+
+def clear_failed_call() -> None:
+    _failed_call.key = None
+
+
+def record_retry(
+    service: str, operation: str, region: Optional[str], resource: Optional[str] = None
+) -> None:
+    with _lock:
+        _stats_for((service, operation, region, resource)).retries += 1
+
+
+def instrument_boto3(client: Any) -> Any:
+    """Record the calls made through a boto3 client."""
+    region = client.meta.region_name
+    service = client.meta.service_model.endpoint_prefix
+
+    def on_before_call(model, context, **kwargs):
+        context["nixops_aws_operation"] = model.name
+        context["nixops_aws_start"] = time.time()
+        context["nixops_aws_resource"] = current_resource()
+
+    def record(context, error_code):
+        start = context.get("nixops_aws_start")
+        if start is None:
+            return
+        record_call(
+            service,
+            context["nixops_aws_operation"],
+            region,
+            time.time() - start,
+            error_code,
+            context.get("nixops_aws_resource"),
+        )
+
+    def on_after_call(context, parsed=None, **kwargs):
+        error_code = None
+        if isinstance(parsed, dict):
+            error_code = parsed.get("Error", {}).get("Code")
+        record(context, error_code)
+
+    def on_after_call_error(context, exception, **kwargs):
+        # Emitted instead of after-call when no response was received,
+        # e.g. on connection errors and timeouts.
+        record(context, type(exception).__name__)
+
+    def on_needs_retry(attempts, operation, **kwargs):
+        # Emitted after every attempt, so each one after the first is a
+        # retry made by botocore itself.
+        if attempts > 1:
+            record_retry(service, operation.name, region, current_resource())
+
+    events = client.meta.events
+    events.register_first("before-call.*.*", on_before_call)
+    events.register("after-call.*.*", on_after_call)
+    events.register("after-call-error.*.*", on_after_call_error)
+    events.register("needs-retry.*.*", on_needs_retry)
+    return client
+
+
+def instrument_boto(conn: Any, service: str, region: Optional[str]) -> Any:
+    """Record the calls made through a boto (version 2) connection."""
+    make_request = conn.make_request
+
+    def instrumented(action, *args, **kwargs):
+        resource = current_resource()
+        start = time.time()
+        error_code = None
+        try:
+            return make_request(action, *args, **kwargs)
+        except Exception as e:
+            error_code = getattr(e, "error_code", None) or type(e).__name__
+            raise
+        finally:
+            record_call(
+                service, action, region, time.time() - start, error_code, resource
+            )
+
+    conn.make_request = instrumented
+    return conn
+
+
+def snapshot() -> Dict[Key, OperationStats]:
+    with _lock:
+        return dict(_stats)
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+
+
+def _merge(stats: List[OperationStats]) -> OperationStats:
+    merged = OperationStats()
+    for s in stats:
+        merged.calls += s.calls
+        merged.errors += s.errors
+        merged.retries += s.retries
+        merged.throttles += s.throttles
+        merged.total_time += s.total_time
+        merged.histogram = [a + b for a, b in zip(merged.histogram, s.histogram)]
+    return merged
+
+
+def summary(top: int = 20) -> str:
+    """Return a table of the operations and resources that took longest."""
+    stats = snapshot()
+    if not stats:
+        return "no AWS API calls were made"
+
+    by_operation: Dict[Tuple[str, str, Optional[str]], List[OperationStats]] = {}
+    by_resource: Dict[Optional[str], List[OperationStats]] = {}
+    for (service, operation, region, resource), s in stats.items():
+        by_operation.setdefault((service, operation, region), []).append(s)
+        by_resource.setdefault(resource, []).append(s)
+
+    lines = [
+        "{0:<45} {1:<15} {2:>6} {3:>6} {4:>7} {5:>9} {6:>7} {7:>7} {8:>9}".format(
+            "operation",
+            "region",
+            "calls",
+            "errors",
+            "retries",
+            "throttles",
+            "p50",
+            "p95",
+            "total",
+        )
+    ]
+    operations = sorted(
+        ((k, _merge(v)) for k, v in by_operation.items()),
+        key=lambda kv: -kv[1].total_time,
+    )
+    for (service, operation, region), s in operations[:top]:
+        lines.append(
+            "{0:<45} {1:<15} {2:>6} {3:>6} {4:>7} {5:>9} {6:>6}s {7:>6}s {8:>8.1f}s".format(
+                "{0}.{1}".format(service, operation),
+                region or "-",
+                s.calls,
+                s.errors,
+                s.retries,
+                s.throttles,
+                s.percentile(0.5),
+                s.percentile(0.95),
+                s.total_time,
+            )
+        )
+
+    lines.append("")
+    lines.append("{0:<45} {1:>6} {2:>9}".format("resource", "calls", "total"))
+    resources = sorted(
+        ((k, _merge(v)) for k, v in by_resource.items()),
+        key=lambda kv: -kv[1].total_time,
+    )
+    for resource, s in resources[:top]:
+        lines.append(
+            "{0:<45} {1:>6} {2:>8.1f}s".format(resource or "-", s.calls, s.total_time)
+        )
+    return "\n".join(lines)
+
+
+def to_json() -> Dict[str, Any]:
+    return {
+        "time": time.time(),
+        "operations": [
+            dict(
+                service=service,
+                operation=operation,
+                region=region,
+                resource=resource,
+                **s.to_json()
+            )
+            for (service, operation, region, resource), s in sorted(
+                snapshot().items(), key=lambda kv: [str(k) for k in kv[0]]
+            )
+        ],
+    }
+
+
+def _report() -> None:
+    if not _stats:
+        return
+    if os.environ.get("NIXOPS_AWS_METRICS"):
+        sys.stderr.write(summary() + "\n")
+    path = os.environ.get("NIXOPS_AWS_METRICS_FILE")
+    if path:
+        with open(path, "w") as f:
+            json.dump(to_json(), f, indent=2)
+
+
+atexit.register(_report)
@@ -488,6 +488,19 @@ in
       '';
     };
 
+    deployment.ec2.fastSnapshotRestore = mkOption {
+      default = false;
+      type = types.bool;
+      description = ''
+        Whether to enable EBS Fast Snapshot Restore for the snapshots of a
+        backup while restoring this machine from it, so that the restored
+        volumes deliver their full performance right away.  Fast
+        snapshot restore is disabled again once the volumes have been
+        created.  Note that it is charged per hour and that enabling it
+        can take a while.
+      '';
+    };
+
     fileSystems = mkOption {
       type = with types; loaOf (submodule fileSystemsOptions);
     };
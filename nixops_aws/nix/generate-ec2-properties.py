@@ -1,46 +1,325 @@
 #!/usr/bin/env python
+"""
+    Generate ec2-properties.nix from the AWS pricing index.
+
+    curl -O https://pricing.us-east-1.amazonaws.com/offers/v1.0/aws/AmazonEC2/current/index.json
+    ./generate-ec2-properties.py > ec2-properties.nix
+
+    The index is several gigabytes, so it is parsed incrementally and only
+    one product is held in memory at a time.  Catalogs of all regions can
+    be written at once with --all-regions, and --index writes a compact
+    JSON index of all instance types and the regions offering them.
+"""
+import argparse
 import json
+import os
+import sys
 
 # FIXME: AWS support adviced against the use of this index file for anything other than pricing
 # This file also does not provide a way to confidently check if an instance use nvme or not
 # and there is currently no API that can provide such information. So manual fixes are needed
-# after running this script.
-# A feature request is in place to provide an endpoint that can cover our need.
-# curl -O https://pricing.us-east-1.amazonaws.com/offers/v1.0/aws/AmazonEC2/current/index.json
-with open("index.json") as f:
-    data = json.load(f)
-
-instanceTypes = {}
-for p in data["products"].keys():
-    product = data["products"][p]["attributes"]
-    if (
-        "operatingSystem" in product
-        and product["operatingSystem"] in ("NA", "Linux")
-        and "tenancy" in product
-        and product["tenancy"] == "Shared"
-        and product["location"] == "US East (N. Virginia)"
-    ):
-        ebsOptimized = "ebsOptimized" in product
-        instanceType = product["instanceType"]
-        cores = product["vcpu"]
-        memory = int(float(product["memory"].replace(",", "").split(" ")[0]) * 1024)
-        if instanceType in instanceTypes and not ebsOptimized:
+# after running this script, unless the output of
+# ‘aws ec2 describe-instance-types’ is passed with --instance-types.
+
+FIELDS = ["cores", "memory", "allowsEbsOptimized", "supportsNVMe", "platforms"]
+
+NUMBER_CHARS = set("0123456789+-.eE")
+
+
+class JSONStream:
+    """
+        Incremental reader of a JSON document.  Containers are walked with
+        ‘members’ and ‘items’, and only the values read with ‘value’ are
+        decoded, so memory use is bounded by the largest of those.
+    """
+
+    def __init__(self, f, chunk_size=1 << 20):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._offset = 0
+        self._eof = False
+
+    def _fill(self):
+        if self._eof:
+            return False
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._offset += self._pos
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _tell(self):
+        return self._offset + self._pos
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("unexpected end of JSON document")
+
+    def _expect(self, c):
+        if self._peek() != c:
+            raise ValueError(
+                "expected ‘{0}’ at offset {1} of JSON document".format(c, self._tell())
+            )
+        self._pos += 1
+
+    def value(self):
+        """Decode the value at the current position."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A number is only complete once it is followed by a
+                # character that cannot continue it, which may be in the
+                # next chunk: "2." decodes as 2.
+                rest = end
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    while rest < len(self._buf) and self._buf[rest] in NUMBER_CHARS:
+                        rest += 1
+                if rest < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def skip(self):
+        """Skip the value at the current position without decoding it."""
+        c = self._peek()
+        if c == "{":
+            for _ in self.members():
+                pass
+        elif c == "[":
+            for _ in self.items():
+                pass
+        else:
+            self.value()
+
+    def _walk(self, open, close, read_key):
+        self._expect(open)
+        while self._peek() != close:
+            key = read_key()
+            start = self._tell()
+            yield key
+            if self._tell() == start:
+                self.skip()
+            if self._peek() == ",":
+                self._pos += 1
+        self._pos += 1
+
+    def members(self):
+        """
+            Iterate over the object at the current position, yielding its
+            keys.  The value of a key is skipped unless it is read before
+            the next key is requested.
+        """
+
+        def read_key():
+            key = self.value()
+            self._expect(":")
+            return key
+
+        return self._walk("{", "}", read_key)
+
+    def items(self):
+        """Like ‘members’, for the elements of an array."""
+        index = iter(range(sys.maxsize))
+        return self._walk("[", "]", lambda: next(index))
+
+
+def iter_members(f, key):
+    """Yield the values of the object or array at top-level ‘key’ of ‘f’."""
+    stream = JSONStream(f)
+    for k in stream.members():
+        if k == key:
+            walk = stream.members() if stream._peek() == "{" else stream.items()
+            for _ in walk:
+                yield stream.value()
+            return
+
+
+def pricing_platforms(attrs):
+    processor = attrs.get("physicalProcessor", "")
+    arm = "Graviton" in processor or "Apple" in processor
+    cpu = "aarch64" if arm else "x86_64"
+    if attrs["instanceType"].startswith("mac"):
+        return [{"cpu": cpu, "os": "darwin"}]
+    if "32-bit" in attrs.get("processorArchitecture", ""):
+        return [{"cpu": "i686"}, {"cpu": cpu}]
+    return [{"cpu": cpu}]
+
+
+def read_pricing(f, regions):
+    """
+        Return the properties of the Linux shared tenancy instance types in
+        the pricing index ‘f’ by region.  ‘regions’ is the set of region
+        codes or locations to include, or None for all of them.
+    """
+    catalogs = {}
+    for product in iter_members(f, "products"):
+        attrs = product.get("attributes", {})
+        if (
+            attrs.get("operatingSystem") not in ("NA", "Linux")
+            or attrs.get("tenancy") != "Shared"
+            or "instanceType" not in attrs
+            or "vcpu" not in attrs
+        ):
             continue
-        instanceTypes[product["instanceType"]] = (
-            '  "'
-            + instanceType
-            + '" = { cores = '
-            + cores
-            + "; memory = "
-            + str(memory)
-            + "; allowsEbsOptimized = "
-            + ("true" if ebsOptimized else "false")
-            + "; supportsNVMe = "
-            + "false"
-            + ";};"
+        region = attrs.get("regionCode") or attrs.get("location")
+        if regions is not None and not regions & {region, attrs.get("location")}:
+            continue
+        ebs_optimized = "ebsOptimized" in attrs
+        catalog = catalogs.setdefault(region, {})
+        old = catalog.get(attrs["instanceType"])
+        if old is not None:
+            old["allowsEbsOptimized"] = old["allowsEbsOptimized"] or ebs_optimized
+            continue
+        catalog[attrs["instanceType"]] = {
+            "cores": int(attrs["vcpu"]),
+            "memory": int(float(attrs["memory"].replace(",", "").split(" ")[0]) * 1024),
+            "allowsEbsOptimized": ebs_optimized,
+            "supportsNVMe": False,
+            "platforms": pricing_platforms(attrs),
+        }
+    return catalogs
+
+
+ARCHITECTURES = {
+    "arm64": {"cpu": "aarch64"},
+    "x86_64": {"cpu": "x86_64"},
+    "i386": {"cpu": "i686"},
+    "x86_64_mac": {"cpu": "x86_64", "os": "darwin"},
+    "arm64_mac": {"cpu": "aarch64", "os": "darwin"},
+}
+
+
+def read_instance_types(f):
+    """
+        Return the properties of the instance types in the output of ‘aws
+        ec2 describe-instance-types’, like generate-ec2-properties.nix.
+    """
+    result = {}
+    for t in iter_members(f, "InstanceTypes"):
+        ebs = t.get("EbsInfo", {})
+        result[t["InstanceType"]] = {
+            "cores": t["VCpuInfo"]["DefaultVCpus"],
+            "memory": t["MemoryInfo"]["SizeInMiB"],
+            "allowsEbsOptimized": ebs.get("EbsOptimizedSupport") != "unsupported",
+            "supportsNVMe": ebs.get("NvmeSupport") in ("supported", "required"),
+            "platforms": [
+                ARCHITECTURES[a] for a in t["ProcessorInfo"]["SupportedArchitectures"]
+            ],
+        }
+    return result
+
+
+def nix_value(v):
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    if isinstance(v, int):
+        return str(v)
+    if isinstance(v, str):
+        return json.dumps(v)
+    if isinstance(v, list):
+        return "[" + " ".join(nix_value(x) for x in v) + "]"
+    return (
+        "{ "
+        + " ".join("{0} = {1};".format(k, nix_value(v[k])) for k in sorted(v))
+        + " }"
+    )
+
+
+def write_nix(catalog, out):
+    out.write("{\n")
+    for instance_type in sorted(catalog):
+        out.write(
+            "  {0} = {1};\n".format(
+                json.dumps(instance_type), nix_value(catalog[instance_type])
+            )
         )
+    out.write("}\n")
+
+
+def write_index(catalogs, out):
+    """
+        Write the instance types of all catalogs once, as arrays of FIELDS,
+        together with the instance types offered in each region.
+    """
+    instance_types = {}
+    for catalog in catalogs.values():
+        for instance_type, props in catalog.items():
+            instance_types[instance_type] = [props[f] for f in FIELDS]
+    json.dump(
+        {
+            "fields": FIELDS,
+            "instanceTypes": dict(sorted(instance_types.items())),
+            "regions": {
+                region: sorted(catalogs[region]) for region in sorted(catalogs)
+            },
+        },
+        out,
+        separators=(",", ":"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("pricing", nargs="?", default="index.json")
+    parser.add_argument(
+        "--region",
+        default="us-east-1",
+        help="region code or location of the catalog written to stdout",
+    )
+    parser.add_argument(
+        "--all-regions",
+        metavar="DIR",
+        help="write the catalog of every region to DIR/<region>.nix",
+    )
+    parser.add_argument("--index", metavar="FILE", help="write a compact JSON index")
+    parser.add_argument(
+        "--instance-types",
+        metavar="FILE",
+        help="output of ‘aws ec2 describe-instance-types’ to take NVMe support and architectures from",
+    )
+    args = parser.parse_args()
+
+    regions = None if args.all_regions or args.index else {args.region}
+    with open(args.pricing) as f:
+        catalogs = read_pricing(f, regions)
+
+    if args.instance_types:
+        with open(args.instance_types) as f:
+            described = read_instance_types(f)
+        for catalog in catalogs.values():
+            for instance_type, props in catalog.items():
+                props.update(described.get(instance_type, {}))
+
+    if args.all_regions:
+        os.makedirs(args.all_regions, exist_ok=True)
+        for region, catalog in catalogs.items():
+            path = os.path.join(args.all_regions, "{0}.nix".format(region))
+            with open(path, "w") as out:
+                write_nix(catalog, out)
+    if args.index:
+        with open(args.index, "w") as out:
+            write_index(catalogs, out)
+    if not args.all_regions and not args.index:
+        catalog = next(iter(catalogs.values()), {})
+        write_nix(catalog, sys.stdout)
+
 
-print("{")
-for instanceType in sorted(instanceTypes.keys()):
-    print(instanceTypes[instanceType])
-print("}")
+if __name__ == "__main__":
+    main()
@@ -10,11 +10,7 @@ class NixopsAWSPlugin(Plugin):
 
     @staticmethod
     def load():
-        return [
-            "nixops_aws.resources",
-            "nixops_aws.backends.ec2",
-            "nixops_aws.resources.ec2_keypair",
-        ]
+        return ["nixops_aws.registry"]
 
 
 @nixops.plugins.hookimpl
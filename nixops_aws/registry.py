@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+
+# Lazy registry of the resource types of this plugin.
+#
+# Importing all resource modules up front means importing boto, boto3 and
+# botocore on every nixops invocation, even ones that never touch AWS.
+# Instead, this module only defines small stand-ins for the definition
+# and state classes.  nixops finds them by their type like the real
+# classes, and instantiating one imports the real module and returns an
+# instance of the real class.
+
+import importlib
+from typing import List, Optional, Tuple, Type
+
+import nixops.resources
+from nixops.backends import MachineDefinition, MachineState
+
+# (module, type, resource type, definition class, state class) of every
+# resource.  The resource type is None for machine backends.
+RESOURCES: List[Tuple[str, str, Optional[str], str, str]] = [
+    (
+        "nixops_aws.resources.aws_data_lifecycle_manager",
+        "aws-data-lifecycle-manager",
+        "awsDataLifecycleManager",
+        "awsDataLifecycleManagerDefinition",
+        "awsDataLifecycleManagerState",
+    ),
+    (
+        "nixops_aws.resources.aws_vpn_connection",
+        "aws-vpn-connection",
+        "awsVPNConnections",
+        "AWSVPNConnectionDefinition",
+        "AWSVPNConnectionState",
+    ),
+    (
+        "nixops_aws.resources.aws_vpn_connection_route",
+        "aws-vpn-connection-route",
+        "awsVPNConnectionRoutes",
+        "AWSVPNConnectionRouteDefinition",
+        "AWSVPNConnectionRouteState",
+    ),
+    (
+        "nixops_aws.resources.aws_vpn_gateway",
+        "aws-vpn-gateway",
+        "awsVPNGateways",
+        "AWSVPNGatewayDefinition",
+        "AWSVPNGatewayState",
+    ),
+    (
+        "nixops_aws.resources.cloudwatch_log_group",
+        "cloudwatch-log-group",
+        "cloudwatchLogGroups",
+        "CloudWatchLogGroupDefinition",
+        "CloudWatchLogGroupState",
+    ),
+    (
+        "nixops_aws.resources.cloudwatch_log_stream",
+        "cloudwatch-log-stream",
+        "cloudwatchLogStreams",
+        "CloudWatchLogStreamDefinition",
+        "CloudWatchLogStreamState",
+    ),
+    (
+        "nixops_aws.resources.cloudwatch_metric_alarm",
+        "cloudwatch-metric-alarm",
+        "cloudwatchMetricAlarms",
+        "CloudwatchMetricAlarmDefinition",
+        "CloudwatchMetricAlarmState",
+    ),
+    (
+        "nixops_aws.resources.ebs_volume",
+        "ebs-volume",
+        "ebsVolumes",
+        "EBSVolumeDefinition",
+        "EBSVolumeState",
+    ),
+    (
+        "nixops_aws.resources.ec2_keypair",
+        "ec2-keypair",
+        "ec2KeyPairs",
+        "EC2KeyPairDefinition",
+        "EC2KeyPairState",
+    ),
+    (
+        "nixops_aws.resources.ec2_placement_group",
+        "ec2-placement-group",
+        "ec2PlacementGroups",
+        "EC2PlacementGroupDefinition",
+        "EC2PlacementGroupState",
+    ),
+    (
+        "nixops_aws.resources.ec2_rds_dbinstance",
+        "ec2-rds-dbinstance",
+        "rdsDbInstances",
+        "EC2RDSDbInstanceDefinition",
+        "EC2RDSDbInstanceState",
+    ),
+    (
+        "nixops_aws.resources.ec2_rds_dbsecurity_group",
+        "ec2-rds-dbsecurity-group",
+        "rdsDbSecurityGroups",
+        "EC2RDSDbSecurityGroupDefinition",
+        "EC2RDSDbSecurityGroupState",
+    ),
+    (
+        "nixops_aws.resources.ec2_security_group",
+        "ec2-security-group",
+        "ec2SecurityGroups",
+        "EC2SecurityGroupDefinition",
+        "EC2SecurityGroupState",
+    ),
+    (
+        "nixops_aws.resources.elastic_file_system",
+        "elastic-file-system",
+        "elasticFileSystems",
+        "ElasticFileSystemDefinition",
+        "ElasticFileSystemState",
+    ),
+    (
+        "nixops_aws.resources.elastic_file_system_mount_target",
+        "elastic-file-system-mount-target",
+        "elasticFileSystemMountTargets",
+        "ElasticFileSystemMountTargetDefinition",
+        "ElasticFileSystemMountTargetState",
+    ),
+    (
+        "nixops_aws.resources.elastic_ip",
+        "elastic-ip",
+        "elasticIPs",
+        "ElasticIPDefinition",
+        "ElasticIPState",
+    ),
+    (
+        "nixops_aws.resources.iam_role",
+        "iam-role",
+        "iamRoles",
+        "IAMRoleDefinition",
+        "IAMRoleState",
+    ),
+    (
+        "nixops_aws.resources.rds_db_subnet_group",
+        "rds-subnet-group",
+        "rdsSubnetGroups",
+        "RDSDbSubnetGroupDefinition",
+        "RDSDbSubnetGroupState",
+    ),
+    (
+        "nixops_aws.resources.route53_health_check",
+        "aws-route53-health-check",
+        "route53HealthChecks",
+        "Route53HealthCheckDefinition",
+        "Route53HealthCheckState",
+    ),
+    (
+        "nixops_aws.resources.route53_hosted_zone",
+        "aws-route53-hosted-zone",
+        "route53HostedZones",
+        "Route53HostedZoneDefinition",
+        "Route53HostedZoneState",
+    ),
+    (
+        "nixops_aws.resources.route53_recordset",
+        "aws-route53-recordset",
+        "route53RecordSets",
+        "Route53RecordSetDefinition",
+        "Route53RecordSetState",
+    ),
+    (
+        "nixops_aws.resources.s3_bucket",
+        "s3-bucket",
+        "s3Buckets",
+        "S3BucketDefinition",
+        "S3BucketState",
+    ),
+    (
+        "nixops_aws.resources.sns_topic",
+        "sns-topic",
+        "snsTopics",
+        "SNSTopicDefinition",
+        "SNSTopicState",
+    ),
+    (
+        "nixops_aws.resources.sqs_queue",
+        "sqs-queue",
+        "sqsQueues",
+        "SQSQueueDefinition",
+        "SQSQueueState",
+    ),
+    ("nixops_aws.resources.vpc", "vpc", "vpc", "VPCDefinition", "VPCState"),
+    (
+        "nixops_aws.resources.vpc_customer_gateway",
+        "vpc-customer-gateway",
+        "vpcCustomerGateways",
+        "VPCCustomerGatewayDefinition",
+        "VPCCustomerGatewayState",
+    ),
+    (
+        "nixops_aws.resources.vpc_dhcp_options",
+        "vpc-dhcp-options",
+        "vpcDhcpOptions",
+        "VPCDhcpOptionsDefinition",
+        "VPCDhcpOptionsState",
+    ),
+    (
+        "nixops_aws.resources.vpc_egress_only_internet_gateway",
+        "vpc-egress-only-internet-gateway",
+        "vpcEgressOnlyInternetGateways",
+        "VPCEgressOnlyInternetGatewayDefinition",
+        "VPCEgressOnlyInternetGatewayState",
+    ),
+    (
+        "nixops_aws.resources.vpc_endpoint",
+        "vpc-endpoint",
+        "vpcEndpoints",
+        "VPCEndpointDefinition",
+        "VPCEndpointState",
+    ),
+    (
+        "nixops_aws.resources.vpc_internet_gateway",
+        "vpc-internet-gateway",
+        "vpcInternetGateways",
+        "VPCInternetGatewayDefinition",
+        "VPCInternetGatewayState",
+    ),
+    (
+        "nixops_aws.resources.vpc_nat_gateway",
+        "vpc-nat-gateway",
+        "vpcNatGateways",
+        "VPCNatGatewayDefinition",
+        "VPCNatGatewayState",
+    ),
+    (
+        "nixops_aws.resources.vpc_network_acl",
+        "vpc-network-acl",
+        "vpcNetworkAcls",
+        "VPCNetworkAclDefinition",
+        "VPCNetworkAclState",
+    ),
+    (
+        "nixops_aws.resources.vpc_network_interface",
+        "vpc-network-interface",
+        "vpcNetworkInterfaces",
+        "VPCNetworkInterfaceDefinition",
+        "VPCNetworkInterfaceState",
+    ),
+    (
+        "nixops_aws.resources.vpc_network_interface_attachment",
+        "vpc-network-interface-attachment",
+        "vpcNetworkInterfaceAttachments",
+        "VPCNetworkInterfaceAttachmentDefinition",
+        "VPCNetworkInterfaceAttachmentState",
+    ),
+    (
+        "nixops_aws.resources.vpc_route",
+        "vpc-route",
+        "vpcRoutes",
+        "VPCRouteDefinition",
+        "VPCRouteState",
+    ),
+    (
+        "nixops_aws.resources.vpc_route_table",
+        "vpc-route-table",
+        "vpcRouteTables",
+        "VPCRouteTableDefinition",
+        "VPCRouteTableState",
+    ),
+    (
+        "nixops_aws.resources.vpc_route_table_association",
+        "vpc-route-table-association",
+        "vpcRouteTableAssociations",
+        "VPCRouteTableAssociationDefinition",
+        "VPCRouteTableAssociationState",
+    ),
+    (
+        "nixops_aws.resources.vpc_subnet",
+        "vpc-subnet",
+        "vpcSubnets",
+        "VPCSubnetDefinition",
+        "VPCSubnetState",
+    ),
+    ("nixops_aws.backends.ec2", "ec2", None, "EC2Definition", "EC2State"),
+]
+
+
+def _lazy_class(
+    base: Type,
+    module: str,
+    class_name: str,
+    type_name: str,
+    resource_type: Optional[str],
+) -> Type:
+    def __new__(cls, *args, **kwargs):
+        real_cls = getattr(importlib.import_module(module), class_name)
+        return real_cls(*args, **kwargs)
+
+    attrs = {
+        "__new__": __new__,
+        "__module__": __name__,
+        "__doc__": "Stand-in for {0}.{1}.".format(module, class_name),
+        "get_type": classmethod(lambda cls: type_name),
+    }
+    if resource_type is not None:
+        attrs["get_resource_type"] = classmethod(lambda cls: resource_type)
+    return type(class_name, (base,), attrs)
+
+
+def _register() -> None:
+    for module, type_name, resource_type, definition, state in RESOURCES:
+        if resource_type is None:
+            definition_base, state_base = MachineDefinition, MachineState
+        else:
+            definition_base = nixops.resources.ResourceDefinition
+            state_base = nixops.resources.ResourceState
+        globals()[definition] = _lazy_class(
+            definition_base, module, definition, type_name, resource_type
+        )
+        globals()[state] = _lazy_class(
+            state_base, module, state, type_name, resource_type
+        )
+
+
+_register()
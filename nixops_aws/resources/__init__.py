@@ -1,3 +1,5 @@
+import importlib
+
 __all__ = (
     "aws_vpn_connection",
     "aws_vpn_connection_route",
@@ -38,44 +40,12 @@ __all__ = (
     "vpc_route_table_association",
     "vpc_subnet",
     "aws_data_lifecycle_manager",
+    "rds_db_subnet_group",
 )
 
-from . import aws_vpn_connection
-from . import aws_vpn_connection_route
-from . import aws_vpn_gateway
-from . import cloudwatch_log_group
-from . import cloudwatch_log_stream
-from . import cloudwatch_metric_alarm
-from . import ebs_volume
-from . import ec2_common
-from . import ec2_keypair
-from . import ec2_placement_group
-from . import ec2_rds_dbinstance
-from . import ec2_rds_dbsecurity_group
-from . import ec2_security_group
-from . import efs_common
-from . import elastic_file_system
-from . import elastic_file_system_mount_target
-from . import elastic_ip
-from . import iam_role
-from . import route53_health_check
-from . import route53_hosted_zone
-from . import route53_recordset
-from . import s3_bucket
-from . import sns_topic
-from . import sqs_queue
-from . import vpc
-from . import vpc_customer_gateway
-from . import vpc_dhcp_options
-from . import vpc_egress_only_internet_gateway
-from . import vpc_endpoint
-from . import vpc_internet_gateway
-from . import vpc_nat_gateway
-from . import vpc_network_acl
-from . import vpc_network_interface
-from . import vpc_network_interface_attachment
-from . import vpc_route
-from . import vpc_route_table
-from . import vpc_route_table_association
-from . import vpc_subnet
-from . import aws_data_lifecycle_manager
+
+def __getattr__(name):
+    # Submodules are imported on first use, see nixops_aws.registry.
+    if name in __all__:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
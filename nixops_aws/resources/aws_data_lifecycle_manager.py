@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-import boto3
 import nixops.util
 import nixops.resources
 import nixops_aws.ec2_utils
@@ -82,16 +81,9 @@ class awsDataLifecycleManagerState(
             if self._client:
                 return self._client
         assert self.region
-        (access_key_id, secret_access_key) = nixops_aws.ec2_utils.fetch_aws_secret_key(
-            self.access_key_id
+        return nixops_aws.ec2_utils.get_boto3_client(
+            service, self.region, self.access_key_id
         )
-        client = boto3.session.Session().client(
-            service_name=service,
-            region_name=self.region,
-            aws_access_key_id=access_key_id,
-            aws_secret_access_key=secret_access_key,
-        )
-        return client
 
     def arn_from_role_name(self, role_name):
 
@@ -7,6 +7,7 @@ import boto.logs
 import nixops.util
 import nixops.resources
 import nixops_aws.ec2_utils
+import nixops_aws.metrics
 
 from .types.cloudwatch_log_group import CloudwatchLogGroupOptions
 
@@ -85,6 +86,7 @@ class CloudWatchLogGroupState(
             aws_access_key_id=access_key_id,
             aws_secret_access_key=secret_access_key,
         )
+        nixops_aws.metrics.instrument_boto(self._conn, "logs", self.region)
         return self._conn
 
     def _destroy(self):
@@ -2,8 +2,10 @@
 
 # Automatic provisioning of AWS cloudwatch log streams.
 
-import boto
-import boto.logs
+import threading
+import time
+from typing import Dict, Hashable, Optional
+
 import nixops.util
 import nixops.resources
 import nixops_aws.ec2_utils
@@ -12,6 +14,126 @@ from . import cloudwatch_log_group
 from .types.cloudwatch_log_stream import CloudwatchLogStreamOptions
 
 
+class LogStreamIndex:
+    """
+        Names and ARNs of the log streams of one log group, listed with a
+        single paginated describe call and shared by all the log stream
+        resources in that group.  Streams created or deleted through the
+        index are recorded in it, so the group is only listed again once
+        the index is older than ‘max_age’ seconds.
+    """
+
+    def __init__(self, region, access_key_id, log_group_name, max_age=300) -> None:
+        self.region = region
+        self.access_key_id = access_key_id
+        self.log_group_name = log_group_name
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._arns: Optional[Dict[str, str]] = None
+        self._loaded_at = 0.0
+        self._group_arn: Optional[str] = None
+
+    def _client(self):
+        return nixops_aws.ec2_utils.get_boto3_client(
+            "logs", self.region, self.access_key_id
+        )
+
+    def _load(self) -> Dict[str, str]:
+        client = self._client()
+        arns = {}
+        try:
+            for page in client.get_paginator("describe_log_streams").paginate(
+                logGroupName=self.log_group_name
+            ):
+                for log_stream in page["logStreams"]:
+                    arns[log_stream["logStreamName"]] = log_stream["arn"]
+        except client.exceptions.ResourceNotFoundException:
+            pass
+        self._arns = arns
+        self._loaded_at = time.time()
+        return arns
+
+    def _streams(self) -> Dict[str, str]:
+        # Must be called with _lock held.
+        if self._arns is None or time.time() - self._loaded_at > self.max_age:
+            return self._load()
+        return self._arns
+
+    def get(self, log_stream_name) -> Optional[str]:
+        """Return the ARN of a log stream, or None if it doesn't exist."""
+        with self._lock:
+            return self._streams().get(log_stream_name)
+
+    def _stream_arn(self, log_stream_name) -> str:
+        # Must be called with _lock held.  Stream ARNs are the ARN of
+        # their group followed by ‘:log-stream:<name>’.
+        for arn in self._streams().values():
+            return "{0}:log-stream:{1}".format(
+                arn.rsplit(":log-stream:", 1)[0], log_stream_name
+            )
+        if self._group_arn is None:
+            for page in (
+                self._client()
+                .get_paginator("describe_log_groups")
+                .paginate(logGroupNamePrefix=self.log_group_name)
+            ):
+                for log_group in page["logGroups"]:
+                    if log_group["logGroupName"] == self.log_group_name:
+                        self._group_arn = log_group["arn"]
+            if self._group_arn is None:
+                raise Exception(
+                    "log group ‘{0}’ does not exist".format(self.log_group_name)
+                )
+        return "{0}:log-stream:{1}".format(
+            self._group_arn.rstrip("*").rstrip(":"), log_stream_name
+        )
+
+    def create(self, log_stream_name) -> str:
+        """Create a log stream, if it doesn't exist yet, and return its ARN."""
+        client = self._client()
+        try:
+            client.create_log_stream(
+                logGroupName=self.log_group_name, logStreamName=log_stream_name
+            )
+        except client.exceptions.ResourceAlreadyExistsException:
+            pass
+        with self._lock:
+            arn = self._stream_arn(log_stream_name)
+            self._streams()[log_stream_name] = arn
+        return arn
+
+    def delete(self, log_stream_name) -> bool:
+        """Delete a log stream.  Return False if it was already gone."""
+        client = self._client()
+        try:
+            client.delete_log_stream(
+                logGroupName=self.log_group_name, logStreamName=log_stream_name
+            )
+            return True
+        except client.exceptions.ResourceNotFoundException:
+            return False
+        finally:
+            with self._lock:
+                if self._arns is not None:
+                    self._arns.pop(log_stream_name, None)
+
+
+_log_stream_indexes_lock = threading.Lock()
+_log_stream_indexes: Dict[Hashable, LogStreamIndex] = {}
+
+
+def get_log_stream_index(region, access_key_id, log_group_name) -> LogStreamIndex:
+    """Return the log stream index of a log group, creating it if needed."""
+    key = (region, access_key_id, log_group_name)
+    with _log_stream_indexes_lock:
+        index = _log_stream_indexes.get(key)
+        if index is None:
+            index = _log_stream_indexes[key] = LogStreamIndex(
+                region, access_key_id, log_group_name
+            )
+        return index
+
+
 class CloudWatchLogStreamDefinition(nixops.resources.ResourceDefinition):
     """Definition of a cloudwatch log stream."""
 
@@ -49,10 +171,6 @@ class CloudWatchLogStreamState(
     def get_type(cls):
         return "cloudwatch-log-stream"
 
-    def __init__(self, depl, name, id):
-        nixops.resources.ResourceState.__init__(self, depl, name, id)
-        self._conn = None
-
     def show_type(self):
         s = super(CloudWatchLogStreamState, self).show_type()
         if self.region:
@@ -72,19 +190,8 @@ class CloudWatchLogStreamState(
     def get_definition_prefix(self):
         return "resources.cloudwatchLogStreams."
 
-    def _connect(self):
-        if self._conn:
-            return self._conn
-        assert self.region
-        (access_key_id, secret_access_key) = nixops_aws.ec2_utils.fetch_aws_secret_key(
-            self.access_key_id
-        )
-        self._conn = boto.logs.connect_to_region(
-            region_name=self.region,
-            aws_access_key_id=access_key_id,
-            aws_secret_access_key=secret_access_key,
-        )
-        return self._conn
+    def _index(self, region, log_group_name):
+        return get_log_stream_index(region, self.access_key_id, log_group_name)
 
     def _destroy(self):
         if self.state != self.UP:
@@ -92,11 +199,9 @@ class CloudWatchLogStreamState(
         self.log(
             "destroying cloudwatch log stream ‘{0}’...".format(self.log_stream_name)
         )
-        try:
-            self._connect().delete_log_stream(
-                log_group_name=self.log_group_name, log_stream_name=self.log_stream_name
-            )
-        except boto.logs.exceptions.ResourceNotFoundException:
+        if not self._index(self.region, self.log_group_name).delete(
+            self.log_stream_name
+        ):
             self.log(
                 "the log group ‘{0}’ or log stream ‘{1}’ was already deleted".format(
                     self.log_group_name, self.log_stream_name
@@ -109,27 +214,6 @@ class CloudWatchLogStreamState(
             self.region = None
             self.arn = None
 
-    def lookup_cloudwatch_log_stream(
-        self, log_group_name, log_stream_name, next_token=None
-    ):
-        if log_stream_name:
-            response = self._connect().describe_log_streams(
-                log_group_name=log_group_name,
-                log_stream_name_prefix=log_stream_name,
-                next_token=next_token,
-            )
-            if "logStreams" in response:
-                for log_stream in response["logStreams"]:
-                    if log_stream_name == log_stream["logStreamName"]:
-                        return True, log_stream["arn"]
-            if "nextToken" in response:
-                self.lookup_cloudwatch_log_stream(
-                    log_group_name=log_group_name,
-                    log_stream_name=log_stream_name,
-                    next_token=response["nextToken"],
-                )
-        return False, None
-
     def create_after(self, resources, defn):
         # FIXME can be improved to check that we only need to wait for
         # the needed Log Groups to be created and not all Log Groups resources
@@ -155,27 +239,16 @@ class CloudWatchLogStreamState(
         ):
             self.log("cloudwatch log stream definition changed, recreating...")
             self._destroy()
-            self._conn = None
 
-        self.region = defn.config["region"]
-        exist, arn = self.lookup_cloudwatch_log_stream(
-            log_group_name=self.log_group_name, log_stream_name=self.log_stream_name
-        )
-
-        if self.arn is None or not exist:
+        index = self._index(defn.config["region"], defn.config["logGroupName"])
+        arn = index.get(defn.config["name"])
+        if arn is None:
             self.log(
                 "creating cloudwatch log stream ‘{0}’ under log group ‘{1}’...".format(
                     defn.config["name"], defn.config["logGroupName"]
                 )
             )
-            self._connect().create_log_stream(
-                log_stream_name=defn.config["name"],
-                log_group_name=defn.config["logGroupName"],
-            )
-            exist, arn = self.lookup_cloudwatch_log_stream(
-                log_group_name=defn.config["logGroupName"],
-                log_stream_name=defn.config["name"],
-            )
+            arn = index.create(defn.config["name"])
 
         with self.depl._db:
             self.state = self.UP
@@ -202,9 +202,9 @@ class EBSVolumeState(nixops.resources.ResourceState, ec2_common.EC2CommonState):
             self.state = self.UP
 
     def check(self):
-        volume = nixops_aws.ec2_utils.get_volume_by_id(
-            self._connect(self.region), self.volume_id
-        )
+        if not self._exists():
+            return
+        volume = self._get_prefetched_volume(self.region, self.volume_id)
         if volume is None:
             self.state = self.MISSING
 
@@ -215,9 +215,7 @@ class EBSVolumeState(nixops.resources.ResourceState, ec2_common.EC2CommonState):
         if wipe:
             self.warn("wipe is not supported")
 
-        volume = nixops_aws.ec2_utils.get_volume_by_id(
-            self._connect(self.region), self.volume_id, allow_missing=True
-        )
+        volume = self._get_prefetched_volume(self.region, self.volume_id)
         if not volume:
             return True
         if not self.depl.logger.confirm(
@@ -225,5 +223,9 @@ class EBSVolumeState(nixops.resources.ResourceState, ec2_common.EC2CommonState):
         ):
             return False
         self.log("destroying EBS volume ‘{0}’...".format(self.volume_id))
-        self._retry(lambda: volume.delete())
+        self._retry(
+            lambda: self._connect_boto3(self.region).delete_volume(
+                VolumeId=self.volume_id
+            )
+        )
         return True
@@ -1,8 +1,8 @@
 from __future__ import annotations
 import socket
 import getpass
+import concurrent.futures
 
-import boto3
 import nixops.util
 import nixops.deployment
 import nixops.resources
@@ -10,7 +10,8 @@ import nixops_aws.ec2_utils
 from nixops.state import StateDict
 from typing import Optional
 from boto.ec2.connection import EC2Connection
-from typing import Mapping, TYPE_CHECKING
+from typing import Mapping, TYPE_CHECKING, List
+from nixops.diff import Handler
 
 if TYPE_CHECKING:
     import mypy_boto3_ec2
@@ -29,10 +30,50 @@ class EC2CommonState:
     COMMON_EC2_RESERVED = ["accessKeyId", "ec2.tags"]
 
     def _retry(self, fun, **kwargs):
+        kwargs.setdefault("region", getattr(self, "region", None))
         return nixops_aws.ec2_utils.retry(fun, logger=self, **kwargs)
 
     tags = nixops.util.attr_property("ec2.tags", {}, "json")
 
+    def _region_volume_ids(self, region) -> List[str]:
+        """
+            Return the IDs of the EBS volumes of the deployment in the given
+            region and our account: those of ebs-volume resources and those
+            in the block device mappings of EC2 machines.
+        """
+        volume_ids = set()
+        for r in self.depl.active_resources.values():
+            if (
+                not isinstance(r, EC2CommonState)
+                or getattr(r, "region", None) != region
+                or r.access_key_id != self.access_key_id
+            ):
+                continue
+            volume_id = getattr(r, "volume_id", None)
+            if volume_id:
+                volume_ids.add(volume_id)
+            for v in (getattr(r, "block_device_mapping", None) or {}).values():
+                if v.get("volumeId"):
+                    volume_ids.add(v["volumeId"])
+        return list(volume_ids)
+
+    def _get_prefetched_volume(self, region, volume_id):
+        """
+            Describe an EBS volume, together with all other volumes of the
+            deployment in the same region, which then pick up their volume
+            from the prefetch instead of making their own call.  Returns
+            None if the volume doesn't exist.
+        """
+        client = nixops_aws.ec2_utils.connect_ec2_boto3(region, self.access_key_id)
+        prefetch = nixops_aws.ec2_utils.get_prefetch(
+            ("volumes", self.depl.uuid, region, self.access_key_id)
+        )
+        return prefetch.get(
+            volume_id,
+            self._region_volume_ids(region),
+            lambda ids: nixops_aws.ec2_utils.get_volumes_by_id(client, ids),
+        )
+
     def get_common_tags(self) -> Mapping[str, str]:
         tags = {
             "CharonNetworkUUID": self.depl.uuid,
@@ -66,9 +107,10 @@ class EC2CommonState:
 
         self.update_tags_using(updater, user_tags=user_tags, check=check)
 
-    def get_client(self):
+    def get_access_key_id(self) -> str:
         """
-        Generic method to get a cached EC2 AWS client or create it.
+        Return the access key of the definition, or of the environment, and
+        record it in the state.
         """
 
         # Here be dragons!
@@ -83,21 +125,76 @@ class EC2CommonState:
             raise Exception(
                 "please set 'accessKeyId', $EC2_ACCESS_KEY or $AWS_ACCESS_KEY_ID"
             )
+        return self.access_key_id
+
+    def get_client(self):
+        """
+        Generic method to get a cached EC2 AWS client or create it.
+        """
+        self.get_access_key_id()
         if hasattr(self, "_client"):
             if self._client:
                 return self._client
         assert self._state["region"]
         region: str = str(self._state["region"])
-        (access_key_id, secret_access_key) = nixops_aws.ec2_utils.fetch_aws_secret_key(
-            self.access_key_id
-        )
-        self._client: "mypy_boto3_ec2.EC2Client" = boto3.session.Session().client(
-            service_name="ec2",
-            region_name=region,
-            aws_access_key_id=access_key_id,
-            aws_secret_access_key=secret_access_key,
+        self._client: "mypy_boto3_ec2.EC2Client" = nixops_aws.ec2_utils.get_boto3_client(
+            "ec2", region, self.access_key_id
         )
         return self._client
 
     def reset_client(self):
         self._client = None
+
+
+def run_handlers(handlers: List[Handler], allow_recreate: bool, max_workers: int = 4):
+    """
+        Run the handlers planned by a diff engine, starting each one as soon
+        as the handlers it comes after have finished.  Handlers that don't
+        depend on each other run concurrently on up to ‘max_workers’
+        threads.  After a failure no new handlers are started, and the first
+        error is raised once the running ones are done.
+    """
+    pending = list(handlers)
+    done = set()
+    error = None
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while pending or running:
+            if error is None:
+                for handler in list(pending):
+                    deps = [d for d in handler.get_deps() if d in handlers]
+                    if all(d in done for d in deps):
+                        pending.remove(handler)
+                        running[
+                            executor.submit(handler.handle, allow_recreate)
+                        ] = handler
+            elif not running:
+                break
+            finished, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in finished:
+                handler = running.pop(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                else:
+                    done.add(handler)
+    if error is not None:
+        raise error
+
+
+class ConcurrentHandlersState:
+    """
+        Mixin for diff engine resources whose handlers only depend on each
+        other through their ‘after’ lists, so that the independent ones can
+        run concurrently.  It must come before DiffEngineResourceState in
+        the bases of the resource.
+    """
+
+    max_handler_workers = 4
+
+    def create(self, defn, check, allow_reboot, allow_recreate):
+        if check:
+            self._check()  # type: ignore
+        diff_engine = self.setup_diff_engine(config=defn.config)  # type: ignore
+        run_handlers(diff_engine.plan(), allow_recreate, self.max_handler_workers)
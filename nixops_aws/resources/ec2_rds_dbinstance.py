@@ -6,7 +6,8 @@ import boto.rds
 import nixops.resources
 import nixops.util
 import nixops_aws.ec2_utils
-import time
+import nixops_aws.metrics
+import nixops_aws.waiters
 from uuid import uuid4
 from . import ec2_rds_dbsecurity_group
 from .ec2_rds_dbsecurity_group import EC2RDSDbSecurityGroupState
@@ -168,6 +169,7 @@ class EC2RDSDbInstanceState(nixops.resources.ResourceState[EC2RDSDbInstanceDefin
                 aws_access_key_id=access_key_id,
                 aws_secret_access_key=secret_access_key,
             )
+            nixops_aws.metrics.instrument_boto(self._conn, "rds", self.region)
         return self._conn
 
     def _exists(self):
@@ -260,10 +262,10 @@ class EC2RDSDbInstanceState(nixops.resources.ResourceState[EC2RDSDbInstanceDefin
 
     def _wait_for_dbinstance(self, dbinstance, state="available"):
         self.log_start("waiting for database instance state=`{0}` ".format(state))
-        while True:
-            dbinstance.update()
-            self.log_continue("[{0}] ".format(dbinstance.status))
-            if dbinstance.status not in {
+
+        def reached(db):
+            status = db["DBInstanceStatus"] if db else "missing"
+            if status not in {
                 "creating",
                 "backing-up",
                 "available",
@@ -272,12 +274,31 @@ class EC2RDSDbInstanceState(nixops.resources.ResourceState[EC2RDSDbInstanceDefin
             }:
                 raise Exception(
                     "RDS database instance ‘{0}’ in an error state (state is ‘{1}’)".format(
-                        dbinstance.id, dbinstance.status
+                        dbinstance.id, status
                     )
                 )
-            if dbinstance.status == state:
-                break
-            time.sleep(6)
+            return status == state
+
+        self._wait_for(dbinstance.id, reached)
+        dbinstance.update()
+
+    def _wait_for_deletion(self, dbinstance):
+        """Wait until a database instance is no longer being deleted."""
+        self._wait_for(
+            dbinstance.id,
+            lambda db: db is None or db["DBInstanceStatus"] != "deleting",
+        )
+
+    def _wait_for(self, dbinstance_id, condition):
+        nixops_aws.waiters.wait_for(
+            "db-instances",
+            self.region,
+            self.access_key_id,
+            dbinstance_id,
+            condition,
+            logger=self,
+            status=lambda db: db["DBInstanceStatus"] if db else "missing",
+        )
 
     def _copy_dbinstance_attrs(
         self, dbinstance, rds_security_groups, vpc_security_groups
@@ -403,13 +424,7 @@ class EC2RDSDbInstanceState(nixops.resources.ResourceState[EC2RDSDbInstanceDefin
                                 dbinstance.id
                             )
                         )
-                        while True:
-                            if dbinstance.status == "deleting":
-                                continue
-                            else:
-                                break
-                            self.log_continue("[{0}] ".format(dbinstance.status))
-                            time.sleep(6)
+                        self._wait_for_deletion(dbinstance)
 
                     self.logger.log(
                         "RDS instance `{0}` is MISSING but already exists, synchronizing state".format(
@@ -565,13 +580,7 @@ class EC2RDSDbInstanceState(nixops.resources.ResourceState[EC2RDSDbInstanceDefin
                     self.rds_dbinstance_id, final_snapshot_id=final_snapshot_id
                 )
 
-                while True:
-                    if dbinstance.status == "deleting":
-                        continue
-                    else:
-                        break
-                    self.log_continue("[{0}] ".format(dbinstance.status))
-                    time.sleep(6)
+                self._wait_for_deletion(dbinstance)
 
             else:
                 self.logger.log(
@@ -1,6 +1,5 @@
 import botocore.exceptions
 import botocore.errorfactory
-import boto3
 import nixops.util
 import nixops.resources
 import nixops_aws.ec2_utils
@@ -225,13 +224,7 @@ class EC2RDSDbSecurityGroupState(
         if self._rds_client:
             return self._rds_client
         assert self._state["region"]
-        (access_key_id, secret_access_key) = nixops_aws.ec2_utils.fetch_aws_secret_key(
-            self.access_key_id
-        )
-        self._rds_client = boto3.session.Session().client(
-            service_name="rds",
-            region_name=self._state["region"],
-            aws_access_key_id=access_key_id,
-            aws_secret_access_key=secret_access_key,
+        self._rds_client = nixops_aws.ec2_utils.get_boto3_client(
+            "rds", self._state["region"], self.access_key_id
         )
         return self._rds_client
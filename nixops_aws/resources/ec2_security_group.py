@@ -2,7 +2,8 @@
 
 # Automatic provisioning of EC2 security groups.
 
-import boto.ec2.securitygroup
+import boto.exception
+import botocore.exceptions
 import nixops.resources
 import nixops.util
 import nixops_aws.ec2_utils
@@ -121,7 +122,9 @@ class EC2SecurityGroupState(nixops.resources.ResourceState[EC2SecurityGroupDefin
 
     def create(self, defn, check, allow_reboot, allow_recreate):  # noqa: C901
         def retry_notfound(f):
-            nixops_aws.ec2_utils.retry(f, error_codes=["InvalidGroup.NotFound"])
+            nixops_aws.ec2_utils.retry(
+                f, error_codes=["InvalidGroup.NotFound"], region=self.region
+            )
 
         # Name or region change means a completely new security group
         if self.security_group_name and (
@@ -180,7 +183,10 @@ class EC2SecurityGroupState(nixops.resources.ResourceState[EC2SecurityGroupDefin
                             else:
                                 group = (
                                     nixops_aws.ec2_utils.id_to_security_group_name(
-                                        self._conn, grant.groupId, self.vpc_id
+                                        self.region,
+                                        self.access_key_id,
+                                        grant.groupId,
+                                        self.vpc_id,
                                     )
                                     if self.vpc_id
                                     else grant.groupName
@@ -220,6 +226,9 @@ class EC2SecurityGroupState(nixops.resources.ResourceState[EC2SecurityGroupDefin
                     defn.vpc_id,
                 )
                 self.security_group_id = grp.id
+                nixops_aws.ec2_utils.invalidate_security_groups(
+                    self.region, self.access_key_id, defn.vpc_id
+                )
                 # If group creation succeeded, the group wasn't there before,
                 # in which case also its rules must be (re-)created below.
                 security_group_was_created = True
@@ -249,41 +258,27 @@ class EC2SecurityGroupState(nixops.resources.ResourceState[EC2SecurityGroupDefin
                     self.security_group_name
                 )
             )
-            if grp is None:
-                self._connect()
-                grp = self.get_security_group()
-            for rule in new_rules:
-                try:
-                    if len(rule) == 4:
-                        retry_notfound(
-                            lambda: grp.authorize(
-                                ip_protocol=rule[0],
-                                from_port=rule[1],
-                                to_port=rule[2],
-                                cidr_ip=rule[3],
-                            )
-                        )
-                    else:
-                        args = {}
-                        args["owner_id"] = rule[4]
-                        if self.vpc_id:
-                            args["id"] = nixops_aws.ec2_utils.name_to_security_group(
-                                self._conn, rule[3], self.vpc_id
-                            )
-                        else:
-                            args["name"] = rule[3]
-                        src_group = boto.ec2.securitygroup.SecurityGroup(**args)
+            permissions = self._ip_permissions(new_rules)
+            try:
+                retry_notfound(
+                    lambda: self._connect_boto3().authorize_security_group_ingress(
+                        IpPermissions=permissions, **self._group_args()
+                    )
+                )
+            except botocore.exceptions.ClientError as e:
+                if e.response["Error"]["Code"] != "InvalidPermission.Duplicate":
+                    raise
+                # Some of the rules exist already; add the others one by one.
+                for permission in permissions:
+                    try:
                         retry_notfound(
-                            lambda: grp.authorize(
-                                ip_protocol=rule[0],
-                                from_port=rule[1],
-                                to_port=rule[2],
-                                src_group=src_group,
+                            lambda: self._connect_boto3().authorize_security_group_ingress(
+                                IpPermissions=[permission], **self._group_args()
                             )
                         )
-                except boto.exception.EC2ResponseError as e:
-                    if e.error_code != "InvalidPermission.Duplicate":
-                        raise
+                    except botocore.exceptions.ClientError as e:
+                        if e.response["Error"]["Code"] != "InvalidPermission.Duplicate":
+                            raise
 
         if old_rules:
             self.logger.log(
@@ -291,37 +286,53 @@ class EC2SecurityGroupState(nixops.resources.ResourceState[EC2SecurityGroupDefin
                     self.security_group_name
                 )
             )
-            if grp is None:
-                self._connect()
-                grp = self.get_security_group()
-            for rule in old_rules:
-                if len(rule) == 4:
-                    grp.revoke(
-                        ip_protocol=rule[0],
-                        from_port=rule[1],
-                        to_port=rule[2],
-                        cidr_ip=rule[3],
-                    )
-                else:
-                    args = {}
-                    args["owner_id"] = rule[4]
-                    if self.vpc_id:
-                        args["id"] = nixops_aws.ec2_utils.name_to_security_group(
-                            self._conn, rule[3], self.vpc_id
-                        )
-                    else:
-                        args["name"] = rule[3]
-                    src_group = boto.ec2.securitygroup.SecurityGroup(**args)
-                    grp.revoke(
-                        ip_protocol=rule[0],
-                        from_port=rule[1],
-                        to_port=rule[2],
-                        src_group=src_group,
-                    )
+            self._connect_boto3().revoke_security_group_ingress(
+                IpPermissions=self._ip_permissions(old_rules), **self._group_args()
+            )
         self.security_group_rules = resolved_security_group_rules
 
         self.state = self.UP
 
+    def _connect_boto3(self):
+        return nixops_aws.ec2_utils.connect_ec2_boto3(self.region, self.access_key_id)
+
+    def _group_args(self):
+        if self.vpc_id:
+            return {"GroupId": self.security_group_id}
+        else:
+            return {"GroupName": self.security_group_name}
+
+    def _ip_permissions(self, rules):
+        """
+            Turn rules into an ‘IpPermissions’ list for a single authorize or
+            revoke call.
+        """
+        permissions = []
+        for rule in sorted(rules, key=str):
+            permission = {"IpProtocol": rule[0]}
+            # Ports are null for all-protocol rules and ICMP rules without
+            # a type or code, and boto3 rejects None values.
+            if rule[1] is not None:
+                permission["FromPort"] = rule[1]
+            if rule[2] is not None:
+                permission["ToPort"] = rule[2]
+            if len(rule) == 4:
+                permission["IpRanges"] = [{"CidrIp": rule[3]}]
+            else:
+                if self.vpc_id:
+                    pair = {
+                        "GroupId": nixops_aws.ec2_utils.name_to_security_group(
+                            self.region, self.access_key_id, rule[3], self.vpc_id
+                        )
+                    }
+                else:
+                    pair = {"GroupName": rule[3]}
+                if rule[4]:
+                    pair["UserId"] = rule[4]
+                permission["UserIdGroupPairs"] = [pair]
+            permissions.append(permission)
+        return permissions
+
     def get_security_group(self):
         if self.vpc_id:
             return self._connect().get_all_security_groups(
@@ -345,6 +356,7 @@ class EC2SecurityGroupState(nixops.resources.ResourceState[EC2SecurityGroupDefin
             except boto.exception.EC2ResponseError as e:
                 if e.error_code != "InvalidGroup.NotFound":
                     raise
+            nixops_aws.ec2_utils.invalidate_security_groups(region, self.access_key_id)
         self.old_security_groups = []
 
     def destroy(self, wipe=False):
@@ -361,10 +373,14 @@ class EC2SecurityGroupState(nixops.resources.ResourceState[EC2SecurityGroupDefin
                         group_id=self.security_group_id
                     ),
                     error_codes=["DependencyViolation"],
+                    region=self.region,
                 )
             except boto.exception.EC2ResponseError as e:
                 if e.error_code != "InvalidGroup.NotFound":
                     raise
+            nixops_aws.ec2_utils.invalidate_security_groups(
+                self.region, self.access_key_id, self.vpc_id
+            )
 
             self.state = self.MISSING
         return True
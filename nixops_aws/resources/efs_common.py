@@ -1,5 +1,4 @@
 from __future__ import annotations
-import boto3
 from typing import Optional, TYPE_CHECKING
 import nixops_aws.ec2_utils
 
@@ -18,10 +17,6 @@ class EFSCommonState:
         if self._efs_client:
             return self._efs_client
 
-        (access_key_id, secret_access_key) = nixops_aws.ec2_utils.fetch_aws_secret_key(
-            access_key_id or self.access_key_id
-        )
-
         if region is not None:
             region_name = region
         elif self.region is not None:
@@ -29,11 +24,8 @@ class EFSCommonState:
         else:
             raise Exception("region and self.region are None")
 
-        client: "mypy_boto3_efs.EFSClient" = boto3.session.Session().client(
-            "efs",
-            region_name=region_name,
-            aws_access_key_id=access_key_id,
-            aws_secret_access_key=secret_access_key,
+        client: "mypy_boto3_efs.EFSClient" = nixops_aws.ec2_utils.get_boto3_client(
+            "efs", region_name, access_key_id or self.access_key_id
         )
         self._efs_client = client
 
@@ -10,7 +10,7 @@ import nixops_aws.ec2_utils
 import nixops.resources
 from . import ec2_common
 from . import efs_common
-import time
+import nixops_aws.waiters
 
 from .types.elastic_file_system import ElasticFileSystemOptions
 
@@ -94,31 +94,32 @@ class ElasticFileSystemState(
                 if e.response["Error"]["Code"] == "FileSystemAlreadyExists":
                     pass
 
-            while True:
-                fss = client.describe_file_systems(CreationToken=self.creation_token)[
-                    "FileSystems"
-                ]
-                assert len(fss) <= 1
-
-                if len(fss) == 1:
-                    fs = fss[0]
-                    if fs["LifeCycleState"] == "available":
-                        with self.depl._db:
-                            self.state = self.UP
-                            self.fs_id = fs["FileSystemId"]
-                            self.region = defn.config.region
-                            self.access_key_id = access_key_id
-                            self.creation_token = None
-                        break
-                    if fs["LifeCycleState"] != "creating":
-                        raise Exception(
-                            "Elastic File System ‘{0}’ is in unexpected state ‘{1}’".format(
-                                fs["FileSystemId"], fs["LifeCycleState"]
-                            )
+            def available(fs):
+                if fs is None:
+                    return False
+                if fs["LifeCycleState"] not in {"available", "creating"}:
+                    raise Exception(
+                        "Elastic File System ‘{0}’ is in unexpected state ‘{1}’".format(
+                            fs["FileSystemId"], fs["LifeCycleState"]
                         )
-
-                self.log_continue(".")
-                time.sleep(1)
+                    )
+                return fs["LifeCycleState"] == "available"
+
+            fs = nixops_aws.waiters.wait_for(
+                "file-systems",
+                defn.config.region,
+                access_key_id,
+                self.creation_token,
+                available,
+                logger=self,
+                status=lambda fs: fs["LifeCycleState"] if fs else "missing",
+            )
+            with self.depl._db:
+                self.state = self.UP
+                self.fs_id = fs["FileSystemId"]
+                self.region = defn.config.region
+                self.access_key_id = access_key_id
+                self.creation_token = None
 
             self.log_end(" done")
 
@@ -166,20 +167,13 @@ class ElasticFileSystemState(
                 if e.response["Error"]["Code"] == "FileSystemNotFound":
                     pass
 
-            while True:
-                try:
-                    fss = client.describe_file_systems(FileSystemId=self.fs_id)[
-                        "FileSystems"
-                    ]
-                    assert len(fss) == 1
-                    if fss[0]["LifeCycleState"] == "deleted":
-                        break
-                    self.log_continue(".")
-                    time.sleep(1)
-                except botocore.exceptions.ClientError as e:
-                    if e.response["Error"]["Code"] == "FileSystemNotFound":
-                        break
-                    time.sleep(1)
+            nixops_aws.waiters.wait_for(
+                "file-systems",
+                self.region,
+                self.access_key_id,
+                self.fs_id,
+                lambda fs: fs is None or fs["LifeCycleState"] == "deleted",
+            )
 
             with self.depl._db:
                 self.state = self.MISSING
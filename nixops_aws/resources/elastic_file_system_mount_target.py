@@ -221,14 +221,15 @@ class ElasticFileSystemMountTargetState(
         return True
 
     def security_groups_to_ids(self, region, access_key_id, subnetId, groups):
-        conn = nixops_aws.ec2_utils.connect(region, access_key_id)
         conn_vpc = nixops_aws.ec2_utils.connect_vpc(region, access_key_id)
 
         sg_names = [g for g in groups if not g.startswith("sg-")]
         if sg_names != [] and subnetId != "":
             vpc_id = conn_vpc.get_all_subnets([subnetId])[0].vpc_id
             groups = [
-                nixops_aws.ec2_utils.name_to_security_group(conn, g, vpc_id)
+                nixops_aws.ec2_utils.name_to_security_group(
+                    region, access_key_id, g, vpc_id
+                )
                 for g in groups
             ]
 
@@ -2,24 +2,39 @@
 
 # Automatic provisioning of AWS IAM roles.
 
-import boto
-import boto.iam
-import boto3
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import botocore.exceptions
 import nixops.util
 import nixops.resources
 import nixops_aws.resources
 import nixops_aws.ec2_utils
-from boto.exception import BotoServerError
 
 from .types.iam_role import IamRoleOptions
 
-
-class IamPermissionException(BotoServerError):
-    pass
-
-
-class IamNotFound(BotoServerError):
-    pass
+# The trust policy of roles created without an explicit assumeRolePolicy:
+# the role can be assumed by EC2 instances.
+DEFAULT_ASSUME_ROLE_POLICY = json.dumps(
+    {
+        "Statement": [
+            {
+                "Effect": "Allow",
+                "Principal": {"Service": ["ec2.amazonaws.com"]},
+                "Action": ["sts:AssumeRole"],
+            }
+        ]
+    }
+)
+
+
+def _run_concurrently(fns: List[Callable[[], Any]]) -> List[Any]:
+    if len(fns) <= 1:
+        return [fn() for fn in fns]
+    with ThreadPoolExecutor(max_workers=len(fns)) as executor:
+        futures = [executor.submit(fn) for fn in fns]
+        return [f.result() for f in futures]
 
 
 class IAMRoleDefinition(nixops.resources.ResourceDefinition):
@@ -67,7 +82,6 @@ class IAMRoleState(nixops.resources.ResourceState[IAMRoleDefinition]):
 
     def __init__(self, depl, name, id):
         nixops.resources.ResourceState.__init__(self, depl, name, id)
-        self._conn = None
         self._conn_boto3 = None
 
     def show_type(self):
@@ -81,94 +95,112 @@ class IAMRoleState(nixops.resources.ResourceState[IAMRoleDefinition]):
     def get_definition_prefix(self):
         return "resources.iamRoles."
 
-    def _connect(self):
-        if self._conn:
-            return self._conn
-        (access_key_id, secret_access_key) = nixops_aws.ec2_utils.fetch_aws_secret_key(
-            self.access_key_id
-        )
-        self._conn = boto.connect_iam(
-            aws_access_key_id=access_key_id, aws_secret_access_key=secret_access_key
-        )
-        return self._conn
-
     def _connect_boto3(self):
         if self._conn_boto3:
             return self._conn_boto3
-        self._conn_boto3 = boto3.client("iam")
+        self._conn_boto3 = nixops_aws.ec2_utils.get_boto3_client(
+            "iam", None, self.access_key_id
+        )
         return self._conn_boto3
 
-    def _destroy(self):  # noqa: C901
+    def _call(self, method, **kwargs):
+        """
+            Call an IAM API method, returning None if the entity it refers
+            to does not exist.
+        """
+        try:
+            return getattr(self._connect_boto3(), method)(**kwargs)
+        except botocore.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] == "NoSuchEntity":
+                return None
+            raise
+
+    def _fetch(self, name) -> Dict[str, Any]:
+        """
+            Fetch the role, its inline policy and its instance profile
+            concurrently.  Entities that don't exist are returned as None.
+        """
+        role, policy, instance_profile = _run_concurrently(
+            [
+                lambda: self._call("get_role", RoleName=name),
+                lambda: self._call("get_role_policy", RoleName=name, PolicyName=name),
+                lambda: self._call("get_instance_profile", InstanceProfileName=name),
+            ]
+        )
+        return {
+            "role": role and role["Role"],
+            "policy": policy and policy["PolicyDocument"],
+            "instance_profile": instance_profile
+            and instance_profile["InstanceProfile"],
+        }
+
+    def _apply(self, stages):
+        """
+            Apply mutations in dependency order.  The (description, method,
+            arguments) triples of a stage are applied concurrently, after
+            all those of the previous stage.  Mutations of entities that
+            are already gone are skipped with a warning.
+        """
+
+        def apply(description, method, kwargs):
+            if self._call(method, **kwargs) is None:
+                self.warn("{0} already removed".format(description))
+
+        for stage in stages:
+            _run_concurrently([lambda m=m: apply(*m) for m in stage])
+
+    def _destroy(self):
         if self.state != self.UP:
             return
 
-        try:
-            try:
-                # check for the existance
-                self._get_instance_profile(self.role_name)
-                self._get_role(self.role_name)
-                # sever the link
-                self._connect().remove_role_from_instance_profile(
-                    self.role_name, self.role_name
+        name = self.role_name
+        current = self._fetch(name)
+        instance_profile = current["instance_profile"]
+        if instance_profile is None:
+            self.warn("instance profile already destroyed")
+        if current["policy"] is None:
+            self.warn("role policy already destroyed")
+        if current["role"] is None:
+            self.warn("could not find role")
+
+        unlink = []
+        if instance_profile is not None and any(
+            r["RoleName"] == name for r in instance_profile.get("Roles", [])
+        ):
+            unlink.append(
+                (
+                    "role in instance profile",
+                    "remove_role_from_instance_profile",
+                    dict(InstanceProfileName=name, RoleName=name),
+                )
+            )
+        if current["policy"] is not None:
+            self.log("removing role policy")
+            unlink.append(
+                (
+                    "role policy",
+                    "delete_role_policy",
+                    dict(RoleName=name, PolicyName=name),
                 )
-            except IamPermissionException as e:
-                self.log(str(e))
-                raise
-            except IamNotFound:
-                self.warn("instance profile already destroyed")
-            except BotoServerError as e:
-                if e.status == 404:
-                    self.warn("instance profile probably already removed from role")
-            except Exception as e:
-                self.log("error removing instance profile: " + str(e))
-                raise
-
-            try:
-                self._connect().get_role_policy(self.role_name, self.role_name)
-                self.log("removing role policy")
-                self._connect().delete_role_policy(self.role_name, self.role_name)
-            except IamPermissionException as e:
-                self.warn(str(e))
-                raise
-            except IamNotFound:
-                self.warn("role policy already destroyed")
-            except BotoServerError as e:
-                if e.status == 404:
-                    self.warn("role policy already removed")
-            except Exception as e:
-                self.log("error removing role policy: " + str(e))
-                raise
-
-            try:
-                self._get_role(self.role_name)
-                self.log("removing role")
-                self._connect().delete_role(self.role_name)
-            except IamPermissionException:
-                raise
-            except IamNotFound:
-                self.warn("could not find role")
-            except BotoServerError as e:
-                if e.status == 404:
-                    self.warn("role already removed")
-
-            except Exception as e:
-                self.log("error removing role: " + str(e))
-                raise
+            )
 
+        delete = []
+        if current["role"] is not None:
+            self.log("removing role")
+            delete.append(("role", "delete_role", dict(RoleName=name)))
+        if instance_profile is not None:
             self.log("removing instance profile")
-            self._connect().delete_instance_profile(self.role_name)
+            delete.append(
+                (
+                    "instance profile",
+                    "delete_instance_profile",
+                    dict(InstanceProfileName=name),
+                )
+            )
 
-        except IamPermissionException:
-            raise
-        except IamNotFound:
-            self.warn("instance profile already destroyed")
-        except BotoServerError as e:
-            if e.status == 404:
-                self.warn("instance profile already removed")
-
-        except Exception as e:
-            self.log(str(e))
-            raise
+        # The role can only be deleted once it is out of the instance
+        # profile and has no inline policy left.
+        self._apply([unlink, delete])
 
         with self.depl._db:
             self.state = self.MISSING
@@ -185,48 +217,6 @@ class IAMRoleState(nixops.resources.ResourceState[IAMRoleDefinition]):
             if isinstance(r, nixops_aws.resources.s3_bucket.S3BucketState)
         }
 
-    def _get_instance_profile(self, name, allow404=True):
-        try:
-            return self._connect().get_instance_profile(name)
-        except BotoServerError as e:
-            if e.status == 403:
-                raise IamPermissionException(e.status, e.reason, body=e.body)
-            if e.status == 404:
-                if allow404:
-                    return False
-                else:
-                    raise IamNotFound(e.status, e.reason, body=e.body)
-        except Exception:
-            raise
-
-    def _get_role_policy(self, name, allow404=True):
-        try:
-            return self._connect().get_role_policy(name, name)
-        except BotoServerError as e:
-            if e.status == 403:
-                raise IamPermissionException(e.status, e.reason, body=e.body)
-            if e.status == 404:
-                if allow404:
-                    return False
-                else:
-                    raise IamNotFound(e.status, e.reason, body=e.body)
-        except Exception:
-            raise
-
-    def _get_role(self, name, allow404=True):
-        try:
-            return self._connect().get_role(name)
-        except BotoServerError as e:
-            if e.status == 403:
-                raise IamPermissionException(e.status, e.reason, body=e.body)
-            if e.status == 404:
-                if allow404:
-                    return False
-                else:
-                    raise IamNotFound(e.status, e.reason, body=e.body)
-        except Exception:
-            raise
-
     def create(self, defn, check, allow_reboot, allow_recreate):
 
         self.access_key_id = (
@@ -237,40 +227,58 @@ class IAMRoleState(nixops.resources.ResourceState[IAMRoleDefinition]):
                 "please set ‘accessKeyId’, $EC2_ACCESS_KEY or $AWS_ACCESS_KEY_ID"
             )
 
-        ip = self._get_instance_profile(defn.role_name, True)
-        self._get_role_policy(defn.role_name, True)
-        r = self._get_role(defn.role_name, True)
-
-        if not r:
-            self.log("creating IAM role ‘{0}’...".format(defn.role_name))
-            self._connect().create_role(defn.role_name)
-
-        if not ip:
-            self.log("creating IAM instance profile ‘{0}’...".format(defn.role_name))
-            self._connect().create_instance_profile(defn.role_name, "/")
-            self._connect().add_role_to_instance_profile(defn.role_name, defn.role_name)
-
-        if not check:
-            self._connect().put_role_policy(defn.role_name, defn.role_name, defn.policy)
+        name = defn.role_name
+        current = self._fetch(name)
+        client = self._connect_boto3()
+        canonical_json = nixops_aws.ec2_utils.canonical_json
+
+        role = current["role"]
+        if role is None:
+            self.log("creating IAM role ‘{0}’...".format(name))
+            role = client.create_role(
+                RoleName=name,
+                AssumeRolePolicyDocument=defn.assume_role_policy
+                or DEFAULT_ASSUME_ROLE_POLICY,
+            )["Role"]
+        elif defn.assume_role_policy != "" and canonical_json(
+            json.loads(defn.assume_role_policy)
+        ) != canonical_json(role["AssumeRolePolicyDocument"]):
+            client.update_assume_role_policy(
+                RoleName=name, PolicyDocument=defn.assume_role_policy
+            )
 
-        if defn.assume_role_policy != "":
-            self._connect().update_assume_role_policy(
-                defn.role_name, defn.assume_role_policy
+        instance_profile = current["instance_profile"]
+        if instance_profile is None:
+            self.log("creating IAM instance profile ‘{0}’...".format(name))
+            instance_profile = client.create_instance_profile(
+                InstanceProfileName=name, Path="/"
+            )["InstanceProfile"]
+        if not any(r["RoleName"] == name for r in instance_profile.get("Roles", [])):
+            client.add_role_to_instance_profile(InstanceProfileName=name, RoleName=name)
+
+        if current["policy"] is None or canonical_json(
+            json.loads(defn.policy)
+        ) != canonical_json(current["policy"]):
+            client.put_role_policy(
+                RoleName=name, PolicyName=name, PolicyDocument=defn.policy
             )
-        if defn.tags and defn.tags != self.tags:
+
+        tags = {t["Key"]: t["Value"] for t in role.get("Tags", [])}
+        new_tags = {k: v for k, v in defn.tags.items() if tags.get(k) != v}
+        if new_tags:
             self.log("applying tags...")
-            self._connect_boto3().tag_role(
-                RoleName=defn.role_name,
-                Tags=[{"Key": k, "Value": defn.tags[k]} for k in defn.tags],
+            client.tag_role(
+                RoleName=name,
+                Tags=[{"Key": k, "Value": v} for k, v in new_tags.items()],
             )
-        old_tags = list(set(self.tags.keys()) - set(defn.tags.keys()))
+        old_tags = [k for k in self.tags if k not in defn.tags and k in tags]
         if old_tags:
             self.log(f"removing old tags : {old_tags}")
-            self._connect_boto3().untag_role(RoleName=defn.role_name, TagKeys=old_tags)
+            client.untag_role(RoleName=name, TagKeys=old_tags)
 
         with self.depl._db:
             self.state = self.UP
-            self.role_name = defn.role_name
+            self.role_name = name
             self.policy = defn.policy
             self.tags = defn.tags
 
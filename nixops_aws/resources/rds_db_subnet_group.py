@@ -121,6 +121,7 @@ class RDSDbSubnetGroupState(nixops.resources.ResourceState[RDSDbSubnetGroupDefin
                 ),
                 error_codes=["DependencyViolation"],
                 logger=self.logger,
+                region=self.region,
             )
         except client.exceptions.DBSubnetGroupNotFoundFault:
             pass
@@ -4,7 +4,6 @@
 
 import os
 import botocore
-import boto3
 import uuid
 import nixops.util
 import nixops.resources
@@ -77,7 +76,6 @@ class Route53HealthCheckState(
 
     def __init__(self, depl, name, id):
         nixops.resources.ResourceState.__init__(self, depl, name, id)
-        self._boto_session = None
 
     @property
     def resource_id(self):
@@ -86,16 +84,10 @@ class Route53HealthCheckState(
     def prefix_definition(self, attr):
         return {("resources", "route53HealthChecks"): attr}
 
-    def boto_session(self):
-        if self._boto_session is None:
-            (
-                access_key_id,
-                secret_access_key,
-            ) = nixops_aws.ec2_utils.fetch_aws_secret_key(self.access_key_id)
-            self._boto_session = boto3.session.Session(
-                aws_access_key_id=access_key_id, aws_secret_access_key=secret_access_key
-            )
-        return self._boto_session
+    def _get_client(self):
+        return nixops_aws.ec2_utils.get_boto3_client(
+            "route53", None, self.access_key_id
+        )
 
     def resolve_health_check(self, id):
         if id.startswith("res-"):
@@ -164,7 +156,7 @@ class Route53HealthCheckState(
         if not (self.access_key_id or os.environ["AWS_ACCESS_KEY_ID"]):
             raise Exception("please set ‘accessKeyId’ or $AWS_ACCESS_KEY_ID")
 
-        client = self.boto_session().client("route53")
+        client = self._get_client()
 
         def cannot_change(desc, sk, d):
             if (
@@ -215,7 +207,7 @@ class Route53HealthCheckState(
         return True
 
     def destroy(self, wipe=False):
-        client = self.boto_session().client("route53")
+        client = self._get_client()
 
         if not self.health_check_id:
             return True
@@ -4,7 +4,6 @@
 
 import os
 import botocore
-import boto3
 import uuid
 import nixops.util
 import nixops.resources
@@ -62,7 +61,6 @@ class Route53HostedZoneState(
 
     def __init__(self, depl, name, id):
         nixops.resources.ResourceState.__init__(self, depl, name, id)
-        self._boto_session = None
 
     @property
     def resource_id(self):
@@ -74,16 +72,10 @@ class Route53HostedZoneState(
     def get_physical_spec(self):
         return {"delegationSet": self.delegation_set}
 
-    def boto_session(self):
-        if self._boto_session is None:
-            (
-                access_key_id,
-                secret_access_key,
-            ) = nixops_aws.ec2_utils.fetch_aws_secret_key(self.access_key_id)
-            self._boto_session = boto3.session.Session(
-                aws_access_key_id=access_key_id, aws_secret_access_key=secret_access_key
-            )
-        return self._boto_session
+    def _get_client(self):
+        return nixops_aws.ec2_utils.get_boto3_client(
+            "route53", None, self.access_key_id
+        )
 
     def create(self, defn, check, allow_reboot, allow_recreate):
         self.access_key_id = (
@@ -92,7 +84,7 @@ class Route53HostedZoneState(
         if not (self.access_key_id or os.environ["AWS_ACCESS_KEY_ID"]):
             raise Exception("please set ‘accessKeyId’ or $AWS_ACCESS_KEY_ID")
 
-        client = self.boto_session().client("route53")
+        client = self._get_client()
 
         hosted_zone = None
         if self.zone_id:
@@ -152,7 +144,7 @@ class Route53HostedZoneState(
         return True
 
     def destroy(self, wipe=False):
-        client = self.boto_session().client("route53")
+        client = self._get_client()
 
         if not self.zone_id:
             return True
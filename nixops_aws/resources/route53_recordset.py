@@ -3,11 +3,11 @@
 # Automatic provisioning of AWS Route53 RecordSets.
 
 import os
-import boto3
 import nixops.util
 import nixops.resources
 import nixops.deployment
 import nixops_aws.ec2_utils
+import nixops_aws.route53_utils
 from nixops.backends import MachineState
 from . import route53_hosted_zone, route53_health_check, elastic_ip
 from .route53_hosted_zone import Route53HostedZoneState
@@ -80,7 +80,6 @@ class Route53RecordSetState(nixops.resources.ResourceState[Route53RecordSetDefin
 
     def __init__(self, depl, name, id):
         nixops.resources.ResourceState.__init__(self, depl, name, id)
-        self._boto_session = None
 
     @property
     def resource_id(self):
@@ -89,16 +88,10 @@ class Route53RecordSetState(nixops.resources.ResourceState[Route53RecordSetDefin
     def get_definition_prefix(self):
         return "resources.route53RecordSets."
 
-    def boto_session(self):
-        if self._boto_session is None:
-            (
-                access_key_id,
-                secret_access_key,
-            ) = nixops_aws.ec2_utils.fetch_aws_secret_key(self.access_key_id)
-            self._boto_session = boto3.session.Session(
-                aws_access_key_id=access_key_id, aws_secret_access_key=secret_access_key
-            )
-        return self._boto_session
+    def _get_client(self):
+        return nixops_aws.ec2_utils.get_boto3_client(
+            "route53", None, self.access_key_id
+        )
 
     def create(self, defn, check, allow_reboot, allow_recreate):  # noqa: C901
         self.access_key_id = (
@@ -120,7 +113,7 @@ class Route53RecordSetState(nixops.resources.ResourceState[Route53RecordSetDefin
                 )
             )
 
-        client = self.boto_session().client("route53")
+        client = self._get_client()
 
         zone_name = defn.zone_name
         zone_id = defn.zone_id
@@ -264,11 +257,7 @@ class Route53RecordSetState(nixops.resources.ResourceState[Route53RecordSetDefin
         # Don't care about the state for now. We'll just upsert!
         # TODO: Copy properties_changed function used in GCE/Azure's
         # check output of operation. It now just barfs an exception if something doesn't work properly
-        self.route53_retry(
-            lambda: client.change_resource_record_sets(
-                HostedZoneId=zone_id, ChangeBatch=self.make_batch("UPSERT", defn)
-            )
-        )
+        self._submit(zone_id, self.make_batch("UPSERT", defn))
 
         with self.depl._db:
             self.state = self.UP
@@ -342,20 +331,22 @@ class Route53RecordSetState(nixops.resources.ResourceState[Route53RecordSetDefin
             "are you sure you want to destroy record: {}".format(self.to_string(self))
         ):
             self.log("destroying record set ({})".format(self.to_string(self)))
-            client = self.boto_session().client("route53")
-
             # TODO: catch exception
-            self.route53_retry(
-                lambda: client.change_resource_record_sets(
-                    HostedZoneId=self.zone_id,
-                    ChangeBatch=self.make_batch("DELETE", self),
-                )
-            )
+            self._submit(self.zone_id, self.make_batch("DELETE", self))
 
             with self.depl._db:
                 self.state = self.MISSING
             return True
 
+    def _submit(self, zone_id, batch):
+        """
+            Commit a change batch together with the changes that other
+            resources make to the same zone, and wait until it is in sync.
+        """
+        nixops_aws.route53_utils.get_change_batcher(self.access_key_id, zone_id).submit(
+            batch["Changes"], retry=self.route53_retry
+        )
+
     def route53_retry(self, f):
         return nixops_aws.ec2_utils.retry(
             f, error_codes=["Throttling", "PriorRequestNotComplete"], logger=self
@@ -3,14 +3,21 @@
 # Automatic provisioning of AWS S3 buckets.
 
 import botocore
-import boto3
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import nixops.util
 import nixops.resources
 import nixops_aws.ec2_utils
 
 from .types.s3_bucket import S3BucketOptions
 
+# Maximum number of keys in a single DeleteObjects call.
+MAX_DELETE_KEYS = 1000
+
+# Number of DeleteObjects calls in flight while emptying a bucket.
+DELETE_WORKERS = 16
+
 
 class S3BucketDefinition(nixops.resources.ResourceDefinition):
     """Definition of an S3 bucket."""
@@ -77,16 +84,14 @@ class S3BucketState(nixops.resources.ResourceState[S3BucketDefinition]):
     def get_definition_prefix(self):
         return "resources.s3Buckets."
 
+    def _s3_region(self):
+        return self.region if self.region != "US" else "us-east-1"
+
     def _connect(self):
         if self._conn:
             return self._conn
-        (access_key_id, secret_access_key) = nixops_aws.ec2_utils.fetch_aws_secret_key(
-            self.access_key_id
-        )
-        self._conn = boto3.session.Session(
-            region_name=self.region if self.region != "US" else "us-east-1",
-            aws_access_key_id=access_key_id,
-            aws_secret_access_key=secret_access_key,
+        self._conn = nixops_aws.ec2_utils.get_boto3_client(
+            "s3", self._s3_region(), self.access_key_id
         )
         return self._conn
 
@@ -109,7 +114,7 @@ class S3BucketState(nixops.resources.ResourceState[S3BucketDefinition]):
                 )
             )
 
-        s3client = self._connect().client("s3")
+        s3client = self._connect()
         if check or self.state != self.UP:
 
             self.log("creating S3 bucket ‘{0}’...".format(defn.bucket_name))
@@ -134,9 +139,11 @@ class S3BucketState(nixops.resources.ResourceState[S3BucketDefinition]):
                 self.region = defn.region
                 self.persist_on_destroy = defn.persist_on_destroy
 
-        try:
+        current = self._get_configuration(s3client, defn.bucket_name)
 
-            if self.versioning != defn.versioning:
+        try:
+            versioning = (current["versioning"] or {}).get("Status") or "Suspended"
+            if versioning != defn.versioning:
                 self.log(
                     "Updating versioning configuration on ‘{0}’...".format(
                         defn.bucket_name
@@ -146,12 +153,10 @@ class S3BucketState(nixops.resources.ResourceState[S3BucketDefinition]):
                     Bucket=defn.bucket_name,
                     VersioningConfiguration={"Status": defn.versioning},
                 )
-                with self.depl._db:
-                    self.versioning = defn.versioning
 
-            if self.persist_on_destroy != defn.persist_on_destroy:
-                with self.depl._db:
-                    self.persist_on_destroy = defn.persist_on_destroy
+            with self.depl._db:
+                self.versioning = defn.versioning
+                self.persist_on_destroy = defn.persist_on_destroy
 
         except botocore.exceptions.ClientError as e:
             self.log(
@@ -161,12 +166,18 @@ class S3BucketState(nixops.resources.ResourceState[S3BucketDefinition]):
             )
             raise e
 
+        policy = current["policy"] and nixops_aws.ec2_utils.canonical_json(
+            json.loads(current["policy"]["Policy"])
+        )
         if defn.policy:
-            self.log("setting S3 bucket policy on ‘{0}’...".format(defn.bucket_name))
-            s3client.put_bucket_policy(
-                Bucket=defn.bucket_name, Policy=defn.policy.strip()
-            )
-        else:
+            if nixops_aws.ec2_utils.canonical_json(json.loads(defn.policy)) != policy:
+                self.log(
+                    "setting S3 bucket policy on ‘{0}’...".format(defn.bucket_name)
+                )
+                s3client.put_bucket_policy(
+                    Bucket=defn.bucket_name, Policy=defn.policy.strip()
+                )
+        elif policy is not None:
             try:
                 s3client.delete_bucket_policy(Bucket=defn.bucket_name)
             except botocore.exceptions.ClientError as e:
@@ -176,16 +187,17 @@ class S3BucketState(nixops.resources.ResourceState[S3BucketDefinition]):
                     raise  # (204 : Bucket didn't have any policy to delete)
 
         if defn.lifecycle:
-            self.log(
-                "setting S3 bucket lifecycle configuration on ‘{0}’...".format(
-                    defn.bucket_name
+            lifecycle = json.loads(defn.lifecycle)
+            if not _same_lifecycle(lifecycle, current["lifecycle"]):
+                self.log(
+                    "setting S3 bucket lifecycle configuration on ‘{0}’...".format(
+                        defn.bucket_name
+                    )
                 )
-            )
-            s3client.put_bucket_lifecycle_configuration(
-                Bucket=defn.bucket_name,
-                LifecycleConfiguration=json.loads(defn.lifecycle),
-            )
-        else:
+                s3client.put_bucket_lifecycle_configuration(
+                    Bucket=defn.bucket_name, LifecycleConfiguration=lifecycle,
+                )
+        elif current["lifecycle"] is not None:
             try:
                 s3client.delete_bucket_lifecycle(Bucket=defn.bucket_name)
             except botocore.exceptions.ClientError as e:
@@ -197,18 +209,115 @@ class S3BucketState(nixops.resources.ResourceState[S3BucketDefinition]):
                 raise e
 
         if not defn.website_enabled:
-            try:
-                s3client.delete_bucket_website(Bucket=defn.bucket_name)
-            except botocore.exceptions.ClientError as e:
-                if e.response["ResponseMetadata"]["HTTPStatusCode"] != 204:
-                    raise
+            if current["website"] is not None:
+                try:
+                    s3client.delete_bucket_website(Bucket=defn.bucket_name)
+                except botocore.exceptions.ClientError as e:
+                    if e.response["ResponseMetadata"]["HTTPStatusCode"] != 204:
+                        raise
         else:
             website_config = {"IndexDocument": {"Suffix": defn.website_suffix}}
             if defn.website_error_document != "":
                 website_config["ErrorDocument"] = {"Key": defn.website_error_document}
-            s3client.put_bucket_website(
-                Bucket=defn.bucket_name, WebsiteConfiguration=website_config
+            if website_config != current["website"]:
+                s3client.put_bucket_website(
+                    Bucket=defn.bucket_name, WebsiteConfiguration=website_config
+                )
+
+    def _get_configuration(self, s3client, bucket_name):
+        """
+            Fetch the versioning, policy, lifecycle and website configuration
+            of a bucket concurrently.  Configurations that are not set are
+            returned as None.
+        """
+
+        def get(method, missing_error):
+            try:
+                response = getattr(s3client, method)(Bucket=bucket_name)
+            except botocore.exceptions.ClientError as e:
+                if e.response["Error"]["Code"] == missing_error:
+                    return None
+                raise
+            response.pop("ResponseMetadata", None)
+            return response
+
+        calls = {
+            "versioning": ("get_bucket_versioning", None),
+            "policy": ("get_bucket_policy", "NoSuchBucketPolicy"),
+            "lifecycle": (
+                "get_bucket_lifecycle_configuration",
+                "NoSuchLifecycleConfiguration",
+            ),
+            "website": ("get_bucket_website", "NoSuchWebsiteConfiguration"),
+        }
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            futures = {k: executor.submit(get, *args) for k, args in calls.items()}
+            return {k: f.result() for k, f in futures.items()}
+
+    def _empty_bucket(self, s3client):
+        """
+            Delete all objects of the bucket, including old versions and
+            delete markers.  Keys are listed page by page and deleted in
+            batches of MAX_DELETE_KEYS by DELETE_WORKERS concurrent calls.
+        """
+
+        def delete(objects):
+            response = s3client.delete_objects(
+                Bucket=self.bucket_name, Delete={"Objects": objects, "Quiet": True}
             )
+            return len(objects), response.get("Errors", [])
+
+        def collect(done):
+            nonlocal deleted
+            for future in done:
+                n, batch_errors = future.result()
+                deleted += n - len(batch_errors)
+                errors.extend(batch_errors)
+
+        deleted = 0
+        errors = []
+        start = last_report = time.time()
+        pending = set()
+        batch = []
+        paginator = s3client.get_paginator("list_object_versions")
+        with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as executor:
+            for page in paginator.paginate(Bucket=self.bucket_name):
+                for o in page.get("Versions", []) + page.get("DeleteMarkers", []):
+                    batch.append({"Key": o["Key"], "VersionId": o["VersionId"]})
+                    if len(batch) < MAX_DELETE_KEYS:
+                        continue
+                    if len(pending) >= 2 * DELETE_WORKERS:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(executor.submit(delete, batch))
+                    batch = []
+
+                if time.time() - last_report >= 10:
+                    last_report = time.time()
+                    self.log(
+                        "deleted {0} objects from ‘{1}’ ({2:.0f} objects/s)...".format(
+                            deleted, self.bucket_name, deleted / (last_report - start)
+                        )
+                    )
+
+            if batch:
+                pending.add(executor.submit(delete, batch))
+            collect(wait(pending).done)
+
+        if errors:
+            raise Exception(
+                "could not delete {0} objects from S3 bucket ‘{1}’, e.g. ‘{2}’: {3}".format(
+                    len(errors),
+                    self.bucket_name,
+                    errors[0].get("Key"),
+                    errors[0].get("Message"),
+                )
+            )
+        self.log(
+            "deleted {0} objects from ‘{1}’ in {2:.1f}s".format(
+                deleted, self.bucket_name, time.time() - start
+            )
+        )
 
     def destroy(self, wipe=False):
         if self.state == self.UP:
@@ -221,9 +330,9 @@ class S3BucketState(nixops.resources.ResourceState[S3BucketDefinition]):
 
             try:
                 self.log("destroying S3 bucket ‘{0}’...".format(self.bucket_name))
-                bucket = self._connect().resource("s3").Bucket(self.bucket_name)
+                s3client = self._connect()
                 try:
-                    bucket.delete()
+                    s3client.delete_bucket(Bucket=self.bucket_name)
                 except botocore.exceptions.ClientError as e:
                     if e.response["Error"]["Code"] != "BucketNotEmpty":
                         raise
@@ -233,14 +342,31 @@ class S3BucketState(nixops.resources.ResourceState[S3BucketDefinition]):
                         )
                     ):
                         return False
-                    bucket.objects.all().delete()
-                    bucket.delete()
+                    self._empty_bucket(s3client)
+                    s3client.delete_bucket(Bucket=self.bucket_name)
             except botocore.exceptions.ClientError as e:
                 if e.response["Error"]["Code"] != "NoSuchBucket":
                     raise
         return True
 
 
+def _same_lifecycle(defined, current):
+    if current is None:
+        return False
+    defined_rules = defined.get("Rules", [])
+    current_rules = current.get("Rules", [])
+    if len(defined_rules) != len(current_rules):
+        return False
+    # S3 assigns an ID to rules that were defined without one.
+    current_rules = [
+        r if "ID" in d else {k: v for k, v in r.items() if k != "ID"}
+        for d, r in zip(defined_rules, current_rules)
+    ]
+    return nixops_aws.ec2_utils.canonical_json(
+        defined_rules
+    ) == nixops_aws.ec2_utils.canonical_json(current_rules)
+
+
 def region_to_s3_location(region):
     # S3 location names are identical to EC2 regions, except for
     # us-east-1 and eu-west-1.
@@ -7,6 +7,7 @@ import boto.sns
 import nixops.util
 import nixops.resources
 import nixops_aws.ec2_utils
+import nixops_aws.metrics
 
 from typing import List
 
@@ -85,6 +86,7 @@ class SNSTopicState(nixops.resources.ResourceState[SNSTopicDefinition]):
             aws_access_key_id=access_key_id,
             aws_secret_access_key=secret_access_key,
         )
+        nixops_aws.metrics.instrument_boto(self._conn, "sns", self.region)
         return self._conn
 
     def _destroy(self):
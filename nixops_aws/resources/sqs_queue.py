@@ -7,6 +7,7 @@ import boto.sqs
 import nixops.util
 import nixops.resources
 import nixops_aws.ec2_utils
+import nixops_aws.metrics
 from .types.sqs_queue import SqsQueueOptions
 
 
@@ -85,6 +86,7 @@ class SQSQueueState(nixops.resources.ResourceState[SQSQueueDefinition]):
             aws_access_key_id=access_key_id,
             aws_secret_access_key=secret_access_key,
         )
+        nixops_aws.metrics.instrument_boto(self._conn, "sqs", self.region)
         return self._conn
 
     def _destroy(self):
@@ -144,6 +146,7 @@ class SQSQueueState(nixops.resources.ResourceState[SQSQueueDefinition]):
                         defn.queue_name, defn.visibility_timeout
                     ),
                     error_codes=["AWS.SimpleQueueService.QueueDeletedRecently"],
+                    region=self.region,
                 )
 
             with self.depl._db:
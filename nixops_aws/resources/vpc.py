@@ -3,11 +3,11 @@
 # Automatic provisioning of AWS VPCs.
 
 import botocore
-import time
 import nixops.util
 import nixops.resources
-from nixops_aws.resources.ec2_common import EC2CommonState
+from nixops_aws.resources.ec2_common import ConcurrentHandlersState, EC2CommonState
 import nixops_aws.ec2_utils
+import nixops_aws.waiters
 from nixops.diff import Handler
 import nixops_aws.resources
 from typing import Dict
@@ -31,7 +31,9 @@ class VPCDefinition(nixops.resources.ResourceDefinition):
         return "{0}".format(self.get_type())
 
 
-class VPCState(nixops.resources.DiffEngineResourceState, EC2CommonState):
+class VPCState(
+    ConcurrentHandlersState, nixops.resources.DiffEngineResourceState, EC2CommonState
+):
     """State of a VPC."""
 
     definition_type = VPCDefinition
@@ -141,27 +143,28 @@ class VPCState(nixops.resources.DiffEngineResourceState, EC2CommonState):
         }
 
     def wait_for_vpc_available(self, vpc_id):
-        while True:
-            response = self.get_client().describe_vpcs(VpcIds=[vpc_id])
-            if len(response["Vpcs"]) == 1:
-                vpc = response["Vpcs"][0]
-                if vpc["State"] == "available":
-                    break
-                elif vpc["State"] != "pending":
-                    raise Exception(
-                        "vpc {0} is in an unexpected state {1}".format(
-                            vpc_id, vpc["State"]
-                        )
-                    )
-
-                self.log_continue(".")
-                time.sleep(1)
-            else:
+        def available(vpc):
+            if vpc is None:
                 raise Exception(
                     "couldn't find vpc {}, please run a deploy with --check".format(
-                        self._state["vpcId"]
+                        vpc_id
                     )
                 )
+            if vpc["State"] not in {"available", "pending"}:
+                raise Exception(
+                    "vpc {0} is in an unexpected state {1}".format(vpc_id, vpc["State"])
+                )
+            return vpc["State"] == "available"
+
+        nixops_aws.waiters.wait_for(
+            "vpcs",
+            self._state["region"],
+            self.access_key_id,
+            vpc_id,
+            available,
+            logger=self,
+            status=lambda vpc: vpc["State"] if vpc else "missing",
+        )
         self.log_end(" done")
 
         with self.depl._db:
@@ -234,36 +237,41 @@ class VPCState(nixops.resources.DiffEngineResourceState, EC2CommonState):
             self._state["enableDnsHostnames"] = config.config.enableDnsHostnames
 
     def wait_for_ipv6_cidr_association(self, association_id):
-        def lookup_association(association_set):
-            for assoc in association_set:
+        def lookup_association(vpc):
+            for assoc in vpc.get("Ipv6CidrBlockAssociationSet", []):
                 if association_id == assoc["AssociationId"]:
                     return assoc
 
-        while True:
-            response = self.get_client().describe_vpcs(VpcIds=[self._state["vpcId"]])
-            if len(response["Vpcs"]) == 1:
-                vpc = response["Vpcs"][0]
-                association = lookup_association(vpc["Ipv6CidrBlockAssociationSet"])
-                cidr_block_state = association["Ipv6CidrBlockState"]["State"]
-                if cidr_block_state == "associated":
-                    break
-                elif cidr_block_state != "associating":
-                    raise Exception(
-                        "ipv6 cidr block association {0} is in an unexpected state {1}".format(
-                            association_id, cidr_block_state
-                        )
-                    )
-
-                self.log_continue(".")
-                time.sleep(1)
-            else:
+        def associated(vpc):
+            if vpc is None:
                 raise Exception(
                     "couldn't find vpc {}, please run a deploy with --check".format(
                         self._state["vpcId"]
                     )
                 )
+            association = lookup_association(vpc)
+            cidr_block_state = (
+                association["Ipv6CidrBlockState"]["State"]
+                if association
+                else "associating"
+            )
+            if cidr_block_state not in {"associated", "associating"}:
+                raise Exception(
+                    "ipv6 cidr block association {0} is in an unexpected state {1}".format(
+                        association_id, cidr_block_state
+                    )
+                )
+            return cidr_block_state == "associated"
+
+        vpc = nixops_aws.waiters.wait_for(
+            "vpcs",
+            self._state["region"],
+            self.access_key_id,
+            self._state["vpcId"],
+            associated,
+        )
         self.log_end(" done")
-        return association["Ipv6CidrBlock"]
+        return lookup_association(vpc)["Ipv6CidrBlock"]
 
     def realize_associate_ipv6_cidr_block(self, allow_recreate):
         config: VPCDefinition = self.get_defn()
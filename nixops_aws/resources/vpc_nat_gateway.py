@@ -3,7 +3,7 @@
 # Automatic provisioning of AWS VPC NAT gateways.
 
 import uuid
-import time
+import nixops_aws.waiters
 
 import botocore
 
@@ -138,43 +138,30 @@ class VPCNatGatewayState(nixops.resources.DiffEngineResourceState, EC2CommonStat
             self._state["natGatewayId"] = gtw_id
 
     def wait_for_nat_gtw_deletion(self):
-        self.log(
-            "waiting for nat gateway {0} to be deleted".format(
-                self._state["natGatewayId"]
-            )
-        )
-        while True:
-            try:
-                response = self.get_client().describe_nat_gateways(
-                    NatGatewayIds=[self._state["natGatewayId"]]
-                )
-            except botocore.exceptions.ClientError as e:
-                if (
-                    e.response["Error"]["Code"] == "InvalidNatGatewayID.NotFound"
-                    or e.response["Error"]["Code"] == "NatGatewayNotFound"
-                ):
-                    self.warn(
-                        "nat gateway {} was already deleted".format(
-                            self._state["natGatewayId"]
-                        )
-                    )
-                    break
-                else:
-                    raise
-            if len(response["NatGateways"]) == 1:
-                if response["NatGateways"][0]["State"] == "deleted":
-                    break
-                elif response["NatGateways"][0]["State"] != "deleting":
-                    raise Exception(
-                        "nat gateway {0} in an unexpected state {1}".format(
-                            self._state["natGatewayId"],
-                            response["NatGateways"][0]["State"],
-                        )
+        gtw_id = self._state["natGatewayId"]
+        self.log("waiting for nat gateway {0} to be deleted".format(gtw_id))
+
+        def deleted(gtw):
+            if gtw is None:
+                self.warn("nat gateway {} was already deleted".format(gtw_id))
+                return True
+            if gtw["State"] not in {"deleted", "deleting"}:
+                raise Exception(
+                    "nat gateway {0} in an unexpected state {1}".format(
+                        gtw_id, gtw["State"]
                     )
-                self.log_continue(".")
-                time.sleep(1)
-            else:
-                break
+                )
+            return gtw["State"] == "deleted"
+
+        nixops_aws.waiters.wait_for(
+            "nat-gateways",
+            self._state["region"],
+            self.get_access_key_id(),
+            gtw_id,
+            deleted,
+            logger=self,
+            status=lambda gtw: gtw["State"] if gtw else "missing",
+        )
         self.log_end(" done")
 
     def _destroy(self):
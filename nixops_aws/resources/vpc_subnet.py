@@ -3,10 +3,10 @@
 # Automatic provisioning of AWS VPC subnets.
 
 import botocore
-import time
+import nixops_aws.waiters
 import nixops.util
 import nixops.resources
-from nixops_aws.resources.ec2_common import EC2CommonState
+from nixops_aws.resources.ec2_common import ConcurrentHandlersState, EC2CommonState
 from nixops.diff import Handler
 from . import vpc
 from .vpc import VPCState
@@ -31,7 +31,9 @@ class VPCSubnetDefinition(nixops.resources.ResourceDefinition):
         return "{0}".format(self.get_type())
 
 
-class VPCSubnetState(nixops.resources.DiffEngineResourceState, EC2CommonState):
+class VPCSubnetState(
+    ConcurrentHandlersState, nixops.resources.DiffEngineResourceState, EC2CommonState
+):
     """State of a VPC subnet."""
 
     definition_type = VPCSubnetDefinition
@@ -90,9 +92,7 @@ class VPCSubnetState(nixops.resources.DiffEngineResourceState, EC2CommonState):
         return {r for r in resources if isinstance(r, vpc.VPCState)}
 
     def create(self, defn, check, allow_reboot, allow_recreate):
-        nixops.resources.DiffEngineResourceState.create(
-            self, defn, check, allow_reboot, allow_recreate
-        )
+        ConcurrentHandlersState.create(self, defn, check, allow_reboot, allow_recreate)
         self.ensure_subnet_up(check)
 
     def ensure_subnet_up(self, check):
@@ -120,26 +120,30 @@ class VPCSubnetState(nixops.resources.DiffEngineResourceState, EC2CommonState):
                 self.wait_for_subnet_available(self._state["subnetId"])
 
     def wait_for_subnet_available(self, subnet_id):
-        while True:
-            response = self.get_client().describe_subnets(SubnetIds=[subnet_id])
-            if len(response["Subnets"]) == 1:
-                subnet = response["Subnets"][0]
-                if subnet["State"] == "available":
-                    break
-                elif subnet["State"] != "pending":
-                    raise Exception(
-                        "subnet {0} is in an unexpected state {1}".format(
-                            subnet_id, subnet["State"]
-                        )
-                    )
-                self.log_continue(".")
-                time.sleep(1)
-            else:
+        def available(subnet):
+            if subnet is None:
                 raise Exception(
                     "couldn't find subnet {}, please run deploy with --check".format(
                         subnet_id
                     )
                 )
+            if subnet["State"] not in {"available", "pending"}:
+                raise Exception(
+                    "subnet {0} is in an unexpected state {1}".format(
+                        subnet_id, subnet["State"]
+                    )
+                )
+            return subnet["State"] == "available"
+
+        nixops_aws.waiters.wait_for(
+            "subnets",
+            self._state["region"],
+            self.access_key_id,
+            subnet_id,
+            available,
+            logger=self,
+            status=lambda subnet: subnet["State"] if subnet else "missing",
+        )
         self.log_end(" done")
 
         with self.depl._db:
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+# Caches of the Route53 hosted zones and record sets shared by the
+# machines of a deployment.
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from botocore.exceptions import ClientError
+
+import nixops_aws.ec2_utils
+
+
+def _labels(name: str) -> List[str]:
+    return list(reversed(name.rstrip(".").split(".")))
+
+
+class HostedZoneIndex:
+    """
+        Suffix trie over the names of hosted zones, to find the zone that
+        holds a DNS name without scanning all zones of the account.
+    """
+
+    def __init__(self, zones: List[Dict[str, Any]]) -> None:
+        self._root: Dict[str, Any] = {}
+        for zone in zones:
+            node = self._root
+            for label in _labels(zone["Name"]):
+                node = node.setdefault("children", {}).setdefault(label, {})
+            node.setdefault("zones", []).append(zone)
+
+    def find(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+            Return the zone with the longest name that ‘name’ is equal to or
+            a subdomain of, or None if there is no such zone.
+        """
+        found = None
+        node = self._root
+        for label in _labels(name):
+            node = node.get("children", {}).get(label)
+            if node is None:
+                break
+            if node.get("zones"):
+                found = node["zones"][0]
+        return found
+
+
+class HostedZoneCache:
+    """
+        The hosted zone index of an account.  It is built from the zones
+        returned by ‘list_zones’ when first needed, and rebuilt when it is
+        older than ‘max_age’ seconds or once when a name has no zone of its
+        own in it, since that zone may have been created in the meantime.
+    """
+
+    def __init__(
+        self, list_zones: Callable[[], List[Dict[str, Any]]], max_age: float = 300
+    ) -> None:
+        self._list_zones = list_zones
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._index: Optional[HostedZoneIndex] = None
+        self._loaded = 0.0
+        self._missed: Set[str] = set()
+
+    def _load(self) -> HostedZoneIndex:
+        self._index = HostedZoneIndex(self._list_zones())
+        self._loaded = time.time()
+        return self._index
+
+    def find(self, name: str) -> Optional[Dict[str, Any]]:
+        """Like HostedZoneIndex.find."""
+        with self._lock:
+            index = self._index
+            if index is None or time.time() - self._loaded > self.max_age:
+                index = self._load()
+                self._missed = set()
+            zone = index.find(name)
+            if (
+                zone is None or _labels(zone["Name"]) != _labels(name)
+            ) and name not in self._missed:
+                self._missed.add(name)
+                zone = self._load().find(name)
+            return zone
+
+
+class RecordSetCache:
+    """
+        The record sets of a hosted zone by name.  The zone is listed once,
+        and kept up to date with the changes made through ‘apply’.
+    """
+
+    def __init__(self, list_rrsets: Callable[[], List[Dict[str, Any]]]) -> None:
+        self._list_rrsets = list_rrsets
+        self._lock = threading.Lock()
+        self._rrsets: Optional[Dict[str, List[Dict[str, Any]]]] = None
+
+    def get(self, name: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self._rrsets is None:
+                self._rrsets = {}
+                try:
+                    for rrset in self._list_rrsets():
+                        self._rrsets.setdefault(rrset["Name"], []).append(rrset)
+                except Exception:
+                    self._rrsets = None
+                    raise
+            return list(self._rrsets.get(name, []))
+
+    def apply(self, changes: List[Dict[str, Any]]) -> None:
+        """Record a change batch that was accepted by Route53."""
+        with self._lock:
+            if self._rrsets is None:
+                return
+            for change in changes:
+                rrset = change["ResourceRecordSet"]
+                rrsets = [
+                    r
+                    for r in self._rrsets.get(rrset["Name"], [])
+                    if r["Type"] != rrset["Type"]
+                ]
+                if change["Action"] != "DELETE":
+                    rrsets.append(rrset)
+                self._rrsets[rrset["Name"]] = rrsets
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._rrsets = None
+
+
+# Maximum number of changes in a single ChangeResourceRecordSets call.
+MAX_CHANGES = 1000
+
+# How often and how long (in seconds) to poll a change until it is in sync.
+SYNC_POLL_INTERVAL = 10
+SYNC_TIMEOUT = 300
+
+
+def _change_cost(change: Dict[str, Any]) -> int:
+    # An UPSERT counts as a DELETE and a CREATE against the limit.
+    return 2 if change["Action"] == "UPSERT" else 1
+
+
+class _ChangeRequest:
+    def __init__(self, changes: List[Dict[str, Any]]) -> None:
+        self.changes = changes
+        self.done = False
+        self.error: Optional[Exception] = None
+
+
+class ChangeBatcher:
+    """
+        Coalesce the changes that the resources of a deployment make to one
+        hosted zone into a few ChangeResourceRecordSets calls.
+
+        Each thread submits its changes and blocks.  The first thread that
+        finds nobody committing waits ‘window’ seconds for other changes to
+        come in, then commits everything that is pending in batches of at
+        most MAX_CHANGES and waits until all of them are in sync.  The
+        changes of one submission always end up in the same batch.  If
+        Route53 rejects a combined batch, its submissions are committed
+        one by one, so that only the faulty one fails.
+    """
+
+    def __init__(self, client: Any, zone_id: str, window: float = 1) -> None:
+        self._client = client
+        self.zone_id = zone_id
+        self.window = window
+        self._cond = threading.Condition()
+        self._pending: List[_ChangeRequest] = []
+        self._committing = False
+
+    def submit(
+        self,
+        changes: List[Dict[str, Any]],
+        retry: Callable[[Callable[[], Any]], Any] = lambda f: f(),
+    ) -> None:
+        """
+            Commit ‘changes’ together with those of other threads, and
+            return once they are in sync.  ‘retry’ wraps the API calls made
+            on behalf of all submissions, e.g. to retry on throttling.
+        """
+        request = _ChangeRequest(changes)
+        with self._cond:
+            self._pending.append(request)
+
+        while True:
+            with self._cond:
+                while not request.done and self._committing:
+                    self._cond.wait()
+                if request.done:
+                    break
+                self._committing = True
+
+            try:
+                time.sleep(self.window)
+                with self._cond:
+                    requests, self._pending = self._pending, []
+                self._commit(requests, retry)
+            finally:
+                with self._cond:
+                    self._committing = False
+                    self._cond.notify_all()
+
+        if request.error is not None:
+            raise request.error
+
+    def _commit(self, requests: List[_ChangeRequest], retry: Callable) -> None:
+        batches: List[List[_ChangeRequest]] = []
+        size = MAX_CHANGES
+        for request in requests:
+            cost = sum(_change_cost(c) for c in request.changes)
+            if size + cost > MAX_CHANGES:
+                batches.append([])
+                size = 0
+            batches[-1].append(request)
+            size += cost
+
+        changes: List[Tuple[str, List[_ChangeRequest]]] = []
+        for batch in batches:
+            changes.extend(self._change(batch, retry))
+
+        for change_id, batch in changes:
+            try:
+                self._wait_in_sync(change_id)
+            except Exception as e:
+                for request in batch:
+                    if request.error is None:
+                        request.error = e
+
+        with self._cond:
+            for request in requests:
+                request.done = True
+
+    def _change(
+        self, batch: List[_ChangeRequest], retry: Callable
+    ) -> List[Tuple[str, List[_ChangeRequest]]]:
+        """Return the ids of the changes made for ‘batch’ with their requests."""
+        try:
+            response = retry(
+                lambda: self._client.change_resource_record_sets(
+                    HostedZoneId=self.zone_id,
+                    ChangeBatch={"Changes": [c for r in batch for c in r.changes]},
+                )
+            )
+            return [(response["ChangeInfo"]["Id"], batch)]
+        except Exception as e:
+            if (
+                len(batch) > 1
+                and isinstance(e, ClientError)
+                and e.response["Error"]["Code"] == "InvalidChangeBatch"
+            ):
+                return [c for r in batch for c in self._change([r], retry)]
+            for request in batch:
+                request.error = e
+            return []
+
+    def _wait_in_sync(self, change_id: str) -> None:
+        # Not wrapped in the retry of the submitters, as everyone submitting
+        # to this zone waits until the change is in sync or times out.
+        deadline = time.time() + SYNC_TIMEOUT
+        while True:
+            response = nixops_aws.ec2_utils.retry(
+                lambda: self._client.get_change(Id=change_id),
+                error_codes=["Throttling", "PriorRequestNotComplete"],
+                always_retry=False,
+            )
+            if response["ChangeInfo"]["Status"] == "INSYNC":
+                return
+            if time.time() + SYNC_POLL_INTERVAL > deadline:
+                raise Exception(
+                    "Route53 change ‘{0}’ is not in sync after {1} seconds".format(
+                        change_id, SYNC_TIMEOUT
+                    )
+                )
+            time.sleep(SYNC_POLL_INTERVAL)
+
+
+_lock = threading.Lock()
+_hosted_zones: Dict[Hashable, HostedZoneCache] = {}
+_record_sets: Dict[Hashable, RecordSetCache] = {}
+_change_batchers: Dict[Hashable, ChangeBatcher] = {}
+
+
+def get_hosted_zones(
+    key: Hashable, list_zones: Callable[[], List[Dict[str, Any]]]
+) -> HostedZoneCache:
+    """Return the hosted zone cache registered under ‘key’, creating it if needed."""
+    with _lock:
+        cache = _hosted_zones.get(key)
+        if cache is None:
+            cache = _hosted_zones[key] = HostedZoneCache(list_zones)
+        return cache
+
+
+def get_record_sets(
+    key: Hashable, list_rrsets: Callable[[], List[Dict[str, Any]]]
+) -> RecordSetCache:
+    """Return the record set cache registered under ‘key’, creating it if needed."""
+    with _lock:
+        cache = _record_sets.get(key)
+        if cache is None:
+            cache = _record_sets[key] = RecordSetCache(list_rrsets)
+        return cache
+
+
+def get_change_batcher(access_key_id: str, zone_id: str) -> ChangeBatcher:
+    """Return the change batcher of the given hosted zone, creating it if needed."""
+    zone_id = zone_id.split("/")[-1]
+    with _lock:
+        batcher = _change_batchers.get((access_key_id, zone_id))
+        if batcher is None:
+            batcher = _change_batchers[(access_key_id, zone_id)] = ChangeBatcher(
+                nixops_aws.ec2_utils.get_boto3_client("route53", None, access_key_id),
+                zone_id,
+            )
+        return batcher
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+# Shared pollers that wait on the state of many AWS objects at once.
+
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set
+
+import nixops_aws.ec2_utils
+
+
+class WaitTimeout(Exception):
+    pass
+
+
+class BatchWaiter:
+    """
+        Wait on many objects of one kind with a single describe call per tick.
+
+        Threads register the ID of the object they wait for together with
+        a condition.  Whichever waiting thread finds no poll in progress
+        describes all registered objects at once and wakes up the others,
+        which then evaluate their condition against the new result.  The
+        polling interval grows while nothing changes, and drops back to
+        ‘min_interval’ when a waiter is added or satisfied.
+    """
+
+    def __init__(
+        self,
+        describe: Callable[[List[Any]], Dict[Hashable, Any]],
+        min_interval: float = 2,
+        max_interval: float = 15,
+        backoff: float = 1.5,
+    ) -> None:
+        self._describe = describe
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._interval = min_interval
+        self._cond = threading.Condition()
+        self._waiting: Dict[Hashable, int] = {}
+        self._results: Dict[Hashable, Any] = {}
+        self._polled: Set[Hashable] = set()
+        self._error: Optional[Exception] = None
+        self._generation = 0
+        self._polling = False
+        self._last_poll = 0.0
+        self._changed = True
+
+    def wait(
+        self,
+        item_id: Hashable,
+        condition: Callable[[Any], bool],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+            Block until ‘condition’ holds for the object with the given ID
+            and return the object.  The condition is called with None if the
+            object doesn't exist (yet), and may raise to stop waiting.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self._cond:
+            self._waiting[item_id] = self._waiting.get(item_id, 0) + 1
+            self._changed = True
+            generation = self._generation
+
+        try:
+            while True:
+                with self._cond:
+                    while self._generation == generation and self._polling:
+                        self._cond.wait()
+                    poll = self._generation == generation
+                    if poll:
+                        self._polling = True
+
+                if poll:
+                    self._poll()
+
+                with self._cond:
+                    generation = self._generation
+                    error = self._error
+                    polled = item_id in self._polled
+                    item = self._results.get(item_id)
+
+                if error is not None:
+                    raise error
+                # We may have registered after the poll started.
+                if polled and condition(item):
+                    with self._cond:
+                        self._changed = True
+                    return item
+                if deadline is not None and time.time() >= deadline:
+                    raise WaitTimeout("timed out waiting for ‘{0}’".format(item_id))
+        finally:
+            with self._cond:
+                self._waiting[item_id] -= 1
+                if self._waiting[item_id] == 0:
+                    del self._waiting[item_id]
+
+    def _poll(self) -> None:
+        with self._cond:
+            if self._changed:
+                self._interval = self.min_interval
+            else:
+                self._interval = min(self.max_interval, self._interval * self.backoff)
+            self._changed = False
+            delay = self._last_poll + self._interval - time.time()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        with self._cond:
+            ids = list(self._waiting)
+
+        try:
+            results, error = self._describe(ids), None
+        except Exception as e:
+            results, error = {}, e
+
+        with self._cond:
+            self._polled = set(ids)
+            self._results = results
+            self._error = error
+            self._last_poll = time.time()
+            self._generation += 1
+            self._polling = False
+            self._cond.notify_all()
+
+
+_waiters_lock = threading.Lock()
+_waiters: Dict[Hashable, BatchWaiter] = {}
+
+
+def get_waiter(
+    key: Hashable, describe_factory: Callable[[], Callable], **kwargs
+) -> BatchWaiter:
+    """
+        Return the waiter registered under ‘key’.  If there is none yet,
+        one is created with the describe function returned by
+        ‘describe_factory’.
+    """
+    with _waiters_lock:
+        waiter = _waiters.get(key)
+        if waiter is None:
+            waiter = _waiters[key] = BatchWaiter(describe_factory(), **kwargs)
+        return waiter
+
+
+def _describe_by_filter(operation, result_key, id_key, filter_name, client, ids):
+    items = {}
+    paginator = client.get_paginator(operation)
+    for chunk in nixops_aws.ec2_utils.chunks(ids, 200):
+        for page in paginator.paginate(
+            Filters=[{"Name": filter_name, "Values": chunk}]
+        ):
+            for item in page[result_key]:
+                items[item[id_key]] = item
+    return items
+
+
+def _describe_file_systems(client, ids):
+    # EFS has no filters, so list all file systems.  They are returned
+    # by ID as well as by creation token.
+    items = {}
+    for page in client.get_paginator("describe_file_systems").paginate():
+        for fs in page["FileSystems"]:
+            items[fs["FileSystemId"]] = fs
+            items[fs["CreationToken"]] = fs
+    return items
+
+
+# The describe function, and the service it needs a client of, for every
+# kind of object that can be waited for with ‘wait_for’.
+DESCRIBE: Dict[str, Any] = {
+    "vpcs": (
+        "ec2",
+        functools.partial(
+            _describe_by_filter, "describe_vpcs", "Vpcs", "VpcId", "vpc-id"
+        ),
+    ),
+    "subnets": (
+        "ec2",
+        functools.partial(
+            _describe_by_filter, "describe_subnets", "Subnets", "SubnetId", "subnet-id"
+        ),
+    ),
+    "nat-gateways": (
+        "ec2",
+        functools.partial(
+            _describe_by_filter,
+            "describe_nat_gateways",
+            "NatGateways",
+            "NatGatewayId",
+            "nat-gateway-id",
+        ),
+    ),
+    "file-systems": ("efs", _describe_file_systems),
+    "db-instances": (
+        "rds",
+        functools.partial(
+            _describe_by_filter,
+            "describe_db_instances",
+            "DBInstances",
+            "DBInstanceIdentifier",
+            "db-instance-id",
+        ),
+    ),
+}
+
+
+def wait_for(
+    kind: str,
+    region: str,
+    access_key_id: Optional[str],
+    item_id: Hashable,
+    condition: Callable[[Any], bool],
+    logger=None,
+    status: Optional[Callable[[Any], str]] = None,
+    timeout: Optional[float] = None,
+) -> Any:
+    """
+        Wait until ‘condition’ holds for the object of the given kind and
+        ID, and return it.  All objects of a kind in a region are polled
+        together, see ‘BatchWaiter’.  If a logger is given, the result of
+        ‘status’ is logged after every poll.
+    """
+    service, describe = DESCRIBE[kind]
+
+    def check(item):
+        if logger is not None and status is not None:
+            logger.log_continue("[{0}] ".format(status(item)))
+        return condition(item)
+
+    return get_waiter(
+        (kind, region, access_key_id),
+        lambda: functools.partial(
+            describe,
+            nixops_aws.ec2_utils.get_boto3_client(service, region, access_key_id),
+        ),
+    ).wait(item_id, check, timeout=timeout)
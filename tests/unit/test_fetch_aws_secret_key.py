@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import nixops_aws.ec2_utils as ec2_utils
+
+
+class TestFetchAwsSecretKey(unittest.TestCase):
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.ec2_keys = os.path.join(self.home, ".ec2-keys")
+        env = {"HOME": self.home}
+        self.env = mock.patch.dict(os.environ, env, clear=True)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.home)
+
+    def write_ec2_keys(self, contents, mtime):
+        with open(self.ec2_keys, "w") as f:
+            f.write(contents)
+        os.utime(self.ec2_keys, (mtime, mtime))
+
+    def test_ec2_keys_are_parsed_once(self):
+        self.write_ec2_keys("AKIA1 secret1\n", 1000)
+        with mock.patch.object(
+            ec2_utils, "_read_ec2_keys", wraps=ec2_utils._read_ec2_keys
+        ) as read:
+            self.assertEqual(
+                ec2_utils.fetch_aws_secret_key("AKIA1"), ("AKIA1", "secret1")
+            )
+            self.assertEqual(
+                ec2_utils.fetch_aws_secret_key("AKIA1"), ("AKIA1", "secret1")
+            )
+            self.assertEqual(read.call_count, 1)
+
+    def test_cache_is_invalidated_when_file_changes(self):
+        self.write_ec2_keys("AKIA2 secret1\n", 1000)
+        self.assertEqual(ec2_utils.fetch_aws_secret_key("AKIA2"), ("AKIA2", "secret1"))
+        self.write_ec2_keys("AKIA2 secret2 # rotated\n", 2000)
+        self.assertEqual(ec2_utils.fetch_aws_secret_key("AKIA2"), ("AKIA2", "secret2"))
+
+    def test_environment_fallback(self):
+        os.environ["AWS_SECRET_ACCESS_KEY"] = "from-env"
+        self.assertEqual(ec2_utils.fetch_aws_secret_key("AKIA3"), ("AKIA3", "from-env"))
+        del os.environ["AWS_SECRET_ACCESS_KEY"]
+        with self.assertRaises(Exception):
+            ec2_utils.fetch_aws_secret_key("AKIA3")
@@ -0,0 +1,43 @@
+import importlib.util
+import io
+import json
+import os
+import unittest
+
+import nixops_aws
+
+spec = importlib.util.spec_from_file_location(
+    "generate_ec2_properties",
+    os.path.join(
+        os.path.dirname(nixops_aws.__file__), "nix", "generate-ec2-properties.py"
+    ),
+)
+generate = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(generate)
+
+DOCUMENT = {
+    "Other": {"Nested": [1.25, {"a": "b"}]},
+    "InstanceTypes": [
+        2.5,
+        {"ClockSpeed": 2.5, "Cores": [1, 20, -3]},
+        -12.5e3,
+        10,
+        True,
+        None,
+        "x1e.32xlarge",
+    ],
+}
+
+
+class TestJSONStream(unittest.TestCase):
+    def test_values_split_across_chunks(self):
+        text = json.dumps(DOCUMENT)
+        for chunk_size in range(1, 12):
+            with self.subTest(chunk_size=chunk_size):
+                f = io.StringIO(text)
+                read = f.read
+                f.read = lambda n: read(min(n, chunk_size))
+                self.assertEqual(
+                    list(generate.iter_members(f, "InstanceTypes")),
+                    DOCUMENT["InstanceTypes"],
+                )
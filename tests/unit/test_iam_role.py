@@ -0,0 +1,72 @@
+import json
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from nixops_aws.resources import iam_role
+
+POLICY = {"Statement": [{"Effect": "Allow", "Action": "s3:*", "Resource": "*"}]}
+
+
+def no_such_entity(**kwargs):
+    raise ClientError({"Error": {"Code": "NoSuchEntity", "Message": ""}}, "Get")
+
+
+class TestIAMRole(unittest.TestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        self.client.get_role.return_value = {
+            "Role": {
+                "AssumeRolePolicyDocument": json.loads(
+                    iam_role.DEFAULT_ASSUME_ROLE_POLICY
+                ),
+                "Tags": [{"Key": "env", "Value": "prod"}],
+            }
+        }
+        self.client.get_role_policy.return_value = {"PolicyDocument": POLICY}
+        self.client.get_instance_profile.return_value = {
+            "InstanceProfile": {"Roles": [{"RoleName": "role"}]}
+        }
+
+        self.state = mock.MagicMock(role_name="role", tags={"env": "prod"})
+        self.state.state = self.state.UP
+        self.state._connect_boto3.return_value = self.client
+        for method in ["_call", "_fetch", "_apply"]:
+            setattr(
+                self.state,
+                method,
+                getattr(iam_role.IAMRoleState, method).__get__(self.state),
+            )
+
+    def writes(self):
+        return [name for name, _, _ in self.client.mock_calls if "get_" not in name]
+
+    def test_unchanged_role_is_not_written(self):
+        defn = mock.Mock(
+            role_name="role",
+            access_key_id="key",
+            policy=json.dumps(POLICY, indent=2),
+            assume_role_policy="",
+            tags={"env": "prod"},
+        )
+        iam_role.IAMRoleState.create(self.state, defn, False, False, False)
+        self.assertEqual(self.writes(), [])
+
+    def test_destroy_unlinks_before_deleting(self):
+        iam_role.IAMRoleState._destroy(self.state)
+        writes = self.writes()
+        self.assertEqual(
+            sorted(writes[:2]),
+            ["delete_role_policy", "remove_role_from_instance_profile"],
+        )
+        self.assertEqual(sorted(writes[2:]), ["delete_instance_profile", "delete_role"])
+
+    def test_destroy_skips_missing_entities(self):
+        self.client.get_role.side_effect = no_such_entity
+        self.client.get_role_policy.side_effect = no_such_entity
+        iam_role.IAMRoleState._destroy(self.state)
+        self.assertEqual(
+            self.writes(),
+            ["remove_role_from_instance_profile", "delete_instance_profile"],
+        )
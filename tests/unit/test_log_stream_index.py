@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+
+import boto3
+from botocore.stub import Stubber
+
+from nixops_aws.resources import cloudwatch_log_stream
+
+GROUP_ARN = "arn:aws:logs:r:123:log-group:g"
+
+
+def stream(name):
+    return {
+        "logStreamName": name,
+        "arn": "{0}:log-stream:{1}".format(GROUP_ARN, name),
+    }
+
+
+class TestLogStreamIndex(unittest.TestCase):
+    def setUp(self):
+        self.client = boto3.client(
+            "logs",
+            region_name="us-east-1",
+            aws_access_key_id="k",
+            aws_secret_access_key="s",
+        )
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+        self.get_client = mock.patch.object(
+            cloudwatch_log_stream.nixops_aws.ec2_utils,
+            "get_boto3_client",
+            return_value=self.client,
+        )
+        self.get_client.start()
+        self.index = cloudwatch_log_stream.LogStreamIndex("r", "k", "g")
+
+    def tearDown(self):
+        self.get_client.stop()
+        self.stubber.deactivate()
+
+    def test_pages_are_listed_once(self):
+        self.stubber.add_response(
+            "describe_log_streams",
+            {"logStreams": [stream("a")], "nextToken": "t"},
+            {"logGroupName": "g"},
+        )
+        self.stubber.add_response(
+            "describe_log_streams",
+            {"logStreams": [stream("b")]},
+            {"logGroupName": "g", "nextToken": "t"},
+        )
+        self.assertEqual(self.index.get("b"), stream("b")["arn"])
+        self.assertEqual(self.index.get("a"), stream("a")["arn"])
+        self.assertIsNone(self.index.get("c"))
+        self.stubber.assert_no_pending_responses()
+
+    def test_created_and_deleted_streams_are_recorded(self):
+        self.stubber.add_response(
+            "describe_log_streams", {"logStreams": []}, {"logGroupName": "g"}
+        )
+        self.stubber.add_response(
+            "create_log_stream", {}, {"logGroupName": "g", "logStreamName": "a"}
+        )
+        self.stubber.add_response(
+            "describe_log_groups",
+            {"logGroups": [{"logGroupName": "g", "arn": GROUP_ARN + ":*"}]},
+            {"logGroupNamePrefix": "g"},
+        )
+        self.stubber.add_response(
+            "create_log_stream", {}, {"logGroupName": "g", "logStreamName": "b"}
+        )
+        self.stubber.add_client_error("delete_log_stream", "ResourceNotFoundException")
+        self.assertIsNone(self.index.get("a"))
+        self.assertEqual(self.index.create("a"), stream("a")["arn"])
+        self.assertEqual(self.index.create("b"), stream("b")["arn"])
+        self.assertEqual(self.index.get("a"), stream("a")["arn"])
+        self.assertFalse(self.index.delete("a"))
+        self.assertIsNone(self.index.get("a"))
+        self.stubber.assert_no_pending_responses()
@@ -0,0 +1,82 @@
+import unittest
+from unittest import mock
+
+import boto3
+import botocore.config
+from botocore.exceptions import EndpointConnectionError
+from botocore.stub import Stubber
+
+import nixops_aws.ec2_utils as ec2_utils
+import nixops_aws.metrics as metrics
+
+
+class FakeResource:
+    depl = None
+    name = "web"
+
+    def describe(self, client):
+        return client.describe_vpcs()
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.stats = mock.patch.dict(metrics._stats, clear=True)
+        self.stats.start()
+        self.client = boto3.client(
+            "ec2",
+            region_name="us-east-1",
+            aws_access_key_id="AKIA",
+            aws_secret_access_key="secret",
+        )
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+        metrics.instrument_boto3(self.client)
+
+    def tearDown(self):
+        self.stubber.deactivate()
+        self.stats.stop()
+
+    def test_calls_are_recorded_per_resource(self):
+        self.stubber.add_response("describe_vpcs", {"Vpcs": []})
+        self.stubber.add_client_error("describe_subnets", "RequestLimitExceeded")
+        FakeResource().describe(self.client)
+        with self.assertRaises(Exception):
+            self.client.describe_subnets()
+
+        stats = metrics.snapshot()
+        vpcs = stats[("ec2", "DescribeVpcs", "us-east-1", "web")]
+        self.assertEqual((vpcs.calls, vpcs.errors), (1, 0))
+        subnets = stats[("ec2", "DescribeSubnets", "us-east-1", None)]
+        self.assertEqual((subnets.calls, subnets.errors, subnets.throttles), (1, 1, 1))
+        self.assertIn("ec2.DescribeSubnets", metrics.summary())
+        self.assertEqual(len(metrics.to_json()["operations"]), 2)
+
+    def test_connection_errors_are_recorded_and_raised(self):
+        client = boto3.client(
+            "ec2",
+            region_name="us-east-1",
+            aws_access_key_id="AKIA",
+            aws_secret_access_key="secret",
+            config=botocore.config.Config(retries={"total_max_attempts": 1}),
+        )
+        metrics.instrument_boto3(client)
+
+        def fail(request, **kwargs):
+            raise EndpointConnectionError(endpoint_url=request.url)
+
+        client.meta.events.register("before-send.ec2.*", fail)
+        with self.assertRaises(EndpointConnectionError):
+            client.describe_vpcs()
+
+        vpcs = metrics.snapshot()[("ec2", "DescribeVpcs", "us-east-1", None)]
+        self.assertEqual((vpcs.calls, vpcs.errors), (1, 1))
+
+    def test_retries_are_recorded_per_operation(self):
+        self.stubber.add_client_error("describe_subnets", "IncorrectState")
+        self.stubber.add_response("describe_subnets", {"Subnets": []})
+        with mock.patch.object(ec2_utils.time, "sleep"):
+            ec2_utils.retry(self.client.describe_subnets, region="us-east-1")
+
+        subnets = metrics.snapshot()[("ec2", "DescribeSubnets", "us-east-1", None)]
+        self.assertEqual((subnets.calls, subnets.errors, subnets.retries), (2, 1, 1))
+        self.assertEqual(len(metrics.snapshot()), 1)
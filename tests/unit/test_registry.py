@@ -0,0 +1,26 @@
+import importlib
+import unittest
+
+import nixops_aws.registry as registry
+
+
+class TestRegistry(unittest.TestCase):
+    def test_types_match_real_classes(self):
+        for module, type_name, resource_type, definition, state in registry.RESOURCES:
+            mod = importlib.import_module(module)
+            for name in (definition, state):
+                real_cls = getattr(mod, name)
+                lazy_cls = getattr(registry, name)
+                self.assertEqual(real_cls.get_type(), type_name)
+                self.assertEqual(lazy_cls.get_type(), type_name)
+            self.assertEqual(
+                getattr(mod, definition).get_resource_type(),
+                getattr(registry, definition).get_resource_type(),
+            )
+
+    def test_all_resource_modules_are_registered(self):
+        registered = {module for module, _, _, _, _ in registry.RESOURCES}
+        for name in importlib.import_module("nixops_aws.resources").__all__:
+            if name in ("ec2_common", "efs_common"):
+                continue
+            self.assertIn("nixops_aws.resources." + name, registered)
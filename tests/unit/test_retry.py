@@ -0,0 +1,54 @@
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+import nixops_aws.ec2_utils as ec2_utils
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "DescribeThings")
+
+
+class TestRetry(unittest.TestCase):
+    def setUp(self):
+        self.sleep = mock.patch.object(ec2_utils.time, "sleep")
+        self.sleep.start()
+        self.states = mock.patch.dict(ec2_utils._retry_states, clear=True)
+        self.states.start()
+
+    def tearDown(self):
+        self.states.stop()
+        self.sleep.stop()
+
+    def test_retries_until_success(self):
+        f = mock.Mock(side_effect=[client_error("IncorrectState"), "ok"])
+        self.assertEqual(ec2_utils.retry(f, region="us-east-1"), "ok")
+        self.assertEqual(f.call_count, 2)
+
+    def test_unlisted_error_code_aborts(self):
+        f = mock.Mock(side_effect=client_error("InvalidParameterValue"))
+        with self.assertRaises(ClientError):
+            ec2_utils.retry(f, error_codes=["InvalidGroup.NotFound"])
+        self.assertEqual(f.call_count, 1)
+
+    def test_throttling_is_left_to_f(self):
+        f = mock.Mock(side_effect=client_error("Throttling"))
+        with self.assertRaises(ClientError):
+            ec2_utils.retry(f, error_codes=["InvalidChangeBatch"], always_retry=False)
+        self.assertEqual(f.call_count, 1)
+
+    def test_retry_budget_is_fixed(self):
+        f = mock.Mock(side_effect=client_error("IncorrectState"))
+        with self.assertRaises(ClientError):
+            ec2_utils.retry(f, num_retries=3)
+        self.assertEqual(f.call_count, 4)
+
+    def test_throttling_is_retried_and_shared(self):
+        f = mock.Mock(side_effect=[client_error("RequestLimitExceeded"), "ok"])
+        self.assertEqual(
+            ec2_utils.retry(f, error_codes=["InvalidGroup.NotFound"], region="r"), "ok",
+        )
+        state = ec2_utils.get_retry_state("r")
+        self.assertGreater(state._open_until, 0)
+        self.assertEqual(state._throttle_delay, 0)
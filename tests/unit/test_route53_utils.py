@@ -0,0 +1,151 @@
+import threading
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from nixops_aws import route53_utils
+from nixops_aws.route53_utils import (
+    ChangeBatcher,
+    HostedZoneCache,
+    HostedZoneIndex,
+    RecordSetCache,
+)
+
+
+def zone(name):
+    return {"Id": "/hostedzone/" + name, "Name": name}
+
+
+class TestHostedZoneIndex(unittest.TestCase):
+    def test_longest_suffix_match(self):
+        index = HostedZoneIndex(
+            [zone("example.com."), zone("sub.example.com."), zone("ample.com.")]
+        )
+        self.assertEqual(index.find("a.sub.example.com")["Name"], "sub.example.com.")
+        self.assertEqual(index.find("sub.example.com")["Name"], "sub.example.com.")
+        self.assertEqual(index.find("other.example.com")["Name"], "example.com.")
+        self.assertIsNone(index.find("example.org"))
+
+
+class TestHostedZoneCache(unittest.TestCase):
+    def test_new_zones_are_found(self):
+        zones = [zone("example.com.")]
+        list_zones = mock.Mock(side_effect=lambda: list(zones))
+        cache = HostedZoneCache(list_zones)
+        self.assertEqual(cache.find("example.com")["Name"], "example.com.")
+        self.assertEqual(cache.find("example.com")["Name"], "example.com.")
+        self.assertEqual(list_zones.call_count, 1)
+
+        zones.append(zone("sub.example.com."))
+        self.assertEqual(cache.find("sub.example.com")["Name"], "sub.example.com.")
+        self.assertEqual(list_zones.call_count, 2)
+
+        # A name without a zone of its own is only reloaded for once.
+        self.assertEqual(cache.find("other.example.com")["Name"], "example.com.")
+        self.assertEqual(cache.find("other.example.com")["Name"], "example.com.")
+        self.assertEqual(list_zones.call_count, 3)
+
+
+class TestRecordSetCache(unittest.TestCase):
+    def test_zone_is_listed_once_and_kept_up_to_date(self):
+        calls = []
+
+        def list_rrsets():
+            calls.append(None)
+            return [{"Name": "a.example.com.", "Type": "A"}]
+
+        cache = RecordSetCache(list_rrsets)
+        self.assertEqual(len(cache.get("a.example.com.")), 1)
+        cache.apply(
+            [
+                {
+                    "Action": "DELETE",
+                    "ResourceRecordSet": {"Name": "a.example.com.", "Type": "A"},
+                },
+                {
+                    "Action": "CREATE",
+                    "ResourceRecordSet": {"Name": "a.example.com.", "Type": "CNAME"},
+                },
+            ]
+        )
+        self.assertEqual(
+            [r["Type"] for r in cache.get("a.example.com.")], ["CNAME"],
+        )
+        self.assertEqual(cache.get("b.example.com."), [])
+        self.assertEqual(len(calls), 1)
+
+
+def change(name):
+    return {"Action": "UPSERT", "ResourceRecordSet": {"Name": name, "Type": "A"}}
+
+
+class TestChangeBatcher(unittest.TestCase):
+    def submit_all(self, batcher, names):
+        errors = {}
+
+        def submit(name):
+            try:
+                batcher.submit([change(name)])
+            except Exception as e:
+                errors[name] = e
+
+        threads = [threading.Thread(target=submit, args=(n,)) for n in names]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return errors
+
+    def test_changes_are_coalesced(self):
+        client = mock.Mock()
+        client.get_change.return_value = {"ChangeInfo": {"Status": "INSYNC"}}
+        client.change_resource_record_sets.return_value = {"ChangeInfo": {"Id": "c1"}}
+        batcher = ChangeBatcher(client, "Z1", window=0.2)
+        self.assertEqual(self.submit_all(batcher, ["a.", "b.", "c."]), {})
+        self.assertEqual(client.change_resource_record_sets.call_count, 1)
+        changes = client.change_resource_record_sets.call_args[1]["ChangeBatch"]
+        self.assertEqual(len(changes["Changes"]), 3)
+        client.get_change.assert_called_once_with(Id="c1")
+
+    def test_invalid_batch_falls_back_to_single_submissions(self):
+        def change_resource_record_sets(HostedZoneId, ChangeBatch):
+            names = [c["ResourceRecordSet"]["Name"] for c in ChangeBatch["Changes"]]
+            if "bad." in names:
+                raise ClientError(
+                    {"Error": {"Code": "InvalidChangeBatch", "Message": ""}},
+                    "ChangeResourceRecordSets",
+                )
+            return {"ChangeInfo": {"Id": "c"}}
+
+        client = mock.Mock()
+        client.change_resource_record_sets.side_effect = change_resource_record_sets
+        client.get_change.return_value = {"ChangeInfo": {"Status": "INSYNC"}}
+        batcher = ChangeBatcher(client, "Z1", window=0.2)
+        errors = self.submit_all(batcher, ["a.", "bad."])
+        self.assertEqual(list(errors), ["bad."])
+
+    def test_sync_errors_only_fail_their_batch(self):
+        def change_resource_record_sets(HostedZoneId, ChangeBatch):
+            return {
+                "ChangeInfo": {
+                    "Id": ChangeBatch["Changes"][0]["ResourceRecordSet"]["Name"]
+                }
+            }
+
+        def get_change(Id):
+            if Id == "bad.":
+                raise ClientError(
+                    {"Error": {"Code": "NoSuchChange", "Message": ""}}, "GetChange"
+                )
+            return {"ChangeInfo": {"Status": "INSYNC"}}
+
+        client = mock.Mock()
+        client.change_resource_record_sets.side_effect = change_resource_record_sets
+        client.get_change.side_effect = get_change
+        batcher = ChangeBatcher(client, "Z1", window=0.2)
+        # An UPSERT counts twice, so every submission gets its own batch.
+        with mock.patch.object(route53_utils, "MAX_CHANGES", 2):
+            errors = self.submit_all(batcher, ["a.", "bad."])
+        self.assertEqual(client.change_resource_record_sets.call_count, 2)
+        self.assertEqual(list(errors), ["bad."])
@@ -0,0 +1,44 @@
+import threading
+import unittest
+
+from nixops.diff import Handler
+
+from nixops_aws.resources.ec2_common import run_handlers
+
+
+class TestRunHandlers(unittest.TestCase):
+    def test_independent_handlers_run_concurrently(self):
+        order = []
+        barrier = threading.Barrier(3, timeout=5)
+
+        def record(name, wait=False):
+            def handle(allow_recreate):
+                if wait:
+                    # Fails unless all three run at the same time.
+                    barrier.wait()
+                order.append(name)
+
+            return handle
+
+        create = Handler(["a"], handle=record("create"))
+        others = [
+            Handler([k], after=[create], handle=record(k, wait=True))
+            for k in ["b", "c", "d"]
+        ]
+        last = Handler(["e"], after=others, handle=record("last"))
+        run_handlers([create] + others + [last], False)
+        self.assertEqual(order[0], "create")
+        self.assertEqual(sorted(order[1:4]), ["b", "c", "d"])
+        self.assertEqual(order[4], "last")
+
+    def test_failure_stops_dependents(self):
+        ran = []
+
+        def fail(allow_recreate):
+            raise Exception("boom")
+
+        create = Handler(["a"], handle=fail)
+        tags = Handler(["b"], after=[create], handle=lambda r: ran.append("tags"))
+        with self.assertRaises(Exception):
+            run_handlers([create, tags], False)
+        self.assertEqual(ran, [])
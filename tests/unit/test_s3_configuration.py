@@ -0,0 +1,93 @@
+import json
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from nixops_aws.resources import s3_bucket
+
+POLICY = {
+    "Version": "2012-10-17",
+    "Statement": [
+        {
+            "Effect": "Allow",
+            "Principal": "*",
+            "Action": ["s3:GetObject"],
+            "Resource": "arn:aws:s3:::bucket/*",
+        }
+    ],
+}
+
+LIFECYCLE = {
+    "Rules": [{"Status": "Enabled", "Prefix": "logs/", "Expiration": {"Days": 7}}]
+}
+
+
+def missing(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "Get")
+
+
+class TestS3Configuration(unittest.TestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        self.client.get_bucket_versioning.return_value = {"Status": "Enabled"}
+        self.client.get_bucket_policy.return_value = {
+            "Policy": json.dumps(
+                {
+                    "Statement": {
+                        "Resource": "arn:aws:s3:::bucket/*",
+                        "Action": "s3:GetObject",
+                        "Principal": "*",
+                        "Effect": "Allow",
+                    },
+                    "Version": "2012-10-17",
+                }
+            )
+        }
+        self.client.get_bucket_lifecycle_configuration.return_value = {
+            "Rules": [dict(LIFECYCLE["Rules"][0], ID="generated")]
+        }
+        self.client.get_bucket_website.side_effect = missing(
+            "NoSuchWebsiteConfiguration"
+        )
+
+        self.state = mock.MagicMock()
+        self.state.state = self.state.UP
+        self.state._connect.return_value = self.client
+        self.state._get_configuration = lambda client, bucket: (
+            s3_bucket.S3BucketState._get_configuration(self.state, client, bucket)
+        )
+
+        self.defn = mock.Mock(
+            bucket_name="bucket",
+            access_key_id="key",
+            versioning="Enabled",
+            policy=json.dumps(POLICY, indent=2),
+            lifecycle=json.dumps(LIFECYCLE),
+            website_enabled=False,
+            persist_on_destroy=False,
+        )
+
+    def create(self):
+        s3_bucket.S3BucketState.create(self.state, self.defn, False, False, False)
+
+    def writes(self):
+        return [
+            name for name, _, _ in self.client.mock_calls if not name.startswith("get_")
+        ]
+
+    def test_unchanged_configuration_is_not_written(self):
+        self.create()
+        self.assertEqual(self.writes(), [])
+
+    def test_only_changed_configuration_is_written(self):
+        self.defn.versioning = "Suspended"
+        self.defn.lifecycle = ""
+        self.defn.website_enabled = True
+        self.defn.website_suffix = "index.html"
+        self.defn.website_error_document = ""
+        self.create()
+        self.assertEqual(
+            sorted(self.writes()),
+            ["delete_bucket_lifecycle", "put_bucket_versioning", "put_bucket_website"],
+        )
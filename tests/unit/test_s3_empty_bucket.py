@@ -0,0 +1,48 @@
+import unittest
+from unittest import mock
+
+from nixops_aws.resources import s3_bucket
+
+
+def page(keys, markers=()):
+    return {
+        "Versions": [{"Key": k, "VersionId": "v1"} for k in keys],
+        "DeleteMarkers": [{"Key": k, "VersionId": "m1"} for k in markers],
+    }
+
+
+class TestEmptyBucket(unittest.TestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        self.client.delete_objects.return_value = {}
+        self.state = mock.Mock(bucket_name="bucket")
+
+    def empty(self, *pages):
+        self.client.get_paginator.return_value.paginate.return_value = list(pages)
+        s3_bucket.S3BucketState._empty_bucket(self.state, self.client)
+
+    def deleted(self):
+        return sorted(
+            (o["Key"], o["VersionId"])
+            for c in self.client.delete_objects.call_args_list
+            for o in c[1]["Delete"]["Objects"]
+        )
+
+    def test_versions_and_delete_markers_are_deleted_in_batches(self):
+        keys = ["k{0}".format(i) for i in range(1500)]
+        self.empty(page(keys[:900], ["gone"]), page(keys[900:]))
+        self.assertEqual(
+            self.deleted(), sorted([(k, "v1") for k in keys] + [("gone", "m1")]),
+        )
+        sizes = sorted(
+            len(c[1]["Delete"]["Objects"])
+            for c in self.client.delete_objects.call_args_list
+        )
+        self.assertEqual(sizes, [501, 1000])
+
+    def test_failed_keys_are_reported(self):
+        self.client.delete_objects.return_value = {
+            "Errors": [{"Key": "k0", "Code": "AccessDenied", "Message": "denied"}]
+        }
+        with self.assertRaises(Exception):
+            self.empty(page(["k0", "k1"]))
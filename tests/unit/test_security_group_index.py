@@ -0,0 +1,51 @@
+import unittest
+from unittest import mock
+
+import nixops_aws.ec2_utils as ec2_utils
+
+
+def page(*groups):
+    return {
+        "SecurityGroups": [{"GroupName": n, "GroupId": i} for n, i in groups],
+    }
+
+
+class TestSecurityGroupIndex(unittest.TestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        self.paginate = self.client.get_paginator.return_value.paginate
+        self.paginate.return_value = [page(("web", "sg-1")), page(("db", "sg-2"))]
+        self.connect = mock.patch.object(
+            ec2_utils, "connect_ec2_boto3", return_value=self.client
+        )
+        self.connect.start()
+        self.indexes = mock.patch.dict(ec2_utils._security_group_indexes, clear=True)
+        self.indexes.start()
+
+    def tearDown(self):
+        self.indexes.stop()
+        self.connect.stop()
+
+    def test_lookups_share_one_describe(self):
+        self.assertEqual(
+            ec2_utils.name_to_security_group("r", "k", "web", "vpc-1"), "sg-1"
+        )
+        self.assertEqual(
+            ec2_utils.id_to_security_group_name("r", "k", "sg-2", "vpc-1"), "db"
+        )
+        self.assertEqual(
+            ec2_utils.name_to_security_group("r", "k", "sg-3", "vpc-1"), "sg-3"
+        )
+        self.assertEqual(self.paginate.call_count, 1)
+
+    def test_invalidation_and_misses_describe_again(self):
+        ec2_utils.name_to_security_group("r", "k", "web", "vpc-1")
+        self.paginate.return_value = [page(("web", "sg-1"), ("new", "sg-4"))]
+        self.assertEqual(
+            ec2_utils.name_to_security_group("r", "k", "new", "vpc-1"), "sg-4"
+        )
+        ec2_utils.invalidate_security_groups("r", "k", "vpc-1")
+        ec2_utils.name_to_security_group("r", "k", "web", "vpc-1")
+        self.assertEqual(self.paginate.call_count, 3)
+        with self.assertRaises(Exception):
+            ec2_utils.name_to_security_group("r", "k", "missing", "vpc-1")
@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+
+import nixops_aws.ec2_utils as ec2_utils
+from nixops_aws.resources.ec2_common import EC2CommonState
+
+
+class Resource(EC2CommonState):
+    def __init__(self, depl, region, volume_id=None, block_device_mapping=None):
+        self.depl = depl
+        self.region = region
+        self.access_key_id = "key"
+        self.volume_id = volume_id
+        self.block_device_mapping = block_device_mapping or {}
+
+
+class TestVolumePrefetch(unittest.TestCase):
+    def setUp(self):
+        self.depl = mock.Mock(uuid="uuid")
+        self.volumes = [
+            Resource(self.depl, "r", "vol-1"),
+            Resource(self.depl, "r", "vol-2"),
+            Resource(self.depl, "other", "vol-3"),
+        ]
+        machine = Resource(
+            self.depl, "r", block_device_mapping={"/dev/xvdf": {"volumeId": "vol-4"}}
+        )
+        self.depl.active_resources = {
+            str(i): r for i, r in enumerate(self.volumes + [machine])
+        }
+
+        self.patches = [
+            mock.patch.dict(ec2_utils._prefetches, clear=True),
+            mock.patch.object(ec2_utils, "connect_ec2_boto3"),
+            mock.patch.object(
+                ec2_utils,
+                "get_volumes_by_id",
+                side_effect=lambda client, ids: {i: {"VolumeId": i} for i in ids},
+            ),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+
+    def test_volumes_of_a_region_are_described_at_once(self):
+        for v in self.volumes[:2]:
+            self.assertEqual(
+                v._get_prefetched_volume("r", v.volume_id), {"VolumeId": v.volume_id}
+            )
+        ec2_utils.get_volumes_by_id.assert_called_once()
+        ids = ec2_utils.get_volumes_by_id.call_args[0][1]
+        self.assertEqual(sorted(ids), ["vol-1", "vol-2", "vol-4"])
+        self.assertEqual(ids[0], "vol-1")